@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""Compare HTSeq.parse_GFF_attribute_string with pygff.attributes.
+
+HTSeq 2.x moved the function to `HTSeq.features.GFF_Reader`. If neither
+location has it, only pygff.attributes is timed.
+
+Usage: python benchmarks/bench_attributes.py [-n RECORDS] [-k KEY]
+"""
+
+import argparse
+import os
+import tempfile
+
+try:
+    from HTSeq import parse_GFF_attribute_string
+except ImportError:
+    try:
+        from HTSeq.features import GFF_Reader
+        parse_GFF_attribute_string = GFF_Reader.parse_GFF_attribute_string
+    except (ImportError, AttributeError):
+        parse_GFF_attribute_string = None
+
+from pygff.attributes import AttributeParser
+
+from common import write_gtf, best_time, report
+
+
+def parse_htseq(texts, key):
+    # The parsing used before pygff.attributes
+    for text in texts:
+        parse_GFF_attribute_string(text, True)[0].get(key)
+
+
+def parse_full(texts, key):
+    parser = AttributeParser()
+    for text in texts:
+        parser.parse(text).get(key)
+
+
+def parse_projected(texts, key):
+    parser = AttributeParser()
+    keys = frozenset([key])
+    for text in texts:
+        parser.parse(text, keys).get(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--records", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-k", "--key", default="gene_id")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        gtf_file = os.path.join(tempdir, "bench.gtf")
+        write_gtf(gtf_file, args.records)
+        with open(gtf_file) as f:
+            texts = [line.split("\t", 8)[8] for line in f]
+
+    parsers = [("full", parse_full), ("projected", parse_projected)]
+    if parse_GFF_attribute_string is not None:
+        parsers.insert(0, ("HTSeq", parse_htseq))
+    timings = {}
+    for name, func in parsers:
+        timings[name] = best_time(lambda: func(texts, args.key), args.repeat)
+    report(timings, args.records, parsers[0][0])
+
+
+if __name__ == "__main__":
+    main()
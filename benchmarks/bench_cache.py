@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""Compare parsing a GFF file with building records from its cache.
+
+Usage: python benchmarks/bench_cache.py [-n RECORDS]
+
+Each record's attributes, start and end are accessed, as by `pygff conv`.
+"""
+
+import argparse
+import os
+import tempfile
+
+from pygff.cache import CACHE_DIR_ENV
+from pygff.reader import GFF_Reader
+from pygff.table import build_cache
+
+from common import write_gtf, best_time, report
+
+
+def read_records(gff_file, use_cache):
+    return [(record.seqid, record.type, record.start, record.end,
+             record.score_string, record.phase, record.attr)
+            for record in GFF_Reader(gff_file, use_cache=use_cache)
+            .iter_records()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--records", type=int, default=500000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        os.environ[CACHE_DIR_ENV] = os.path.join(tempdir, "cache")
+        gtf_file = os.path.join(tempdir, "bench.gtf")
+        write_gtf(gtf_file, args.records)
+        build_cache(gtf_file)
+        if GFF_Reader(gtf_file).cache is None:
+            raise SystemExit("The cache was not built.")
+        if read_records(gtf_file, False) != read_records(gtf_file, True):
+            raise SystemExit("Records of the file and the cache differ.")
+        timings = {
+            "parse": best_time(
+                lambda: read_records(gtf_file, False), args.repeat),
+            "cached": best_time(
+                lambda: read_records(gtf_file, True), args.repeat),
+        }
+    report(timings, args.records, "parse")
+
+
+if __name__ == "__main__":
+    main()
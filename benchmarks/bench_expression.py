@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""Compare per-feature `eval` of an expression string with pygff.expression.
+
+Usage: python benchmarks/bench_expression.py [-n RECORDS] [-e EXPRESSION]
+"""
+
+import argparse
+import os
+import tempfile
+
+from pygff.reader import GFF_Reader
+from pygff.expression import Expression
+
+from common import write_gtf, best_time, report
+
+
+def eval_string(expression, features):
+    # The expression evaluation used before pygff.expression
+    for feature in features:
+        env = {
+            "seqid": feature.iv.chrom,
+            "source": feature.source,
+            "type": feature.type,
+            "start": feature.iv.start + 1,
+            "end": feature.iv.end,
+            "score": feature.score,
+            "strand": feature.iv.strand,
+            "phase": str(feature.frame),
+            "attributes": feature.attr
+        }
+        eval(expression, env)
+
+
+def eval_compiled(expression, features):
+    compiled = Expression(expression)
+    for feature in features:
+        compiled.evaluate(feature)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--records", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument(
+        "-e", "--expression", default="(end - start + 1) % 3 == 0")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        gtf_file = os.path.join(tempdir, "bench.gtf")
+        write_gtf(gtf_file, args.records)
+        features = [feature for feature, _ in GFF_Reader(gtf_file)]
+
+    timings = {}
+    for name, func in (("eval(str)", eval_string), ("Expression", eval_compiled)):
+        timings[name] = best_time(
+            lambda: func(args.expression, features), args.repeat)
+    report(timings, args.records, "eval(str)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Compare textwrap.fill and pygff.fasta on writing FASTA records.
+
+The minus strand sequences are reverse complemented with pyfaidx, as
+`gfftools seq` did before, or with pygff.sequences.reverse_complement.
+Both ways must give byte-identical output.
+
+Usage: python benchmarks/bench_fasta.py [-n RECORDS] [-s SIZE]
+"""
+
+import argparse
+import random
+import textwrap
+
+from pyfaidx import complement
+
+from pygff.fasta import format_record
+from pygff.sequences import reverse_complement
+
+from common import best_time, report
+
+
+def format_textwrap(sequences, line_length):
+    # The formatting used before pygff.fasta
+    chunks = []
+    for i, sequence in enumerate(sequences):
+        if i % 2:
+            sequence = complement(sequence)[::-1]
+        sequence = textwrap.fill(sequence, line_length)
+        chunks.append((">seq%d\n" % i + sequence + "\n\n").encode("UTF-8"))
+    return b"".join(chunks)
+
+
+def format_fasta(sequences, line_length):
+    chunks = []
+    for i, sequence in enumerate(sequences):
+        if i % 2:
+            sequence = reverse_complement(sequence)
+        chunks.append(format_record("seq%d" % i, sequence, line_length))
+    return b"".join(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--records", type=int, default=100)
+    parser.add_argument("-s", "--size", type=int, default=100000,
+                        help="Length of each sequence.")
+    parser.add_argument("-l", "--line-length", type=int, default=60)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    sequences = [
+        "".join(rng.choices("ACGTNacgtn", k=args.size))
+        for _ in range(args.records)]
+
+    if (format_textwrap(sequences, args.line_length)
+            != format_fasta(sequences, args.line_length)):
+        raise SystemExit("Error: the outputs differ.")
+
+    timings = {}
+    for name, func in (("textwrap", format_textwrap), ("pygff.fasta", format_fasta)):
+        timings[name] = best_time(
+            lambda: func(sequences, args.line_length), args.repeat)
+    report(timings, args.records, "textwrap")
+
+
+if __name__ == "__main__":
+    main()
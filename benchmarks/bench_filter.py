@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""Compare filtering fully parsed records with the staged GFF_Filter.
+
+Usage: python benchmarks/bench_filter.py [-n RECORDS] [-i SEQID] [-t TYPE]
+"""
+
+import argparse
+import os
+import tempfile
+
+from pygff.reader import GFF_Reader
+from pygff.filter import GFF_Filter, FilterChain
+
+from common import write_gtf, best_time, report
+
+
+def filter_parsed(gff_file, params):
+    # Parse every field of every record before filtering, like GFF_Filter
+    # did before the raw line stage and lazy records.
+    filter_chain = FilterChain(params)
+    lines = []
+    for feature, raw_line in GFF_Reader(gff_file):
+        feature.attr, feature.iv, feature.score, feature.frame
+        if filter_chain.validate(feature):
+            lines.append(raw_line)
+    return lines
+
+
+def filter_staged(gff_file, params):
+    return [raw_line for _, raw_line in GFF_Filter(gff_file, params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--records", type=int, default=200000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-i", "--seqid", action="append", default=[])
+    parser.add_argument("-t", "--type", action="append", default=[])
+    args = parser.parse_args()
+    params = {"seqid": args.seqid or ["1"], "type": args.type or ["CDS"]}
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        gtf_file = os.path.join(tempdir, "bench.gtf")
+        write_gtf(gtf_file, args.records)
+        if filter_parsed(gtf_file, params) != filter_staged(gtf_file, params):
+            raise SystemExit("Outputs of the two filters differ.")
+        timings = {}
+        for name, func in (("parsed", filter_parsed), ("staged", filter_staged)):
+            timings[name] = best_time(
+                lambda: func(gtf_file, params), args.repeat)
+    report(timings, args.records, "parsed")
+
+
+if __name__ == "__main__":
+    main()
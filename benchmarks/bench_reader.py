@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""Compare text mode line reading with the block and mmap readers.
+
+Usage: python benchmarks/bench_reader.py [-n RECORDS] [-t TYPE]
+"""
+
+import argparse
+import io
+import os
+import re
+import tempfile
+
+from pygff.reader import GFF_Reader
+from pygff.filter import GFF_Filter, FilterChain
+from pygff.bgzf import open_input
+
+from common import write_gtf, best_time, report
+
+
+def text_mode_lines(gff_file):
+    # GFF_Reader.iter_lines before block reading: a TextIOWrapper over the
+    # binary stream, with the directive regex compiled for each "##" line.
+    stream, raw = open_input(gff_file)
+    with io.TextIOWrapper(stream, encoding="UTF-8") as lines:
+        line_no = 1
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode()
+            if line == "\n":
+                pass
+            elif line.startswith("#"):
+                if line.startswith("##"):
+                    re.compile(r"##\s*(\S+)\s+(\S*)").match(line)
+            else:
+                yield line
+            line_no += 1
+    raw.close()
+
+
+def read_text_mode(gff_file, params):
+    return list(text_mode_lines(gff_file))
+
+
+def read_blocks(gff_file, params):
+    return list(GFF_Reader(gff_file).iter_lines())
+
+
+def filter_text_mode(gff_file, params):
+    validate_line = FilterChain(params).validate_line
+    return [line for line in text_mode_lines(gff_file) if validate_line(line)]
+
+
+def filter_blocks(gff_file, params):
+    return list(GFF_Filter(gff_file, params).iter_valid_lines())
+
+
+def filter_raw(gff_file, params):
+    return list(GFF_Filter(gff_file, params).iter_raw_lines())
+
+
+def filter_mmap(gff_file, params):
+    return list(GFF_Filter(gff_file, params, use_mmap=True).iter_raw_lines())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--records", type=int, default=500000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-t", "--type", action="append", default=[])
+    args = parser.parse_args()
+    params = {"type": args.type or ["CDS"]}
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        gtf_file = os.path.join(tempdir, "bench.gtf")
+        write_gtf(gtf_file, args.records)
+        size = os.stat(gtf_file).st_size
+        for baseline, func in ((read_text_mode, read_blocks),
+                               (filter_text_mode, filter_blocks)):
+            if baseline(gtf_file, params) != func(gtf_file, params):
+                raise SystemExit("Lines of the two readers differ.")
+        expected = [line.encode() for line in filter_blocks(gtf_file, params)]
+        for func in (filter_raw, filter_mmap):
+            if func(gtf_file, params) != expected:
+                raise SystemExit("Raw lines differ from decoded lines.")
+        timings = {}
+        for name, func in (("read text", read_text_mode),
+                           ("read blocks", read_blocks),
+                           ("filter text", filter_text_mode),
+                           ("filter blocks", filter_blocks),
+                           ("filter raw", filter_raw),
+                           ("filter mmap", filter_mmap)):
+            timings[name] = best_time(
+                lambda: func(gtf_file, params), args.repeat)
+    report(timings, args.records, "read text")
+    for name, seconds in timings.items():
+        print("%-12s %8.1f MB/s" % (name, size / seconds / 1024 / 1024))
+
+
+if __name__ == "__main__":
+    main()
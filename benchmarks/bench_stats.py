@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""Compare counting stats over GFF_Reader records with the raw byte counter.
+
+Usage: python benchmarks/bench_stats.py [-n RECORDS]
+"""
+
+import argparse
+import os
+import tempfile
+from collections import defaultdict
+
+from pygff.reader import GFF_Reader
+from pygff.stats import FeatureStats, count_file
+
+from common import write_gtf, best_time, report
+
+
+def stats_reader(gff_file):
+    # stats_action before the counting engine: build a record for every
+    # line, then split the raw line again.
+    summary = {
+        "seqname": defaultdict(int),
+        "source": defaultdict(int),
+        "types": defaultdict(int),
+        "strand": defaultdict(int),
+        "phase": defaultdict(int)
+    }
+    for _, line in GFF_Reader(gff_file):
+        (seqname, source, feature_type, start, end, score,
+            strand, frame, attributeStr) = line.split("\t", 8)
+        summary["seqname"][seqname] += 1
+        summary["source"][source] += 1
+        summary["types"][feature_type] += 1
+        summary["strand"][strand] += 1
+        summary["phase"][frame] += 1
+    return summary
+
+
+def stats_counter(gff_file):
+    return count_file(gff_file, FeatureStats()).summary()
+
+
+def stats_metrics(gff_file):
+    return count_file(gff_file, FeatureStats(True, True)).summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--records", type=int, default=500000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        gtf_file = os.path.join(tempdir, "bench.gtf")
+        write_gtf(gtf_file, args.records)
+        if stats_reader(gtf_file) != stats_counter(gtf_file):
+            raise SystemExit("Outputs of the two counters differ.")
+        timings = {}
+        for name, func in (("reader", stats_reader),
+                           ("counter", stats_counter),
+                           ("metrics", stats_metrics)):
+            timings[name] = best_time(lambda: func(gtf_file), args.repeat)
+    report(timings, args.records, "reader")
+
+
+if __name__ == "__main__":
+    main()
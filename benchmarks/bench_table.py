@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""Compare scanning a GFF file with filtering a loaded GFFTable.
+
+Usage: python benchmarks/bench_table.py [-n RECORDS] [-i SEQID] [-t TYPE]
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+
+import numpy as np
+
+from pygff.filter import GFF_Filter, FilterChain
+from pygff.table import GFFTable
+
+from common import write_gtf, best_time, report
+
+
+def filter_scan(gff_file, params):
+    return list(GFF_Filter(gff_file, params).iter_raw_lines())
+
+
+def filter_table(table, params):
+    rows = np.flatnonzero(FilterChain(params).mask(table))
+    return list(table.iter_raw_lines(rows))
+
+
+def table_nbytes(table):
+    arrays = [table.start, table.end, table.score, table.phase,
+              table.offsets]
+    arrays.extend(column.codes for column in (
+        table.seqid, table.source, table.type, table.strand))
+    arrays.extend(column.codes for column in table.attributes.values())
+    return sum(array.nbytes for array in arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--records", type=int, default=500000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-i", "--seqid", action="append", default=[])
+    parser.add_argument("-t", "--type", action="append", default=[])
+    args = parser.parse_args()
+    params = {"seqid": args.seqid or ["1", "2"], "type": args.type or ["CDS"],
+              "region": ["1:1000-2000000"]}
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        gtf_file = os.path.join(tempdir, "bench.gtf")
+        write_gtf(gtf_file, args.records)
+        file_size = os.path.getsize(gtf_file)
+        load_seconds = min(timeit.repeat(
+            lambda: GFFTable.from_file(gtf_file), number=1, repeat=1))
+        table = GFFTable.from_file(gtf_file)
+        if filter_scan(gtf_file, params) != filter_table(table, params):
+            raise SystemExit("Outputs of scan and table differ.")
+        timings = {
+            "scan": best_time(lambda: filter_scan(gtf_file, params), args.repeat),
+            "table": best_time(lambda: filter_table(table, params), args.repeat),
+        }
+    print("load %.3f s, %.1f MB of columns, %.1f MB of file" % (
+        load_seconds, table_nbytes(table) / 1e6, file_size / 1e6))
+    report(timings, args.records, "scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Helpers shared by the benchmark scripts."""
+
+import timeit
+
+FEATURE_TYPES = ("gene", "transcript", "exon", "CDS", "exon", "CDS")
+
+
+def write_gtf(path, n_records, n_seqids=20):
+    """Write a GTF file with `n_records` records spread over `n_seqids`."""
+    per_seqid = max(1, n_records // n_seqids)
+    with open(path, "w") as f:
+        for i in range(n_records):
+            seqid = str(i // per_seqid + 1)
+            start = (i % per_seqid) * 100 + 1
+            f.write(
+                '%s\tbench\t%s\t%d\t%d\t.\t%s\t.\tgene_id "G%d"; '
+                'transcript_id "T%d"; gene_biotype "protein_coding";\n' % (
+                    seqid, FEATURE_TYPES[i % len(FEATURE_TYPES)],
+                    start, start + 49, "+-"[i // 6 % 2], i // 6, i // 3))
+
+
+def best_time(func, repeat=3):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def report(timings, n_records, baseline):
+    for name, seconds in timings.items():
+        print("%-12s %8.3f s %12.0f records/s %6.1fx" % (
+            name, seconds, n_records / seconds, timings[baseline] / seconds))
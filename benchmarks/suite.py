@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+"""Time gfftools subcommands and filters on a synthetic annotation.
+
+Each benchmark runs `gfftools` in a fresh process, with its output sent to
+/dev/null, and records the best time of `--repeat` runs and the peak
+resident memory of the process. `--save` writes the results to a JSON
+file, and `--compare` prints them next to the results of an earlier run,
+marking benchmarks slower by more than `--threshold`. Nothing is
+downloaded, so the suite can be run offline before a release.
+
+Usage:
+    python benchmarks/suite.py [-n RECORDS] [-k PATTERN] [--save FILE]
+                               [--compare FILE] [--data DIR]
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from synthetic import write_annotation, write_genome
+
+# Seqid used by region and sequence benchmarks
+SEQID = "1"
+
+# (name, arguments of gfftools, setup), formatted with the paths of the data
+# files. Each benchmark starts without an index or cache of the data files;
+# setup is a list of gfftools commands which are run before it, to build
+# those it uses.
+BENCHMARKS: List[Tuple[str, List[str], List[List[str]]]] = [
+    ("stats", ["stats", "{gtf}"], []),
+    ("filter seqid", ["filter", "-i", SEQID, "{gtf}"], []),
+    ("filter source", ["filter", "-s", "havana", "{gtf}"], []),
+    ("filter type", ["filter", "-t", "exon", "{gtf}"], []),
+    ("filter strand", ["filter", "--strand", "-", "{gtf}"], []),
+    ("filter attributes", [
+        "filter", "-a", "gene_biotype=lncRNA", "{gtf}"], []),
+    ("filter values file", [
+        "filter", "--values-file", "gene_id={ids}", "{gtf}"], []),
+    ("filter region", ["filter", "-r", SEQID + ":1-5000000", "{gtf}"], []),
+    ("filter expression", [
+        "filter", "-e", "end - start + 1 > 300", "{gtf}"], []),
+    ("filter print field", [
+        "filter", "-t", "gene", "-p", "gene_id", "{gtf}"], []),
+    ("filter with children", [
+        "filter", "--with-children", "-t", "gene", "-a", "biotype=lncRNA",
+        "{gff3}"], []),
+    ("filter -j 4", ["filter", "-j", "4", "-t", "exon", "{gtf}"], []),
+    ("conv", ["conv", "{gff3}"], []),
+    ("conv -j 4", ["conv", "-j", "4", "{gff3}"], []),
+    ("seq", [
+        "seq", "-g", "{fasta}", "-i", SEQID, "-t", "gene", "-L", "60",
+        "{gtf}"], []),
+    ("seq prefetch", [
+        "seq", "--prefetch", "-g", "{fasta}", "-i", SEQID, "-t", "gene",
+        "-L", "60", "{gtf}"], []),
+    ("seq spliced cds", [
+        "seq", "--spliced", "cds", "--translate", "-g", "{fasta}", "-i", SEQID,
+        "{gtf}"], []),
+    ("index", ["index", "{gtf}"], []),
+    ("filter region indexed", [
+        "filter", "-r", SEQID + ":1-5000000", "{gtf}"], [["index", "{gtf}"]]),
+    ("cache build", ["cache", "build", "{gtf}"], []),
+    ("filter type cached", [
+        "filter", "-t", "exon", "{gtf}"], [["cache", "build", "{gtf}"]]),
+]
+
+# Run in a child process: time `cli()` and report the peak memory
+CHILD = """
+import json, os, resource, sys, time
+from pygff.main import cli
+argv, repeat = json.loads(sys.argv[1]), int(sys.argv[2])
+devnull = os.open(os.devnull, os.O_WRONLY)
+stdout = os.dup(1)
+os.dup2(devnull, 1)
+times = []
+for _ in range(repeat):
+    sys.argv = ["gfftools"] + argv
+    start = time.perf_counter()
+    try:
+        cli()
+    except SystemExit as e:
+        if e.code:
+            raise
+    sys.stdout.flush()
+    times.append(time.perf_counter() - start)
+os.write(stdout, json.dumps({
+    "seconds": min(times),
+    "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}).encode())
+"""
+
+
+def prepare_data(directory: str, n_records: int, seed: int) -> Dict[str, str]:
+    """Write the data files for `n_records`, unless they already exist."""
+    prefix = os.path.join(directory, "synthetic-%d-%d" % (n_records, seed))
+    paths = {
+        "gff3": prefix + ".gff3", "gtf": prefix + ".gtf",
+        "fasta": prefix + ".fa", "ids": prefix + ".ids"}
+    if not all(os.path.exists(path) for path in paths.values()):
+        lengths = write_annotation(prefix, n_records, seed=seed)
+        # Sequence benchmarks only read the first seqid
+        write_genome(paths["fasta"], {SEQID: lengths[SEQID]}, seed)
+        with open(paths["ids"], "w") as f:
+            for i in range(1, max(2, n_records // 100), 10):
+                f.write("G%07d\n" % i)
+    return paths
+
+
+def remove_indexes(paths: Dict[str, str], cache_dir: str):
+    """Remove the index, cache and FASTA index of the data files."""
+    for path in (paths["gtf"] + ".gfi", paths["fasta"] + ".fai"):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def run_benchmark(
+    argv: List[str], repeat: int, env: Dict[str, str]
+) -> Dict[str, float]:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, json.dumps(argv), str(repeat)],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode:
+        raise RuntimeError(
+            "gfftools %s failed:\n%s" % (" ".join(argv), result.stderr.decode()))
+    return json.loads(result.stdout)
+
+
+def compare(
+    results: Dict, baseline: Dict, threshold: float
+) -> List[str]:
+    """Print the results next to `baseline`, return the slower benchmarks."""
+    regressions = []
+    print("%-24s %10s %10s %7s %9s %9s" % (
+        "benchmark", "seconds", "baseline", "ratio", "peak MB", "baseline"))
+    for name, result in results["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            print("%-24s %10.3f %10s %7s %9.1f %9s" % (
+                name, result["seconds"], "-", "-", result["peak_mb"], "-"))
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            regressions.append(name)
+        print("%-24s %10.3f %10.3f %6.2fx %9.1f %9.1f%s" % (
+            name, result["seconds"], before["seconds"], ratio,
+            result["peak_mb"], before["peak_mb"], flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--records", type=int, default=100000,
+                        help="Records of the synthetic annotation, 1000 to "
+                        "10000000. (default: %(default)s)")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-k", "--select", action="append", default=[],
+                        metavar="PATTERN",
+                        help="Only run benchmarks whose name matches PATTERN, "
+                        "such as 'filter*'.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", default=None, metavar="DIR",
+                        help="Keep the data files in DIR, and reuse them in "
+                        "later runs. A temporary directory by default.")
+    parser.add_argument("--save", default=None, metavar="FILE",
+                        help="Write the results to FILE as JSON.")
+    parser.add_argument("--compare", default=None, metavar="FILE",
+                        help="Compare the results with those saved in FILE.")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown reported as a regression. "
+                        "(default: %(default)s)")
+    args = parser.parse_args()
+
+    data_dir = args.data or tempfile.mkdtemp(prefix="pygff-bench-")
+    os.makedirs(data_dir, exist_ok=True)
+    cache_dir = os.path.join(data_dir, "cache")
+    try:
+        start = time.perf_counter()
+        paths = prepare_data(data_dir, args.records, args.seed)
+        print("Data: %s (%.1f s)" % (data_dir, time.perf_counter() - start),
+              file=sys.stderr)
+        env = dict(os.environ, PYGFF_CACHE_DIR=cache_dir)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env["PYTHONPATH"] = os.pathsep.join(
+            [root] + [p for p in [env.get("PYTHONPATH")] if p])
+
+        results = {
+            "records": args.records,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "benchmarks": {},
+        }
+        for name, argv, setup in BENCHMARKS:
+            if args.select and not any(
+                    fnmatch.fnmatch(name, pattern) for pattern in args.select):
+                continue
+            remove_indexes(paths, cache_dir)
+            # Setup runs in its own process, to leave out its peak memory
+            for setup_argv in setup:
+                run_benchmark(
+                    [arg.format(**paths) for arg in setup_argv], 1, env)
+            argv = [arg.format(**paths) for arg in argv]
+            result = run_benchmark(argv, args.repeat, env)
+            results["benchmarks"][name] = result
+            if not args.compare:
+                print("%-24s %8.3f s %12.0f records/s %9.1f MB" % (
+                    name, result["seconds"], args.records / result["seconds"],
+                    result["peak_mb"]))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        if args.data is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("records") != args.records:
+            print("Warning: the baseline was run with %s records." %
+                  baseline.get("records"), file=sys.stderr)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""Write a synthetic annotation in GFF3 and GTF, and its genome in FASTA.
+
+Gene models are drawn from a seeded random generator, so the same
+arguments always give the same files. Each gene has one to three
+transcripts, each with one to six exons and their CDS. Records are sorted
+by seqid and start, parents before children, and GFF3 IDs carry the type
+prefixes of Ensembl files ("gene:", "transcript:", "CDS:").
+
+Usage: python benchmarks/synthetic.py [-n RECORDS] [--seed SEED] OUT_PREFIX
+"""
+
+import argparse
+import random
+from typing import Dict, Iterator, List, Tuple
+
+# Biotypes of genes, with their weights
+BIOTYPES = (("protein_coding", 6), ("lncRNA", 3), ("pseudogene", 1))
+
+SOURCES = ("ensembl", "havana")
+
+# Number of bases per line of the FASTA file
+FASTA_LINE_LENGTH = 60
+
+# A record: (seqid, source, type, start, end, strand, phase, GFF3 attributes,
+# GTF attributes), coordinates 1-based and inclusive
+Record = Tuple[str, str, str, int, int, str, str, str, str]
+
+
+def gene_model(
+    rng: random.Random, seqid: str, start: int, number: int
+) -> List[Record]:
+    """Records of a gene starting at `start`, sorted by start."""
+    gene_id = "G%07d" % number
+    source = rng.choice(SOURCES)
+    strand = rng.choice("+-")
+    biotype = rng.choices(
+        [b for b, _ in BIOTYPES], [w for _, w in BIOTYPES])[0]
+    gene_gtf = 'gene_id "%s"; gene_biotype "%s";' % (gene_id, biotype)
+    records = []
+    gene_end = start
+    for t in range(rng.randint(1, 3)):
+        transcript_id = "%s.%d" % (gene_id.replace("G", "T", 1), t + 1)
+        n_exons = rng.randint(1, 6)
+        exons = []
+        position = start + rng.randint(0, 200)
+        for _ in range(n_exons):
+            length = rng.randint(50, 400)
+            exons.append((position, position + length - 1))
+            position += length + rng.randint(80, 800)
+        t_start, t_end = exons[0][0], exons[-1][1]
+        gene_end = max(gene_end, t_end)
+        transcript_gtf = '%s transcript_id "%s";' % (gene_gtf, transcript_id)
+        records.append((
+            seqid, source, "mRNA", t_start, t_end, strand, ".",
+            "ID=transcript:%s;Parent=gene:%s;biotype=%s" % (
+                transcript_id, gene_id, biotype),
+            transcript_gtf))
+        # Coding bases before each CDS, in the direction of transcription
+        coding = 0
+        ordered = exons if strand == "+" else exons[::-1]
+        for i, (e_start, e_end) in enumerate(ordered):
+            records.append((
+                seqid, source, "exon", e_start, e_end, strand, ".",
+                "Parent=transcript:%s;Name=E%s.%d;exon_number=%d" % (
+                    transcript_id, transcript_id[1:], i + 1, i + 1),
+                '%s exon_number "%d";' % (transcript_gtf, i + 1)))
+            if biotype != "protein_coding":
+                continue
+            phase = (3 - coding % 3) % 3
+            records.append((
+                seqid, source, "CDS", e_start, e_end, strand, str(phase),
+                "ID=CDS:P%s;Parent=transcript:%s" % (
+                    transcript_id[1:], transcript_id),
+                '%s exon_number "%d";' % (transcript_gtf, i + 1)))
+            coding += e_end - e_start + 1
+    records.insert(0, (
+        seqid, source, "gene", start, gene_end, strand, ".",
+        "ID=gene:%s;Name=gene%d;biotype=%s" % (gene_id, number, biotype),
+        gene_gtf))
+    # Stable, so parents stay before children starting at the same base
+    records.sort(key=lambda record: record[3])
+    return records
+
+
+def iter_records(
+    n_records: int, n_seqids: int = 20, seed: int = 0
+) -> Iterator[Record]:
+    """Exactly `n_records` records, spread evenly over `n_seqids`."""
+    rng = random.Random(seed)
+    per_seqid = max(1, -(-n_records // n_seqids))
+    n_written, number = 0, 0
+    for s in range(n_seqids):
+        seqid = str(s + 1)
+        position = 1
+        target = min(n_records, (s + 1) * per_seqid)
+        while n_written < target:
+            number += 1
+            records = gene_model(rng, seqid, position, number)
+            for record in records[:target - n_written]:
+                yield record
+            n_written += min(len(records), target - n_written)
+            position = max(r[4] for r in records) + rng.randint(200, 2000)
+
+
+def write_annotation(
+    prefix: str, n_records: int, n_seqids: int = 20, seed: int = 0
+) -> Dict[str, int]:
+    """Write PREFIX.gff3 and PREFIX.gtf, return the length of each seqid."""
+    lengths: Dict[str, int] = {}
+    with open(prefix + ".gff3", "w") as gff3, open(prefix + ".gtf", "w") as gtf:
+        gff3.write("##gff-version 3\n")
+        for record in iter_records(n_records, n_seqids, seed):
+            seqid, source, type_, start, end, strand, phase, attr3, attr2 = record
+            columns = "%s\t%s\t%s\t%d\t%d\t.\t%s\t%s\t" % (
+                seqid, source, type_, start, end, strand, phase)
+            gff3.write(columns + attr3 + "\n")
+            gtf.write(columns.replace("\tmRNA\t", "\ttranscript\t") + attr2 + "\n")
+            lengths[seqid] = max(lengths.get(seqid, 0), end)
+    return lengths
+
+
+def write_genome(
+    filename: str, lengths: Dict[str, int], seed: int = 0, padding: int = 1000
+):
+    """Write random sequences of `lengths` plus `padding` bases."""
+    rng = random.Random(seed)
+    # Random bytes to bases
+    table = bytes(b"ACGT"[b & 3] for b in range(256))
+    chunk_size = FASTA_LINE_LENGTH * 1000
+    with open(filename, "wb") as f:
+        for seqid, length in lengths.items():
+            f.write(b">" + seqid.encode() + b"\n")
+            length += padding
+            for start in range(0, length, chunk_size):
+                n = min(chunk_size, length - start)
+                sequence = rng.getrandbits(n * 8).to_bytes(
+                    n, "little").translate(table)
+                f.write(b"\n".join(
+                    sequence[i:i + FASTA_LINE_LENGTH]
+                    for i in range(0, n, FASTA_LINE_LENGTH)) + b"\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("prefix", metavar="OUT_PREFIX",
+                        help="Write OUT_PREFIX.gff3, .gtf and .fa.")
+    parser.add_argument("-n", "--records", type=int, default=100000)
+    parser.add_argument("--seqids", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-genome", dest="genome", action="store_false",
+                        help="Do not write the FASTA file.")
+    args = parser.parse_args()
+    lengths = write_annotation(args.prefix, args.records, args.seqids, args.seed)
+    if args.genome:
+        write_genome(args.prefix + ".fa", lengths, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Parsing of the attributes column of GTF and GFF3 records.
+
+GTF attributes are `key "value"` pairs, and GFF3 attributes `key=value`
+pairs, separated by semicolons. An `AttributeParser` detects the dialect of
+a file from the first record which tells, and then splits the attributes of
+each record with the string methods of that dialect. As with
+`HTSeq.parse_GFF_attribute_string`, values enclosed in double quotes are
+unquoted, semicolons within quotes do not separate attributes, and the last
+value of a repeated key is kept.
+
+Given `keys`, only these attributes are returned: each key is looked up
+with `str.rfind`, and the attributes are only split in the rare cases
+where the value found could be read differently, see `find_value`.
+"""
+
+import re
+import sys
+from typing import Callable, Collection, Dict, List, Optional
+
+from pygff.profiling import active_profiler, profile_calls
+
+GTF = "gtf"
+GFF3 = "gff3"
+
+# Name of a record without attributes, as in HTSeq
+UNNAMED = "_unnamed_"
+
+# An attribute of either dialect, as matched by HTSeq
+ATTRIBUTE_PAIR = re.compile(r"\s*([^\s=]+)[\s=]+(.*)", re.DOTALL)
+
+intern = sys.intern
+
+
+def detect_dialect(text: str) -> Optional[str]:
+    """GTF or GFF3, from the first attribute of a record.
+
+    Returns None if the attributes do not tell, such as ".".
+    """
+    for piece in text.split(";"):
+        words = piece.split(None, 1)
+        if not words or words == ["."]:
+            continue
+        if words[0].find("=") > 0:
+            return GFF3
+        if len(words) == 2:
+            return GTF
+        return None
+    return None
+
+
+def split_attributes(text: str) -> List[str]:
+    """Split attributes at semicolons which are not within quotes."""
+    pieces = text.split(";")
+    if '"' not in text:
+        return pieces
+    merged: List[str] = []
+    for piece in pieces:
+        if merged and merged[-1].count('"') % 2:
+            merged[-1] += ";" + piece
+        else:
+            merged.append(piece)
+    return merged
+
+
+def unquote(value: str) -> str:
+    if len(value) > 1 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def split_pair(piece: str):
+    """Key and value of an attribute whose form is not that of the dialect."""
+    match = ATTRIBUTE_PAIR.match(piece)
+    if match is None:
+        raise ValueError("Failure parsing GFF attribute: %r" % piece)
+    return match.group(1), match.group(2).strip()
+
+
+def parse_gtf_pair(piece: str):
+    key, _, value = piece.partition(" ")
+    if not value or "=" in key or "\t" in key:
+        return split_pair(piece)
+    return key, value.strip()
+
+
+def parse_gff3_pair(piece: str):
+    key, sep, value = piece.partition("=")
+    if not sep or " " in key or "\t" in key:
+        return split_pair(piece)
+    return key, value.strip()
+
+
+def parse_pieces(text: str, parse_pair: Callable) -> Dict[str, str]:
+    attributes: Dict[str, str] = {}
+    for piece in split_attributes(text):
+        piece = piece.strip()
+        if not piece or piece == ".":
+            continue
+        key, value = parse_pair(piece)
+        attributes[intern(key)] = unquote(value)
+    return attributes
+
+
+def find_value(text: str, key: str):
+    """Value of the last attribute `key`, found without splitting the others.
+
+    Returns None if there is no such attribute, and AMBIGUOUS if its value
+    contains a quoted semicolon or starts with several separators.
+    """
+    end = len(text)
+    while True:
+        pos = text.rfind(key, 0, end)
+        if pos < 0:
+            return None
+        end = pos
+        # The key must start an attribute, and be followed by a separator
+        start = pos
+        while start and text[start - 1] in " \t":
+            start -= 1
+        if start and text[start - 1] != ";":
+            continue
+        after = pos + len(key)
+        if after == len(text) or text[after] not in " \t=":
+            continue
+        if text.count('"', 0, pos) % 2:
+            # Within a quoted value
+            continue
+        value_end = text.find(";", after)
+        value = text[after + 1:value_end if value_end >= 0 else len(text)]
+        # Several separators are read differently by each dialect
+        if value.count('"') % 2 or (value and value[0] in " \t="):
+            return AMBIGUOUS
+        return unquote(value.strip())
+
+
+# Returned by `find_value` when the attributes must be split
+AMBIGUOUS = object()
+
+
+def project(
+    text: str, keys: Collection[str], parse_pair: Callable
+) -> Dict[str, str]:
+    """Parse the attributes of `keys` only."""
+    attributes: Dict[str, str] = {}
+    for key in keys:
+        value = find_value(text, key)
+        if value is AMBIGUOUS:
+            parsed = parse_pieces(text, parse_pair)
+            return {key: parsed[key] for key in keys if key in parsed}
+        if value is not None:
+            attributes[key] = value
+    return attributes
+
+
+def parse_gtf(
+    text: str, keys: Optional[Collection[str]] = None
+) -> Dict[str, str]:
+    if keys is not None:
+        return project(text, keys, parse_gtf_pair)
+    return parse_pieces(text, parse_gtf_pair)
+
+
+def parse_gff3(
+    text: str, keys: Optional[Collection[str]] = None
+) -> Dict[str, str]:
+    if keys is not None:
+        return project(text, keys, parse_gff3_pair)
+    return parse_pieces(text, parse_gff3_pair)
+
+
+def parse_unknown(
+    text: str, keys: Optional[Collection[str]] = None
+) -> Dict[str, str]:
+    if keys is not None:
+        return project(text, keys, split_pair)
+    return parse_pieces(text, split_pair)
+
+
+PARSERS = {GTF: parse_gtf, GFF3: parse_gff3, None: parse_unknown}
+
+
+def parse_attributes(
+    text: str, keys: Optional[Collection[str]] = None,
+    dialect: Optional[str] = None
+) -> Dict[str, str]:
+    """Parse the attributes of one record, detecting its dialect if not given."""
+    if dialect is None:
+        dialect = detect_dialect(text)
+    return PARSERS[dialect](text, keys)
+
+
+class AttributeParser(object):
+    """Parse the attributes of the records of one file.
+
+    Unless `dialect` is given, it is detected from the first record whose
+    attributes tell, and used for all following records.
+    """
+
+    def __init__(self, dialect: Optional[str] = None):
+        self.dialect = dialect
+        self.parse_dialect = PARSERS[dialect]
+        if active_profiler() is not None:
+            self.parse = profile_calls("attributes", self.parse)
+
+    def parse(
+        self, text: str, keys: Optional[Collection[str]] = None
+    ) -> Dict[str, str]:
+        if self.dialect is None:
+            dialect = detect_dialect(text)
+            if dialect is None:
+                return parse_unknown(text, keys)
+            self.dialect = dialect
+            self.parse_dialect = PARSERS[dialect]
+        return self.parse_dialect(text, keys)
@@ -0,0 +1,266 @@
+"""Reading of gzip and BGZF compressed files, and writing of BGZF files.
+
+BGZF (used by samtools, tabix and bgzip) is a series of gzip members
+("blocks") of at most 64 KiB each, whose headers store the compressed
+size of the block. Blocks can be located without decompressing them, so
+`BGZFReader` decompresses many blocks at once on a thread pool, and
+`BGZFWriter` compresses them on a thread pool in the same way.
+"""
+
+import gzip
+import io
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional, Tuple
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# ID1, ID2, CM, FLG, MTIME, XFL, OS, XLEN of a BGZF block header
+BGZF_HEADER = struct.Struct("<4BI2BH")
+
+# Largest amount of data in a block, so the compressed block fits in 64 KiB
+MAX_BLOCK_SIZE = 0xff00
+
+# The empty block which ends a BGZF file
+EOF_BLOCK = bytes.fromhex(
+    "1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+# Number of threads used for decompression by default
+DEFAULT_THREADS = min(8, os.cpu_count() or 1)
+
+
+class BGZFError(IOError):
+    pass
+
+
+def is_gzip(filename: str) -> bool:
+    with open(filename, "rb") as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def is_bgzf(filename: str) -> bool:
+    with open(filename, "rb") as f:
+        header = f.read(18)
+    # FEXTRA flag set, and a 'BC' subfield of 2 bytes in the extra field
+    return (len(header) == 18 and header[:4] == b"\x1f\x8b\x08\x04"
+            and header[12:16] == b"BC\x02\x00")
+
+
+def read_block(fileobj: BinaryIO) -> Optional[Tuple[bytes, int, int]]:
+    """Read the next BGZF block without decompressing it.
+
+    Returns a tuple of raw deflate data, CRC32 and size of the decompressed
+    data, or None at the end of the file.
+    """
+    header = fileobj.read(BGZF_HEADER.size)
+    if not header:
+        return None
+    if len(header) < BGZF_HEADER.size:
+        raise BGZFError("Truncated BGZF block header.")
+    id1, id2, cm, flg, _, _, _, xlen = BGZF_HEADER.unpack(header)
+    if (id1, id2, cm, flg) != (0x1f, 0x8b, 8, 4):
+        raise BGZFError("Invalid BGZF block header.")
+    extra = fileobj.read(xlen)
+    block_size = None
+    pos = 0
+    while pos + 4 <= len(extra):
+        subfield_id = extra[pos:pos + 2]
+        slen = struct.unpack("<H", extra[pos + 2:pos + 4])[0]
+        if subfield_id == b"BC" and slen == 2:
+            block_size = struct.unpack("<H", extra[pos + 4:pos + 6])[0] + 1
+        pos += 4 + slen
+    if block_size is None:
+        raise BGZFError("BGZF block size is missing.")
+    data = fileobj.read(block_size - BGZF_HEADER.size - xlen - 8)
+    footer = fileobj.read(8)
+    if len(footer) < 8:
+        raise BGZFError("Truncated BGZF block.")
+    crc, isize = struct.unpack("<2I", footer)
+    return (data, crc, isize)
+
+
+def inflate_block(block: Tuple[bytes, int, int]) -> bytes:
+    data, crc, isize = block
+    # zlib releases the GIL, so blocks are decompressed in parallel
+    plain = zlib.decompress(data, -15)
+    if len(plain) != isize or zlib.crc32(plain) != crc:
+        raise BGZFError("BGZF block is corrupted.")
+    return plain
+
+
+def compress_block(data: bytes, level: int = 6) -> bytes:
+    """Compress at most `MAX_BLOCK_SIZE` bytes into a BGZF block."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    deflated = compressor.compress(data) + compressor.flush()
+    block_size = BGZF_HEADER.size + 6 + len(deflated) + 8
+    return b"".join([
+        BGZF_HEADER.pack(0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6),
+        b"BC", struct.pack("<2H", 2, block_size - 1),
+        deflated,
+        struct.pack("<2I", zlib.crc32(data), len(data)),
+    ])
+
+
+def make_virtual_offset(block_offset: int, within_block_offset: int) -> int:
+    """Make a virtual file offset as used by BGZF indexes."""
+    return (block_offset << 16) | within_block_offset
+
+
+def split_virtual_offset(virtual_offset: int) -> Tuple[int, int]:
+    return (virtual_offset >> 16, virtual_offset & 0xffff)
+
+
+class BGZFReader(io.RawIOBase):
+    """Read a BGZF file, decompressing blocks on a thread pool.
+
+    Up to `threads * 4` blocks are decompressed ahead of the reader, so the
+    memory used is bounded no matter how large the file is.
+    """
+
+    def __init__(self, filename: str, threads: int = DEFAULT_THREADS):
+        self.raw = open(filename, "rb")
+        self.threads = max(1, threads)
+        self.executor = ThreadPoolExecutor(self.threads)
+        self.pending = deque()
+        self.eof = False
+        self.block_offset = 0
+        self.buffer = b""
+        self.offset = 0
+
+    def readable(self):
+        return True
+
+    def tell_compressed(self) -> int:
+        """Position in the compressed file which has been read."""
+        return self.raw.tell()
+
+    def fill_pending(self):
+        while not self.eof and len(self.pending) < self.threads * 4:
+            block_offset = self.raw.tell()
+            block = read_block(self.raw)
+            if block is None:
+                self.eof = True
+            elif block[2] == 0:
+                # Empty block, such as the end-of-file marker
+                continue
+            else:
+                self.pending.append(
+                    (block_offset, self.executor.submit(inflate_block, block)))
+
+    def next_block(self) -> Optional[Tuple[int, bytes]]:
+        """Return the offset and decompressed data of the next block.
+
+        Returns None at the end of the file. The data returned is not
+        returned again by `read`.
+        """
+        self.fill_pending()
+        if not self.pending:
+            return None
+        block_offset, future = self.pending.popleft()
+        return (block_offset, future.result())
+
+    def readinto(self, b) -> int:
+        while self.offset >= len(self.buffer):
+            block = self.next_block()
+            if block is None:
+                return 0
+            self.block_offset, self.buffer = block
+            self.offset = 0
+        n = min(len(b), len(self.buffer) - self.offset)
+        b[:n] = self.buffer[self.offset:self.offset + n]
+        self.offset += n
+        return n
+
+    def seek_virtual(self, virtual_offset: int):
+        """Move to a virtual offset, discarding blocks read ahead."""
+        block_offset, within_block_offset = split_virtual_offset(virtual_offset)
+        for _, future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.eof = False
+        self.raw.seek(block_offset)
+        block = self.next_block()
+        self.block_offset, self.buffer = block or (block_offset, b"")
+        self.offset = within_block_offset
+
+    def close(self):
+        if not self.closed:
+            for _, future in self.pending:
+                future.cancel()
+            self.executor.shutdown()
+            self.raw.close()
+        super().close()
+
+
+class BGZFWriter(io.RawIOBase):
+    """Write a BGZF file, compressing blocks on a thread pool.
+
+    Up to `threads * 4` blocks are compressed at a time, and they are
+    written in order. Closing the writer writes the end-of-file block.
+    """
+
+    def __init__(
+            self, fileobj: BinaryIO, threads: int = DEFAULT_THREADS,
+            level: int = 6):
+        self.raw = fileobj
+        self.threads = max(1, threads)
+        self.level = level
+        self.executor = ThreadPoolExecutor(self.threads)
+        self.pending = deque()
+        self.partial = b""
+
+    def writable(self):
+        return True
+
+    def write(self, b) -> int:
+        data = self.partial + bytes(b)
+        end = len(data) - len(data) % MAX_BLOCK_SIZE
+        for start in range(0, end, MAX_BLOCK_SIZE):
+            self.submit(data[start:start + MAX_BLOCK_SIZE])
+        self.partial = data[end:]
+        return len(b)
+
+    def submit(self, data: bytes):
+        while len(self.pending) >= self.threads * 4:
+            self.raw.write(self.pending.popleft().result())
+        self.pending.append(
+            self.executor.submit(compress_block, data, self.level))
+
+    def flush(self):
+        """Write all complete blocks, the last partial block is kept."""
+        while self.pending:
+            self.raw.write(self.pending.popleft().result())
+        self.raw.flush()
+
+    def close(self):
+        if not self.closed:
+            try:
+                if self.partial:
+                    self.submit(self.partial)
+                    self.partial = b""
+                self.flush()
+                self.raw.write(EOF_BLOCK)
+                self.raw.flush()
+            finally:
+                self.executor.shutdown()
+        super().close()
+
+
+def open_input(
+    filename: str, threads: int = DEFAULT_THREADS
+) -> Tuple[BinaryIO, BinaryIO]:
+    """Open a plain, gzip or BGZF compressed file for reading.
+
+    Returns the decompressed binary stream and the underlying file, whose
+    position tells how much of the file has been read. Both must be closed.
+    """
+    if is_bgzf(filename):
+        reader = BGZFReader(filename, threads)
+        return (io.BufferedReader(reader), reader.raw)
+    raw = open(filename, "rb")
+    if raw.peek(2)[:2] == GZIP_MAGIC:
+        return (gzip.GzipFile(fileobj=raw), raw)
+    return (raw, raw)
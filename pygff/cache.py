@@ -0,0 +1,204 @@
+"""On-disk cache of parsed GFF files.
+
+The cache of a GFF file is a directory under the cache root, named after
+the SHA-1 of the absolute path of the file. It holds the columns of the
+`GFFTable` of the file as `.npy` arrays, and the distinct values of
+categorical columns as string pools (one value per line). The text of the
+lines is not copied: the offsets of the lines in the GFF file are cached,
+and lines written out as they are are read back from the file.
+`cache.json` records the path, size, mtime and inode of the GFF file when
+the cache was built, and a cache is only used while they still match the
+file.
+
+The cache root is `$PYGFF_CACHE_DIR`, or `pygff` in `$XDG_CACHE_HOME`
+(default `~/.cache`). Arrays are memory mapped when loaded.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import warnings
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+CACHE_VERSION = 2
+CACHE_DIR_ENV = "PYGFF_CACHE_DIR"
+INFO_FILE = "cache.json"
+
+
+class GFFCacheError(Exception):
+    pass
+
+
+def cache_root() -> str:
+    root = os.environ.get(CACHE_DIR_ENV)
+    if root:
+        return root
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "pygff")
+
+
+def cache_dirname(gff_file: str) -> str:
+    """Directory of the cache of a GFF file."""
+    path = os.path.realpath(gff_file)
+    key = hashlib.sha1(path.encode("UTF-8")).hexdigest()
+    return os.path.join(cache_root(), key)
+
+
+def file_key(stat: os.stat_result) -> Dict[str, int]:
+    """The attributes of a file which must not change for a cache to be used."""
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns,
+            "inode": stat.st_ino}
+
+
+def join_strings(values: List[str]) -> bytes:
+    return "\n".join(values).encode("UTF-8")
+
+
+def split_strings(pool: bytes, count: int) -> List[str]:
+    if not count:
+        return []
+    return pool.decode("UTF-8").split("\n")
+
+
+class GFFCache(object):
+    """A cache directory, see the module documentation.
+
+    `info` is the content of `cache.json`: the `path` of the GFF file, its
+    `size`, `mtime` and `inode`, the number of `rows`, the directives of
+    the file (`metadata`) and the number of values of each string pool
+    (`strings`). Other
+    entries are free for the writer of the cache.
+    """
+
+    def __init__(self, directory: str, info: Dict):
+        self.directory = directory
+        self.info = info
+        self.path = info["path"]
+        self.rows = info["rows"]
+        self.metadata = info["metadata"]
+
+    @classmethod
+    def open(cls, directory: str) -> "GFFCache":
+        try:
+            with open(os.path.join(directory, INFO_FILE), encoding="UTF-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError) as e:
+            raise GFFCacheError("Invalid cache %s: %s" % (directory, e))
+        if info.get("version") != CACHE_VERSION:
+            raise GFFCacheError("Unsupported cache version: %s" % directory)
+        return cls(directory, info)
+
+    def is_current(self) -> bool:
+        """Whether the GFF file is unchanged since the cache was built."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        key = file_key(stat)
+        return all(self.info[name] == value for name, value in key.items())
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the files of the cache."""
+        return sum(
+            entry.stat().st_size for entry in os.scandir(self.directory))
+
+    def array(self, name: str) -> np.ndarray:
+        """Memory map a cached array."""
+        return np.load(
+            os.path.join(self.directory, name + ".npy"), mmap_mode="r")
+
+    def has_array(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.directory, name + ".npy"))
+
+    def strings(self, name: str) -> List[str]:
+        with open(os.path.join(self.directory, name + ".txt"), "rb") as f:
+            return split_strings(f.read(), self.info["strings"][name])
+
+    def remove(self):
+        shutil.rmtree(self.directory)
+
+
+def write_cache(
+        gff_file: str, stat: os.stat_result, rows: int, metadata: Dict,
+        arrays: Dict[str, np.ndarray], strings: Dict[str, List[str]],
+        info: Optional[Dict] = None) -> GFFCache:
+    """Write the cache of a GFF file.
+
+    `stat` is the status of the GFF file before it was read. The cache is
+    not written if the file changed since then. The cache is written to a
+    temporary directory first, and replaces an older cache when complete.
+    """
+    if file_key(os.stat(gff_file)) != file_key(stat):
+        raise GFFCacheError(
+            "%s changed while it was read, the cache is not written." % gff_file)
+    info = dict(info or {})
+    info.update(file_key(stat))
+    info.update({
+        "version": CACHE_VERSION,
+        "path": os.path.realpath(gff_file),
+        "rows": rows,
+        "metadata": metadata,
+        "strings": {name: len(values) for name, values in strings.items()},
+    })
+    directory = cache_dirname(gff_file)
+    root = os.path.dirname(directory)
+    os.makedirs(root, exist_ok=True)
+    tempdir = tempfile.mkdtemp(prefix=".tmp-", dir=root)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tempdir, name + ".npy"), array)
+        for name, values in strings.items():
+            with open(os.path.join(tempdir, name + ".txt"), "wb") as f:
+                f.write(join_strings(values))
+        with open(os.path.join(tempdir, INFO_FILE), "w", encoding="UTF-8") as f:
+            json.dump(info, f)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.rename(tempdir, directory)
+    except BaseException:
+        shutil.rmtree(tempdir, ignore_errors=True)
+        raise
+    return GFFCache(directory, info)
+
+
+def load_cache(gff_file: str) -> Optional[GFFCache]:
+    """Open the cache of a GFF file if it exists and is up to date."""
+    directory = cache_dirname(gff_file)
+    if not os.path.exists(directory):
+        return None
+    try:
+        cache = GFFCache.open(directory)
+    except GFFCacheError as e:
+        warnings.warn("%s, the cache will be ignored." % e,
+                      category=RuntimeWarning)
+        return None
+    if not cache.is_current():
+        warnings.warn(
+            "Cache of %s is older than the GFF file and will be ignored, "
+            "run `gfftools cache build` to update it." % gff_file,
+            category=RuntimeWarning)
+        return None
+    return cache
+
+
+def iter_caches() -> Iterator[Tuple[str, Optional[GFFCache]]]:
+    """Yield the directory of each cache and the opened cache.
+
+    The cache is None if it can not be opened, e.g. it is incomplete.
+    """
+    root = cache_root()
+    if not os.path.isdir(root):
+        return
+    for entry in sorted(os.scandir(root), key=lambda entry: entry.name):
+        if not entry.is_dir():
+            continue
+        try:
+            yield (entry.path, GFFCache.open(entry.path))
+        except GFFCacheError:
+            yield (entry.path, None)
@@ -0,0 +1,280 @@
+"""Conversion of GFF3 records to GTF lines.
+
+GTF lines of exons and other children of transcripts need the gene_id of
+the gene of their transcript. Conversion reads the file twice: the first
+pass scans the 9th column of each line for ID and Parent and builds a
+`ParentIndex` of transcript -> gene, the second pass converts records. The
+order of records in the file does not matter.
+"""
+
+import os
+import re
+import sqlite3
+import tempfile
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pygff.reader import GFFRecord, iter_blocks, split_lines
+from pygff.bgzf import DEFAULT_THREADS
+from pygff.attributes import AttributeParser, GFF3
+
+# Up to this many transcripts are kept in memory by a ParentIndex
+MAX_MEMORY_ENTRIES = 2000000
+
+# Entries are moved to the database in batches of this size
+SPILL_BATCH_SIZE = 100000
+
+# ID and Parent attributes of a GFF3 line
+ATTRIBUTE_ID = re.compile(rb"(?:^|;)\s*ID=([^;\r\n]*)")
+ATTRIBUTE_PARENT = re.compile(rb"(?:^|;)\s*Parent=([^;\r\n]*)")
+
+
+def attr_to_string(attrs: Dict):
+    attr_list = []
+    for id_attr in ("gene_id", "transcript_id"):
+        if id_attr in attrs:
+            attr_list.append('%s "%s"' % (id_attr, attrs[id_attr]))
+            del attrs[id_attr]
+    attr_list.extend('%s "%s"' % item for item in attrs.items())
+    return "; ".join(attr_list)
+
+
+def split_prefix(x: str, delimiter: str) -> Tuple[str, str]:
+    try:
+        i = x.index(delimiter)
+        return (x[0:i], x[i+1:])
+    except ValueError:
+        return ("", x)
+
+
+class ConversionError(Exception):
+    pass
+
+
+def parent_id(parent: str, id_prefix: List[str], type_delimiter: str) -> Tuple[str, str]:
+    """Type and ID in GTF of the parent of a record.
+
+    The type prefix of the ID is removed unless it is in `id_prefix`.
+    """
+    parent_type, stripped_id = split_prefix(parent, type_delimiter)
+    if parent_type in id_prefix:
+        return (parent_type, parent)
+    return (parent_type, stripped_id)
+
+
+class ParentIndex(object):
+    """The gene_id of the gene of each transcript.
+
+    Transcripts are keyed by their ID without type prefix. Gene IDs are
+    interned, so the genes of many transcripts share one string. Up to
+    `max_entries` transcripts are kept in a dict, further ones are moved
+    to an SQLite database in a temporary file in `spill_dir`.
+    """
+
+    def __init__(self, max_entries=MAX_MEMORY_ENTRIES, spill_dir=None):
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.entries: Dict[str, str] = {}
+        self.genes: Dict[str, str] = {}
+        self.db = None
+        self.db_file = None
+        self.n_spilled = 0
+        self.last = (None, None)
+        # Whether `close` removes the database
+        self.owner = True
+
+    @classmethod
+    def build(
+            cls, gff_file: str, id_prefix: List[str], type_delimiter: str,
+            threads=DEFAULT_THREADS, **kwargs) -> "ParentIndex":
+        """Scan the attributes of a GFF3 file for transcripts of genes.
+
+        A record is a transcript if it has an ID and its Parent has the
+        type prefix "gene".
+        """
+        index = cls(**kwargs)
+        gene_prefix = b"gene" + type_delimiter.encode("UTF-8")
+        for block, _ in iter_blocks(gff_file, threads):
+            if gene_prefix not in block:
+                continue
+            for line in split_lines(block):
+                attributes = line.rpartition(b"\t")[2]
+                if gene_prefix not in attributes or line.startswith(b"#"):
+                    continue
+                parent = ATTRIBUTE_PARENT.search(attributes)
+                record_id = ATTRIBUTE_ID.search(attributes)
+                if parent is None or record_id is None:
+                    continue
+                parent_type, gene_id = parent_id(
+                    parent.group(1).strip().decode("UTF-8"),
+                    id_prefix, type_delimiter)
+                if parent_type == "gene":
+                    index.add(split_prefix(
+                        record_id.group(1).strip().decode("UTF-8"),
+                        type_delimiter)[1], gene_id)
+        return index
+
+    def add(self, transcript_id: str, gene_id: str):
+        self.entries[transcript_id] = self.genes.setdefault(gene_id, gene_id)
+        if len(self.entries) > self.max_entries:
+            self.spill()
+
+    def spill(self):
+        """Move the entries in memory to the database."""
+        if self.db is None:
+            fd, self.db_file = tempfile.mkstemp(
+                prefix="pygff-parents-", suffix=".sqlite", dir=self.spill_dir)
+            os.close(fd)
+            self.db = sqlite3.connect(self.db_file)
+            self.db.execute(
+                "CREATE TABLE parents (transcript TEXT PRIMARY KEY, gene TEXT)")
+        items = iter(self.entries.items())
+        while True:
+            batch = list(islice(items, SPILL_BATCH_SIZE))
+            if not batch:
+                break
+            self.db.executemany(
+                "INSERT OR REPLACE INTO parents VALUES (?, ?)", batch)
+        self.db.commit()
+        self.n_spilled += len(self.entries)
+        self.entries = {}
+        self.genes = {}
+
+    def get(self, transcript_id: str) -> Optional[str]:
+        """The gene_id of a transcript, which may have a type prefix."""
+        if self.last[0] == transcript_id:
+            return self.last[1]
+        gene_id = self.entries.get(transcript_id)
+        if gene_id is None and self.db is not None:
+            row = self.db.execute(
+                "SELECT gene FROM parents WHERE transcript = ?",
+                (transcript_id,)).fetchone()
+            if row is not None:
+                gene_id = row[0]
+        self.last = (transcript_id, gene_id)
+        return gene_id
+
+    def __len__(self) -> int:
+        return len(self.entries) + self.n_spilled
+
+    def __getstate__(self):
+        # Connections can not be pickled, see `reopen`
+        state = self.__dict__.copy()
+        state["db"] = None
+        return state
+
+    def reopen(self):
+        """Open the database read-only, in a worker process.
+
+        The index of a worker process is a copy which does not own the
+        database, so closing it does not remove the database.
+        """
+        self.owner = False
+        if self.db_file is not None:
+            self.db = sqlite3.connect(
+                "file:%s?mode=ro" % self.db_file, uri=True)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            if self.owner:
+                os.unlink(self.db_file)
+            self.db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def convert_lines(
+    lines: Iterable[str],
+    parents: ParentIndex,
+    id_prefix: List[str],
+    type_mapping: Dict[str, str],
+    type_delimiter: str
+) -> str:
+    """Convert raw lines of GFF3 records to GTF lines."""
+    parser = AttributeParser(GFF3)
+    return convert_records(
+        (GFFRecord(line, True, parser) for line in lines), parents,
+        id_prefix, type_mapping, type_delimiter)
+
+
+def convert_records(
+    records: Iterable[GFFRecord],
+    parents: ParentIndex,
+    id_prefix: List[str],
+    type_mapping: Dict[str, str],
+    type_delimiter: str
+) -> str:
+    """Convert GFF3 records, such as those of a cached table, to GTF lines."""
+    return "".join([
+        get_gtf_line(
+            feature, parents, id_prefix, type_mapping, type_delimiter)
+        for feature in records])
+
+
+def get_gtf_line(
+    feature: GFFRecord,
+    parents: ParentIndex,
+    id_prefix: List[str],
+    type_mapping: Dict[str, str],
+    type_delimiter: str
+):
+    attr_dict: Dict[str, str] = {}
+    attr_dict.update(feature.attr)
+
+    if feature.type in ("mRNA", "tRNA", "rRNA"):
+        if "transcript_id" not in attr_dict:
+            attr_dict["transcript_id"] = split_prefix(attr_dict["ID"], type_delimiter)[1]
+
+    # Fill necessary attributes with information extracted from `Parent`
+    if "Parent" in attr_dict:
+        parent_type, full_id = parent_id(
+            attr_dict["Parent"], id_prefix, type_delimiter)
+        # Fill in the required attributes for GTF format
+        if parent_type in ("transcript", "rna"):
+            attr_dict["transcript_id"] = full_id
+        elif parent_type == "gene":
+            attr_dict["gene_id"] = full_id
+
+    if "gene_id" not in attr_dict:
+        if feature.type == "gene":
+            attr_dict["gene_id"] = split_prefix(attr_dict["ID"], type_delimiter)[1]
+        else:
+            if "transcript_id" in attr_dict:
+                transcript_id = split_prefix(
+                    attr_dict["transcript_id"], type_delimiter)[1]
+                gene_id = parents.get(transcript_id)
+                if gene_id is None:
+                    raise ConversionError(
+                        "No gene found for transcript '%s' of %s record" % (
+                            transcript_id, feature.type))
+                attr_dict["gene_id"] = gene_id
+
+    # Reserve or replace ID prefix
+    for prefix in id_prefix:
+        attr_key = prefix + "_id"
+        if attr_key in attr_dict:
+            if not attr_dict[attr_key].startswith(prefix):
+                attr_dict[attr_key] = prefix + type_delimiter + attr_dict[attr_key]
+
+    # Change feature type
+    if feature.type in type_mapping:
+        feature.type = type_mapping[feature.type]
+
+    if feature.type == "exon":
+        # Check for gene_id and transcript_id exists
+        if "gene_id" not in attr_dict or "transcript_id" not in attr_dict:
+            raise ConversionError(
+                "Exon must contain both 'gene_id' and 'transcript_id'")
+
+    # Records are read with their end included, the score and phase are
+    # copied as they are
+    return "\t".join([
+        feature.seqid, feature.source, feature.type, str(feature.start),
+        str(feature.end), feature.score_string, feature.strand, feature.phase,
+        attr_to_string(attr_dict),
+    ]) + "\n"
@@ -5,4 +5,7 @@ class PositionNotSpecified(SeqExtractError):
     pass
 
 class ChromosomeNotSpecified(SeqExtractError):
-    pass
\ No newline at end of file
+    pass
+
+class ChromosomeNotFound(SeqExtractError):
+    pass
@@ -0,0 +1,56 @@
+from operator import attrgetter
+from types import CodeType
+from typing import Any, Callable, Dict, Set
+
+from pygff.reader import GFFRecord
+
+
+# Variables available to user expressions, see README.md
+FIELD_GETTERS: Dict[str, Callable[[GFFRecord], Any]] = {
+    "seqid": attrgetter("seqid"),
+    "source": attrgetter("source"),
+    "type": attrgetter("type"),
+    "start": attrgetter("start"),
+    "end": attrgetter("end"),
+    "score": attrgetter("score"),
+    "strand": attrgetter("strand"),
+    "phase": attrgetter("phase"),
+    "attributes": attrgetter("attr"),
+}
+
+
+def referenced_names(code: CodeType) -> Set[str]:
+    """Collect global names used by a code object and its nested scopes."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            names.update(referenced_names(const))
+    return names
+
+
+class Expression(object):
+    """A Python expression evaluated against GFF features.
+
+    The source is compiled once and lowered into a function whose arguments
+    are the feature variables it mentions, so evaluating it for a feature
+    only looks up these fields. For example, `attributes` is not built for
+    an expression that never uses it.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.code = compile(source, "<expression>", "eval")
+        names = referenced_names(self.code)
+        self.fields = [name for name in FIELD_GETTERS if name in names]
+        self.getters = [FIELD_GETTERS[name] for name in self.fields]
+        self.function = eval(
+            compile(
+                "lambda %s: (\n%s\n)" % (", ".join(self.fields), source),
+                "<expression>", "eval"),
+            {})
+
+    def evaluate(self, feature: GFFRecord) -> Any:
+        return self.function(*[getter(feature) for getter in self.getters])
+
+    def __repr__(self):
+        return "<%s %r>" % (self.__class__.__name__, self.source)
@@ -0,0 +1,41 @@
+"""Writing of FASTA records.
+
+Sequences are wrapped by slicing them in lines of fixed width, which gives
+the same output as `textwrap.fill` for sequences without whitespace or
+hyphens, without its word splitting. Records are encoded once and written
+as bytes through an `OutputWriter`.
+"""
+
+from typing import Optional
+
+from pygff.output import OutputWriter
+
+
+def wrap_sequence(sequence: bytes, line_length: Optional[int] = None) -> bytes:
+    """Split a sequence in lines of `line_length`, the last may be shorter."""
+    if not line_length or len(sequence) <= line_length:
+        return sequence
+    return b"\n".join([
+        sequence[i:i + line_length]
+        for i in range(0, len(sequence), line_length)])
+
+
+def format_record(
+    header: str, sequence: str, line_length: Optional[int] = None
+) -> bytes:
+    """A FASTA record followed by an empty line, as written by `seq`."""
+    return b"".join([
+        b">", header.encode("UTF-8"), b"\n",
+        wrap_sequence(sequence.encode("UTF-8"), line_length), b"\n\n"])
+
+
+class FastaWriter(object):
+    """Write FASTA records with sequence lines of `line_length`."""
+
+    def __init__(self, output: OutputWriter, line_length: Optional[int] = None):
+        self.output = output
+        self.line_length = line_length
+
+    def write(self, header: str, sequence: str):
+        self.output.write_bytes(
+            format_record(header, sequence, self.line_length))
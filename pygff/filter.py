@@ -1,13 +1,25 @@
+import math
 import warnings
 from typing import (
-    Dict, List, Tuple, Iterator, Sequence
+    Dict, List, Tuple, Iterator, Sequence, FrozenSet, Callable
 )
 from abc import ABC, abstractmethod
-from collections import namedtuple
-
-from HTSeq import GenomicFeature
-
-from pygff.reader import GFF_Reader
+from collections import namedtuple, defaultdict
+from operator import attrgetter
+from itertools import accumulate, chain, compress, islice, repeat, tee
+from bisect import bisect_right
+
+import numpy as np
+
+from pygff.reader import GFF_Reader, GFFRecord
+from pygff.expression import Expression
+from pygff.index import load_index
+from pygff.table import GFFTable
+from pygff.hierarchy import Hierarchy
+from pygff.bgzf import DEFAULT_THREADS
+from pygff.profiling import (
+    profile_stage, profile_calls, profile_filter, CALLS
+)
 
 
 class FilterError(Exception):
@@ -15,23 +27,71 @@ class FilterError(Exception):
 
 
 class Filter(ABC):
-    """A class represents a GFF filter."""
+    """A class represents a GFF filter.
+
+    `fields` names the fields of GFFRecord read by `validate`, see
+    `GFFRecord.FIELDS`. Fields not listed are never parsed for this filter.
+    `cost` is the relative cost of one `validate` call, cheaper filters
+    are run first.
+    """
+
+    fields: FrozenSet[str] = GFFRecord.FIELDS
+    cost: int = 10
+    # Whether `mask` works on the columns of a table
+    vectorized: bool = False
+    # Attribute columns of a table read by `mask`
+    attribute_keys: FrozenSet[str] = frozenset()
+
+    def is_active(self) -> bool:
+        """Whether the filter was given any parameter."""
+        return True
 
     @abstractmethod
-    def validate(self, feature: GenomicFeature) -> bool:
+    def validate(self, feature: GFFRecord) -> bool:
         """Determine if the feature can pass this filter."""
 
+    def mask(self, table: "GFFTable") -> np.ndarray:
+        """Boolean mask of the rows of a `GFFTable` which pass this filter.
+
+        Filters which are not `vectorized` check each record of the table.
+        """
+        return np.fromiter(
+            map(self.validate, table.records()), dtype=bool, count=len(table))
+
+
+class LineFilter(Filter):
+    """A filter which can also check the raw line of a record.
+
+    `validate_line` is used to reject lines before a GFFRecord is built for
+    them, it must agree with `validate`.
+    """
+
+    @abstractmethod
+    def validate_line(self, line: str) -> bool:
+        """Determine if the raw line can pass this filter."""
+
+    @abstractmethod
+    def validate_byte_line(self, line: bytes) -> bool:
+        """Same as `validate_line`, for an undecoded line."""
+
 
-class SimpleValueUnionFilter(Filter):
-    """Pass the filter if value meets any one of candidates."""
+class SimpleValueUnionFilter(LineFilter):
+    """Pass the filter if value meets any one of candidates.
+
+    `column` is the index of the checked column in a GFF line.
+    """
+
+    column: int
+    cost = 2
+    vectorized = True
 
     def __init__(self, param):
-        self.valid_values = []
-        # Empty string is not allowed
-        if isinstance(param, str) and param:
-            self.valid_values.append(param)
-        elif isinstance(param, Sequence):
-            self.valid_values.extend(param)
+        self.valid_values = frozenset(as_list(param))
+        self.valid_byte_values = frozenset(
+            value.encode("UTF-8") for value in self.valid_values)
+
+    def is_active(self) -> bool:
+        return bool(self.valid_values)
 
     def is_valid(self, value):
         # Do not check if filter is not set.
@@ -42,28 +102,97 @@ class SimpleValueUnionFilter(Filter):
         else:
             return False
 
+    def validate_line(self, line: str) -> bool:
+        if not self.valid_values:
+            return True
+        columns = line.split("\t", self.column + 1)
+        try:
+            return columns[self.column] in self.valid_values
+        except IndexError:
+            # Leave malformed lines to GFFRecord
+            return True
+
+    def mask(self, table: "GFFTable") -> np.ndarray:
+        if not self.valid_values:
+            return np.ones(len(table), dtype=bool)
+        (field,) = self.fields
+        return getattr(table, field).isin(self.valid_values)
+
+    def validate_byte_line(self, line: bytes) -> bool:
+        if not self.valid_values:
+            return True
+        columns = line.split(b"\t", self.column + 1)
+        try:
+            return columns[self.column] in self.valid_byte_values
+        except IndexError:
+            return True
+
 
 class SeqIdFilter(SimpleValueUnionFilter):
-    def validate(self, feature: GenomicFeature) -> bool:
-        return self.is_valid(feature.iv.chrom)
+    fields = frozenset(["seqid"])
+    column = 0
+    cost = 1
+
+    # Up to this many seqids are matched as line prefixes
+    MAX_PREFIXES = 8
+
+    def __init__(self, param):
+        SimpleValueUnionFilter.__init__(self, param)
+        self.line_prefixes = None
+        self.byte_line_prefixes = None
+        if len(self.valid_values) <= self.MAX_PREFIXES:
+            self.line_prefixes = tuple(
+                value + "\t" for value in self.valid_values)
+            self.byte_line_prefixes = tuple(
+                value + b"\t" for value in self.valid_byte_values)
+
+    def validate_line(self, line: str) -> bool:
+        if not self.valid_values:
+            return True
+        if self.line_prefixes is not None:
+            return line.startswith(self.line_prefixes)
+        return line[:line.find("\t")] in self.valid_values
+
+    def validate_byte_line(self, line: bytes) -> bool:
+        if not self.valid_values:
+            return True
+        if self.byte_line_prefixes is not None:
+            return line.startswith(self.byte_line_prefixes)
+        return line[:line.find(b"\t")] in self.valid_byte_values
+
+    def validate(self, feature: GFFRecord) -> bool:
+        return self.is_valid(feature.seqid)
 
 
 class TypeFilter(SimpleValueUnionFilter):
-    def validate(self, feature: GenomicFeature) -> bool:
+    fields = frozenset(["type"])
+    column = 2
+
+    def validate(self, feature: GFFRecord) -> bool:
         return self.is_valid(feature.type)
 
 
 class SourceFilter(SimpleValueUnionFilter):
-    def validate(self, feature: GenomicFeature) -> bool:
+    fields = frozenset(["source"])
+    column = 1
+
+    def validate(self, feature: GFFRecord) -> bool:
         return self.is_valid(feature.source)
 
 
 class StrandFilter(SimpleValueUnionFilter):
-    def validate(self, feature: GenomicFeature) -> bool:
-        return self.is_valid(feature.iv.strand)
+    fields = frozenset(["strand"])
+    column = 6
+
+    def validate(self, feature: GFFRecord) -> bool:
+        return self.is_valid(feature.strand)
 
 
 class AttributesFilter(Filter):
+    fields = frozenset(["attributes"])
+    cost = 5
+    vectorized = True
+
     def __init__(self, param):
         self.attr_pairs = []
         # Empty string is not allowed
@@ -72,59 +201,107 @@ class AttributesFilter(Filter):
         elif isinstance(param, Sequence):
             for attr_keyval in param:
                 self.attr_pairs.append(attr_keyval.split("="))
+        self.attribute_keys = frozenset(key for key, _ in self.attr_pairs)
+
+    def is_active(self) -> bool:
+        return bool(self.attr_pairs)
 
-    def validate(self, feature: GenomicFeature) -> bool:
+    def validate(self, feature: GFFRecord) -> bool:
         # Skip if filter isn't set
         if not self.attr_pairs:
             return True
-        matched = []
+        attr = feature.get_attributes(self.attribute_keys)
         for key, val in self.attr_pairs:
-            if key in feature.attr and val == feature.attr[key]:
-                matched.append(True)
-            else:
-                matched.append(False)
-        if not all(matched):
-            return False
-        else:
-            return True
+            if attr.get(key) != val:
+                return False
+        return True
+
+    def mask(self, table: "GFFTable") -> np.ndarray:
+        mask = np.ones(len(table), dtype=bool)
+        for key, val in self.attr_pairs:
+            column = table.attributes.get(key)
+            if column is None:
+                return np.zeros(len(table), dtype=bool)
+            mask &= column.isin([val])
+        return mask
+
+
+class AttributeValuesFilter(Filter):
+    """Pass the filter if the value of an attribute is one of candidates."""
+
+    fields = frozenset(["attributes"])
+    cost = 5
+    vectorized = True
+
+    def __init__(self, key: str, values: Sequence[str]):
+        self.key = key
+        self.valid_values = frozenset(values)
+        self.attribute_keys = frozenset([key])
+
+    def is_active(self) -> bool:
+        return bool(self.valid_values)
+
+    def validate(self, feature: GFFRecord) -> bool:
+        return feature.get_attributes(self.attribute_keys).get(
+            self.key) in self.valid_values
+
+    def mask(self, table: "GFFTable") -> np.ndarray:
+        column = table.attributes.get(self.key)
+        if column is None:
+            return np.zeros(len(table), dtype=bool)
+        return column.isin(self.valid_values)
 
 
 class ExpressionFilter(Filter):
     def __init__(self, param):
         self.expression = None
+        self.fields = frozenset()
         # Emtpry string is not allowed
         if isinstance(param, str) and param:
-            self.expression = param
+            self.expression = Expression(param)
+            self.fields = frozenset(self.expression.fields)
 
-    def validate(self, feature: GenomicFeature) -> bool:
+    def is_active(self) -> bool:
+        return self.expression is not None
+
+    def validate(self, feature: GFFRecord) -> bool:
         if not self.expression:
             return True
-        env = {
-            "seqid": feature.iv.chrom,
-            "source": feature.source,
-            "type": feature.type,
-            "start": feature.iv.start + 1,
-            "end": feature.iv.end,
-            "score": feature.score,
-            "strand": feature.iv.strand,
-            "phase": str(feature.frame),
-            "attributes": feature.attr
-        }
-
-        return bool(eval(self.expression, env))
+        return bool(self.expression.evaluate(feature))
 
 
 class RegionsFilter(Filter):
     Region = namedtuple('Region', ['seqname', 'start', 'end'])
+    fields = frozenset(["seqid", "start", "end"])
+    cost = 3
+    vectorized = True
 
     def __init__(self, param):
-        self.regions = []
-        # Empty string is not allowed
-        if isinstance(param, str) and param:
-            self.regions.append(self.parse_region(param))
-        elif isinstance(param, Sequence):
-            for region_string in param:
-                self.regions.append(self.parse_region(region_string))
+        self.regions = [
+            self.parse_region(region_string)
+            for region_string in as_list(param)]
+        self.build_index()
+
+    def build_index(self):
+        """Index regions by seqname for `validate`.
+
+        For each seqname, region starts are sorted and the largest region
+        end up to each start is recorded, so whether a feature lies in any
+        region is found by one bisection.
+        """
+        by_seqname = defaultdict(list)
+        for region in self.regions:
+            # Missing start or end means the region is unbounded
+            by_seqname[region.seqname].append(
+                (region.start or 0, region.end or math.inf))
+        self.index = {}
+        for seqname, bounds in by_seqname.items():
+            bounds.sort()
+            max_ends = list(accumulate((end for _, end in bounds), max))
+            self.index[seqname] = ([start for start, _ in bounds], max_ends)
+
+    def is_active(self) -> bool:
+        return bool(self.regions)
 
     def parse_region(self, region_string: str):
         seqname, start, end = None, None, None
@@ -160,23 +337,32 @@ class RegionsFilter(Filter):
 
         return RegionsFilter.Region(seqname, start, end)
 
-    def validate(self, feature: GenomicFeature) -> bool:
+    def validate(self, feature: GFFRecord) -> bool:
         """
         A feature is retained only if it starts and ends in the region.
         """
         if not self.regions:
             return True
+        try:
+            starts, max_ends = self.index[feature.seqid]
+        except KeyError:
+            return False
+        # Region start is 0-based, feature start is 1-based
+        i = bisect_right(starts, feature.start - 1)
+        return i > 0 and max_ends[i - 1] >= feature.end
 
-        for region in self.regions:
-            if feature.iv.chrom != region.seqname:
-                continue
-            if region.start and feature.iv.start < region.start:
-                continue
-            if region.end and feature.iv.end > region.end:
-                continue
-            return True
-
-        return False
+    def mask(self, table: "GFFTable") -> np.ndarray:
+        mask = np.zeros(len(table), dtype=bool)
+        if not self.regions:
+            mask[:] = True
+            return mask
+        for seqname, (starts, max_ends) in self.index.items():
+            rows = np.flatnonzero(table.seqid.isin([seqname]))
+            i = np.searchsorted(starts, table.start[rows] - 1, side="right")
+            # Unbounded region ends are infinite
+            ends = np.array([-np.inf] + max_ends, dtype=np.float64)
+            mask[rows] = ends[i] >= table.end[rows]
+        return mask
 
 
 FILTER_NAME_MAP = {
@@ -190,41 +376,374 @@ FILTER_NAME_MAP = {
 }
 
 
+def as_list(param) -> List[str]:
+    """Convert a filter parameter to a list of values.
+
+    Empty string is not allowed.
+    """
+    if isinstance(param, str):
+        return [param] if param else []
+    elif isinstance(param, Sequence):
+        return list(param)
+    return []
+
+
+def read_lines(filename: str) -> Iterator[str]:
+    """Iterate over lines of a file, skipping empty lines and comments."""
+    with open(filename, encoding="UTF-8") as lines:
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def read_regions_file(filename: str) -> List[str]:
+    """Read regions from a BED file or a file of region strings."""
+    regions = []
+    for line in read_lines(filename):
+        if line.startswith(("track", "browser")):
+            continue
+        if "\t" in line:
+            # BED coordinates are 0-based half-open
+            seqname, start, end = line.split("\t")[:3]
+            regions.append("%s:%d-%s" % (seqname, int(start) + 1, end))
+        else:
+            regions.append(line)
+    return regions
+
+
 def make_filters(filter_params: Dict) -> List[Filter]:
+    """Create filters for the given parameters, ordered by cost.
+
+    Filters without parameters are left out. `regions_file` adds regions
+    read by `read_regions_file` to the region filter, and each
+    `FIELD=FILE` of `values_file` adds the values listed in FILE to the
+    filter of a column, or makes an AttributeValuesFilter for an attribute.
+    """
+    filter_params = dict(filter_params)
     filters = []
+    regions_files = as_list(filter_params.get("regions_file"))
+    if regions_files:
+        filter_params["region"] = as_list(filter_params.get("region"))
+        for filename in regions_files:
+            filter_params["region"].extend(read_regions_file(filename))
+    for spec in as_list(filter_params.get("values_file")):
+        field, sep, filename = spec.partition("=")
+        if not sep or not field or not filename:
+            raise FilterError(
+                "Values file must be given as FIELD=FILE: %s" % spec)
+        values = list(read_lines(filename))
+        if field in ("seqid", "source", "type", "strand"):
+            filter_params[field] = as_list(filter_params.get(field)) + values
+        else:
+            filters.append(AttributeValuesFilter(field, values))
+
     for key, val in filter_params.items():
         if key in FILTER_NAME_MAP.keys():
             filters.append(FILTER_NAME_MAP[key](val))
+    filters = [f for f in filters if f.is_active()]
+    filters.sort(key=lambda f: f.cost)
     return filters
 
 
+class FilterStage:
+    """Filters run one after another until one of them rejects an item.
+
+    Filters run in the order of their cost. If `sample_size` is set, the
+    first `sample_size` items are checked by every filter to count how
+    many items each filter rejects. The filters are then reordered by
+    cost per rejection, so that the most selective cheap filters run first.
+    `name` names the stage in profiles, see `pygff.profiling`.
+    """
+
+    def __init__(
+            self, filters: List[Filter],
+            check: Callable[[Filter], Callable], sample_size=0,
+            name="filters"):
+        self.filters = sorted(filters, key=lambda f: f.cost)
+        self.check = check
+        self.name = name
+        self.checks = self.make_checks()
+        self.sample_size = sample_size
+        self.sampled = 0
+        self.rejections = [0] * len(self.filters)
+
+    def make_checks(self) -> List[Callable]:
+        return [
+            profile_filter(self.name, f, self.check(f)) for f in self.filters]
+
+    def validate(self, item) -> bool:
+        if self.sampled < self.sample_size:
+            return self.validate_sample(item)
+        return self.validate_all(item)
+
+    def validate_all(self, item) -> bool:
+        for check in self.checks:
+            if not check(item):
+                return False
+        return True
+
+    def filter(self, items: Iterator) -> Iterator:
+        """Iterate over the items which pass the filters.
+
+        Once the sample is checked, the filters are applied without the
+        bookkeeping of `validate`, and a single filter is applied directly.
+        """
+        items = iter(items)
+
+        def parts():
+            if self.sampled < self.sample_size:
+                yield filter(
+                    self.validate_sample,
+                    islice(items, self.sample_size - self.sampled))
+            # Created once the sample is checked and the filters reordered
+            if not self.checks:
+                yield items
+            elif len(self.checks) == 1:
+                yield filter(self.checks[0], items)
+            else:
+                yield filter(self.validate_all, items)
+
+        if not self.filters:
+            return chain.from_iterable(parts())
+        return profile_stage(self.name, chain.from_iterable(parts()))
+
+    def validate_sample(self, item) -> bool:
+        passed = True
+        for i, check in enumerate(self.checks):
+            if not check(item):
+                self.rejections[i] += 1
+                passed = False
+        self.sampled += 1
+        if self.sampled == self.sample_size:
+            self.reorder()
+        return passed
+
+    def reorder(self):
+        def rank(i):
+            rejection_rate = self.rejections[i] / self.sampled
+            if rejection_rate == 0:
+                return (1, self.filters[i].cost)
+            return (0, self.filters[i].cost / rejection_rate)
+
+        order = sorted(range(len(self.filters)), key=rank)
+        self.filters = [self.filters[i] for i in order]
+        self.rejections = [self.rejections[i] for i in order]
+        self.checks = self.make_checks()
+
+
 class FilterChain:
-    def __init__(self, filter_params):
+    """Filters which a record must all pass.
+
+    The filters are run in two stages: `validate_line` (or
+    `validate_byte_line` for an undecoded line) runs the line filters on
+    the raw line, and `validate_record` runs the others on the parsed
+    record. `validate` runs all filters on a record. See
+    `FilterStage` for the order of filters in a stage and `sample_size`.
+    """
+
+    def __init__(self, filter_params, sample_size=0):
+        self.sample_size = sample_size
         self.filters = make_filters(filter_params)
+        self.update_stages()
 
     def add_filter(self, filter: Filter):
-        self.filters.append(filter)
+        if filter.is_active():
+            self.filters.append(filter)
+            self.filters.sort(key=lambda f: f.cost)
+            self.update_stages()
+
+    def update_stages(self):
+        line_filters = [f for f in self.filters if isinstance(f, LineFilter)]
+        self.line_stage = FilterStage(
+            line_filters, attrgetter("validate_line"), self.sample_size,
+            "line filters")
+        self.byte_line_stage = FilterStage(
+            line_filters, attrgetter("validate_byte_line"), self.sample_size,
+            "line filters")
+        self.record_stage = FilterStage(
+            [f for f in self.filters if not isinstance(f, LineFilter)],
+            attrgetter("validate"), self.sample_size, "record filters")
+        self.validate_line = self.line_stage.validate
+        self.validate_byte_line = self.byte_line_stage.validate
+        self.validate_record = self.record_stage.validate
+
+    @property
+    def attribute_keys(self) -> FrozenSet[str]:
+        """Attribute columns of a table read by vectorized filters."""
+        return frozenset().union(*(f.attribute_keys for f in self.filters))
+
+    @property
+    def table_attributes(self):
+        """The attributes of a `GFFTable` read by `mask`.
+
+        Filters which are not vectorized check records built from the
+        table, so all attributes are loaded if such a filter reads them.
+        """
+        if any(not f.vectorized and "attributes" in f.fields
+               for f in self.filters):
+            return True
+        return self.attribute_keys
 
-    def validate(self, feature):
+    def validate(self, feature: GFFRecord) -> bool:
         for filter in self.filters:
             if not filter.validate(feature):
                 return False
         return True
 
+    def mask(self, table: "GFFTable") -> np.ndarray:
+        """Boolean mask of the rows of a `GFFTable` which pass all filters.
+
+        Vectorized filters run on whole columns. The others only check the
+        records which passed the filters before them.
+        """
+        mask = np.ones(len(table), dtype=bool)
+        for filter in self.filters:
+            if filter.vectorized:
+                mask &= filter.mask(table)
+            else:
+                rows = np.flatnonzero(mask)
+                mask[rows] = np.fromiter(
+                    map(filter.validate, table.records(rows)),
+                    dtype=bool, count=len(rows))
+        return mask
+
 
 class GFF_Filter(GFF_Reader):
+    """Iterate over records of a GFF file which pass the given filters.
+
+    If the filters include regions and the file has an up-to-date index
+    (see `pygff.index`), only the parts of the file which may contain these
+    regions are read, unless `use_index` is False. `use_mmap` memory maps
+    a plain file, for both full scans and indexed queries. Otherwise, if
+    the file has an up-to-date cache and `use_cache` is True, the cached
+    table is filtered with `FilterChain.mask`.
+    """
 
     def __init__(
             self, gff_file: str, filter_params: Dict,
-            end_included=True, show_progress=False):
+            end_included=True, show_progress=False, sample_size=0,
+            use_index=True, threads=DEFAULT_THREADS, use_mmap=False,
+            use_cache=True):
         GFF_Reader.__init__(
-            self, gff_file, end_included, show_progress=show_progress)
+            self, gff_file, end_included, show_progress=show_progress,
+            threads=threads, use_mmap=use_mmap, use_cache=use_cache)
         self.gff_file = gff_file
-        self.filter_chain = FilterChain(filter_params)
+        self.filter_chain = FilterChain(filter_params, sample_size)
+        self.regions = None
+        self.index = None
+        for filter in self.filter_chain.filters:
+            if isinstance(filter, RegionsFilter):
+                self.regions = filter.regions
+        if use_index and self.regions and isinstance(gff_file, str):
+            self.index = load_index(gff_file)
+
+    @property
+    def use_table(self) -> bool:
+        """Whether records are selected from the cached table."""
+        return self.index is None and self.cache is not None
+
+    def select_rows(
+            self, all_attributes=False) -> Tuple[GFFTable, np.ndarray]:
+        """Load the cached table and find the rows which pass all filters.
+
+        With `all_attributes`, all attribute columns are loaded, for the
+        records of the rows.
+        """
+        table = self.load_table(
+            True if all_attributes else self.filter_chain.table_attributes)
+        mask = profile_calls(
+            "record filters", self.filter_chain.mask, count=len)(table)
+        return table, np.flatnonzero(mask)
+
+    def iter_lines(self) -> Iterator[str]:
+        if self.index is not None:
+            return self.index.iter_lines(
+                self.gff_file, self.regions, self.use_mmap)
+        return GFF_Reader.iter_lines(self)
+
+    def iter_valid_lines(self) -> Iterator[str]:
+        """Iterate over the raw lines which pass the line filters.
+
+        Lines of a file are checked before they are decoded, so rejected
+        lines are never decoded.
+        """
+        if self.index is None and isinstance(self.filename, str):
+            return profile_stage("decode", map(
+                bytes.decode, self.filter_chain.byte_line_stage.filter(
+                    self.iter_byte_lines())))
+        return self.filter_chain.line_stage.filter(self.iter_lines())
+
+    def iter_raw_lines(self) -> Iterator[bytes]:
+        """Iterate over the undecoded lines which pass all filters.
+
+        The lines are the bytes read from the file, with newlines
+        translated as in text mode. If all filters are line filters, the
+        lines are never decoded.
+        """
+        if self.use_table:
+            table, rows = self.select_rows()
+            return table.iter_raw_lines(rows)
+        if self.index is not None or not isinstance(self.filename, str):
+            return (raw_line.encode("UTF-8") for _, raw_line in self)
+        lines = self.filter_chain.byte_line_stage.filter(self.iter_byte_lines())
+        if not self.filter_chain.record_stage.filters:
+            return lines
+        lines, passed = tee(lines)
+        records = map(
+            GFFRecord, profile_stage("decode", map(bytes.decode, passed)),
+            repeat(self.end_included), repeat(self.attribute_parser))
+        # Passed records are counted, as by `FilterStage.filter`
+        return compress(lines, profile_stage(
+            "record filters",
+            map(self.filter_chain.record_stage.validate,
+                profile_stage("records", records)),
+            count=int))
+
+    def validate_byte_line(self, line: bytes) -> bool:
+        """Whether an undecoded line passes all filters."""
+        chain = self.filter_chain
+        if not chain.validate_byte_line(line):
+            return False
+        if not chain.record_stage.filters:
+            return True
+        return chain.validate_record(GFFRecord(
+            line.decode("UTF-8"), self.end_included, self.attribute_parser))
 
-    def __iter__(self) -> Iterator[Tuple[GenomicFeature, str]]:
-        for feature, raw_line in GFF_Reader.__iter__(self):
-            if self.filter_chain.validate(feature):
-                yield (feature, raw_line)
-            else:
-                continue
+    def iter_with_children(self) -> Iterator[bytes]:
+        """Iterate over the lines which pass all filters, and their descendants.
+
+        The file is scanned once to find the matching records and build its
+        `Hierarchy`. The lines of the descendants of matching records are
+        then read at their offsets, and all lines are yielded in file order.
+        """
+        hierarchy = profile_calls("hierarchy", Hierarchy.build, CALLS)(
+            self.gff_file, self.validate_byte_line, self.use_mmap)
+        return hierarchy.iter_lines(
+            hierarchy.descendants(hierarchy.selected, include_self=True),
+            self.use_mmap)
+
+    def iter_records(self) -> Iterator[GFFRecord]:
+        """Iterate over the records which pass all filters.
+
+        Records of a cached file are built from the table, and their lines
+        are not read.
+        """
+        if self.use_table:
+            table, rows = self.select_rows(all_attributes=True)
+            return profile_stage("records", table.records(rows))
+        # Reject by cheap columns before the record is built
+        records = profile_stage("records", map(
+            GFFRecord, self.iter_valid_lines(), repeat(self.end_included),
+            repeat(self.attribute_parser)))
+        return self.filter_chain.record_stage.filter(records)
+
+    def __iter__(self) -> Iterator[Tuple[GFFRecord, str]]:
+        if self.use_table:
+            table, rows = self.select_rows(all_attributes=True)
+            yield from zip(
+                profile_stage("records", table.records(rows)),
+                map(bytes.decode, table.iter_raw_lines(rows)))
+            return
+        for feature in self.iter_records():
+            yield (feature, feature.line)
@@ -0,0 +1,178 @@
+"""Gene model hierarchy of a GFF file.
+
+A `Hierarchy` is built in one pass over the file. Each record is a node,
+numbered by its row in the file, and the `Parent` attribute of a record
+links it to the records with that `ID`. In GTF files, which have neither,
+genes are identified by their gene_id, transcripts by their transcript_id
+and have their gene as parent, and other records have their transcript,
+or their gene without transcript_id, as parent.
+
+Children and parents of the nodes are stored in CSR form: the children of
+row `i` are `child_rows[child_start[i]:child_start[i + 1]]`. The offset of
+each record in the file is kept too, so the lines of the records found by
+a query are read without scanning the file again. Offsets are those of
+`pygff.index.LineScanner`, so gzip compressed files are not supported.
+"""
+
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from pygff.index import LineScanner
+from pygff.convert import ATTRIBUTE_ID, ATTRIBUTE_PARENT
+
+# gene_id and transcript_id attributes of a GTF line
+ATTRIBUTE_GENE_ID = re.compile(rb'(?:^|;)\s*gene_id\s+"([^"]*)"')
+ATTRIBUTE_TRANSCRIPT_ID = re.compile(rb'(?:^|;)\s*transcript_id\s+"([^"]*)"')
+
+
+def record_links(line: bytes) -> Tuple[Optional[bytes], List[bytes]]:
+    """The ID and the parent IDs of the record of a line."""
+    columns = line.split(b"\t", 8)
+    if len(columns) < 9:
+        return (None, [])
+    attributes = columns[8]
+    record_id = ATTRIBUTE_ID.search(attributes)
+    parent = ATTRIBUTE_PARENT.search(attributes)
+    if record_id is not None or parent is not None:
+        return (
+            record_id.group(1).strip() if record_id is not None else None,
+            [p.strip() for p in parent.group(1).split(b",")]
+            if parent is not None else [])
+    gene_id = ATTRIBUTE_GENE_ID.search(attributes)
+    transcript_id = ATTRIBUTE_TRANSCRIPT_ID.search(attributes)
+    gene_id = gene_id.group(1) if gene_id is not None else None
+    transcript_id = transcript_id.group(1) if transcript_id is not None else None
+    feature_type = columns[2]
+    if feature_type == b"gene":
+        return (gene_id, [])
+    if feature_type == b"transcript":
+        return (transcript_id, [gene_id] if gene_id else [])
+    parent = transcript_id or gene_id
+    return (None, [parent] if parent else [])
+
+
+def csr(
+    sources: np.ndarray, targets: np.ndarray, n_rows: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Start array and targets, ordered by source, of a list of edges."""
+    order = np.argsort(sources, kind="stable")
+    start = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n_rows), out=start[1:])
+    return start, targets[order]
+
+
+class Hierarchy(object):
+    """Parents and children of the records of a GFF file."""
+
+    def __init__(
+            self, gff_file: str, ids: Dict[str, int], offsets: np.ndarray,
+            edges: np.ndarray, selected: Optional[np.ndarray] = None):
+        self.gff_file = gff_file
+        # ID -> row of the first record with this ID
+        self.ids = ids
+        self.offsets = offsets
+        # Rows of the lines passing `select` in `build`
+        self.selected = selected
+        children, parents = (
+            edges[:, 0].astype(np.int64), edges[:, 1].astype(np.int64))
+        n_rows = len(offsets)
+        self.child_start, self.child_rows = csr(parents, children, n_rows)
+        self.parent_start, self.parent_rows = csr(children, parents, n_rows)
+
+    @classmethod
+    def build(
+            cls, gff_file: str,
+            select: Optional[Callable[[bytes], bool]] = None,
+            use_mmap=False) -> "Hierarchy":
+        """Scan a GFF file for the ID and Parent of each record.
+
+        If `select` is given, it is called with each line of a record, and
+        the rows of the lines for which it returns True are kept in
+        `selected`.
+        """
+        ids: Dict[str, int] = {}
+        offsets: List[int] = []
+        # (row of child, parent ID)
+        links: List[Tuple[int, bytes]] = []
+        selected: List[int] = []
+        with LineScanner(gff_file, use_mmap=use_mmap) as scanner:
+            for offset, line in scanner.lines_from(0):
+                if line.startswith(b"#") or not line.strip():
+                    continue
+                row = len(offsets)
+                offsets.append(offset)
+                if line.endswith(b"\r\n"):
+                    line = line[:-2] + b"\n"
+                record_id, parents = record_links(line)
+                if record_id:
+                    ids.setdefault(record_id.decode("UTF-8"), row)
+                for parent in parents:
+                    links.append((row, parent))
+                if select is not None and select(line):
+                    selected.append(row)
+        edges = [
+            (row, ids[parent])
+            for row, parent in (
+                (row, parent.decode("UTF-8")) for row, parent in links)
+            if parent in ids]
+        return cls(
+            gff_file, ids, np.array(offsets, dtype=np.int64),
+            np.array(edges, dtype=np.int64).reshape(-1, 2),
+            np.array(selected, dtype=np.int64) if select is not None else None)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def row(self, record_id: str) -> Optional[int]:
+        """Row of the first record with the ID `record_id`."""
+        return self.ids.get(record_id)
+
+    def children(self, row: int) -> np.ndarray:
+        return self.child_rows[self.child_start[row]:self.child_start[row + 1]]
+
+    def parents(self, row: int) -> np.ndarray:
+        return self.parent_rows[
+            self.parent_start[row]:self.parent_start[row + 1]]
+
+    def walk(
+            self, rows: Iterable[int], start: np.ndarray, targets: np.ndarray,
+            include_self: bool) -> np.ndarray:
+        seen = np.zeros(len(self), dtype=bool)
+        frontier = np.unique(np.fromiter(rows, dtype=np.int64))
+        seen[frontier] = True
+        while frontier.size:
+            reached = np.concatenate(
+                [targets[start[row]:start[row + 1]] for row in frontier])
+            frontier = np.unique(reached[~seen[reached]])
+            seen[frontier] = True
+        if not include_self:
+            seen[np.fromiter(rows, dtype=np.int64)] = False
+        return np.flatnonzero(seen)
+
+    def descendants(
+            self, rows: Iterable[int], include_self=False) -> np.ndarray:
+        """Sorted rows of the children of `rows`, their children and so on."""
+        return self.walk(list(rows), self.child_start, self.child_rows,
+                         include_self)
+
+    def ancestors(
+            self, rows: Iterable[int], include_self=False) -> np.ndarray:
+        """Sorted rows of the parents of `rows`, their parents and so on."""
+        return self.walk(list(rows), self.parent_start, self.parent_rows,
+                         include_self)
+
+    def iter_lines(
+            self, rows: Iterable[int], use_mmap=False) -> Iterator[bytes]:
+        """Read the lines of the records at `rows`, in the order given.
+
+        Rows in increasing order are read fastest, see
+        `LineScanner.lines_at`.
+        """
+        with LineScanner(self.gff_file, use_mmap=use_mmap) as scanner:
+            for line in scanner.lines_at(
+                    int(self.offsets[row]) for row in rows):
+                if line.endswith(b"\r\n"):
+                    line = line[:-2] + b"\n"
+                yield line
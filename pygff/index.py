@@ -0,0 +1,297 @@
+"""Coordinate index of sorted GFF files.
+
+The index of a GFF file is stored next to it as GFF_FILE.gfi, a gzip
+compressed JSON document. For each seqid, it records the offset of the
+first record starting in each window of 16 kb, like the linear index of
+tabix. Offsets are byte offsets of plain files, or virtual offsets of BGZF
+compressed files.
+
+Records of the file must be grouped by seqid and sorted by start.
+"""
+
+import gzip
+import json
+import mmap
+import os
+import warnings
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pygff.bgzf import (
+    BGZFReader, is_bgzf, is_gzip, make_virtual_offset, DEFAULT_THREADS
+)
+
+INDEX_SUFFIX = ".gfi"
+INDEX_VERSION = 1
+
+# Records are indexed in windows of 2**WINDOW_SHIFT bases
+WINDOW_SHIFT = 14
+
+# `LineScanner.lines_at` reads through the lines up to an offset at most
+# this many bytes of the (compressed) file ahead, the size of a BGZF block,
+# instead of seeking to it
+SEEK_DISTANCE = 64 * 1024
+
+
+class GFFIndexError(Exception):
+    pass
+
+
+class LineScanner(object):
+    """Read lines of a plain or BGZF file together with their offsets.
+
+    With `use_mmap`, a plain file is memory mapped, so that seeking to the
+    offsets of many regions does not refill a read buffer each time.
+    """
+
+    def __init__(
+            self, filename: str, threads: int = DEFAULT_THREADS,
+            use_mmap: bool = False):
+        self.filename = filename
+        self.mapped = None
+        if is_bgzf(filename):
+            self.bgzf = BGZFReader(filename, threads)
+            self.file = None
+        elif is_gzip(filename):
+            raise GFFIndexError(
+                "Gzip compressed files can not be indexed, "
+                "compress the file with bgzip instead.")
+        else:
+            self.bgzf = None
+            self.file = open(filename, "rb")
+            if use_mmap and os.fstat(self.file.fileno()).st_size:
+                self.mapped = mmap.mmap(
+                    self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def lines_from(self, offset: int = 0) -> Iterator[Tuple[int, bytes]]:
+        """Yield the offset and content of each line from `offset`."""
+        if self.file is not None:
+            lines = self.mapped if self.mapped is not None else self.file
+            lines.seek(offset)
+            for line in iter(lines.readline, b""):
+                yield (offset, line)
+                offset += len(line)
+            return
+
+        reader = self.bgzf
+        reader.seek_virtual(offset)
+        block_offset, data, pos = reader.block_offset, reader.buffer, reader.offset
+        partial, partial_offset = b"", 0
+        while True:
+            while True:
+                end = data.find(b"\n", pos)
+                if end < 0:
+                    break
+                if partial:
+                    yield (partial_offset, partial + data[pos:end + 1])
+                    partial = b""
+                else:
+                    yield (make_virtual_offset(block_offset, pos), data[pos:end + 1])
+                pos = end + 1
+            if pos < len(data):
+                # The line continues in the next block
+                if not partial:
+                    partial_offset = make_virtual_offset(block_offset, pos)
+                partial += data[pos:]
+            block = reader.next_block()
+            if block is None:
+                break
+            (block_offset, data), pos = block, 0
+        if partial:
+            yield (partial_offset, partial)
+
+    def lines_at(self, offsets: Iterable[int]) -> Iterator[bytes]:
+        """Yield the line at each of `offsets`.
+
+        Lines are read forward from the previous offset while the next one
+        is close after it, so that a BGZF file is not seeked to, and its
+        queued block inflations are not dropped, for every line. Offsets in
+        increasing order are thus read fastest.
+        """
+        lines: Iterator[Tuple[int, bytes]] = iter(())
+        position = None
+        for offset in offsets:
+            if position is None or offset <= position or (
+                    self.distance(position, offset) > SEEK_DISTANCE):
+                lines = self.lines_from(offset)
+            for position, line in lines:
+                if position >= offset:
+                    break
+            else:
+                raise GFFIndexError(
+                    "Offset %d is beyond the end of %s" % (
+                        offset, self.filename))
+            if position != offset:
+                raise GFFIndexError(
+                    "No line starts at offset %d of %s" % (
+                        offset, self.filename))
+            yield line
+
+    def distance(self, start: int, end: int) -> int:
+        """Bytes of the file between two offsets, compressed for BGZF."""
+        if self.bgzf is not None:
+            return (end >> 16) - (start >> 16)
+        return end - start
+
+    def close(self):
+        if self.mapped is not None:
+            self.mapped.close()
+        if self.file is not None:
+            self.file.close()
+        else:
+            self.bgzf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def index_filename(gff_file: str) -> str:
+    return gff_file + INDEX_SUFFIX
+
+
+class GFFIndex(object):
+    """Offsets of the first record in each window of each seqid."""
+
+    def __init__(
+            self, seqids: Dict[str, List[Tuple[int, int]]],
+            size: int, mtime: int):
+        # seqid -> list of (window, offset), in file order
+        self.seqids = seqids
+        self.size = size
+        self.mtime = mtime
+        self.windows = {
+            seqid: [window for window, _ in entries]
+            for seqid, entries in seqids.items()}
+
+    @classmethod
+    def build(cls, gff_file: str) -> "GFFIndex":
+        stat = os.stat(gff_file)
+        seqids: Dict[str, List[Tuple[int, int]]] = {}
+        last_seqid, last_start, entries = None, 0, None
+        with LineScanner(gff_file) as scanner:
+            for offset, line in scanner.lines_from(0):
+                if line.startswith(b"#") or not line.strip():
+                    continue
+                columns = line.split(b"\t", 4)
+                seqid = columns[0].decode("UTF-8")
+                start = int(columns[3]) - 1
+                if seqid != last_seqid:
+                    if seqid in seqids:
+                        raise GFFIndexError(
+                            "Records of seqid '%s' are not grouped together, "
+                            "the file must be sorted." % seqid)
+                    entries = seqids[seqid] = []
+                    last_seqid, last_start = seqid, start
+                elif start < last_start:
+                    raise GFFIndexError(
+                        "Records of seqid '%s' are not sorted by start "
+                        "position, the file must be sorted." % seqid)
+                window = start >> WINDOW_SHIFT
+                if not entries or entries[-1][0] != window:
+                    entries.append((window, offset))
+                last_start = start
+        return cls(seqids, stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    def load(cls, filename: str) -> "GFFIndex":
+        with gzip.open(filename, "rt", encoding="UTF-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise GFFIndexError("Unsupported index version: %s" % filename)
+        seqids = {
+            seqid: [tuple(entry) for entry in entries]
+            for seqid, entries in data["seqids"].items()}
+        return cls(seqids, data["size"], data["mtime"])
+
+    def save(self, filename: str):
+        data = {
+            "version": INDEX_VERSION,
+            "size": self.size,
+            "mtime": self.mtime,
+            "window_shift": WINDOW_SHIFT,
+            "seqids": self.seqids,
+        }
+        with gzip.open(filename, "wt", encoding="UTF-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    def is_current(self, gff_file: str) -> bool:
+        """Whether the GFF file is unchanged since it was indexed."""
+        stat = os.stat(gff_file)
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime
+
+    def seek_offset(self, seqid: str, start: int) -> Optional[int]:
+        """Offset to scan from for records of `seqid` starting at `start`.
+
+        `start` is 0-based. Returns None if no such record exists.
+        """
+        windows = self.windows.get(seqid)
+        if windows is None:
+            return None
+        i = bisect_left(windows, start >> WINDOW_SHIFT)
+        if i == len(windows):
+            return None
+        return self.seqids[seqid][i][1]
+
+    def iter_lines(
+            self, gff_file: str, regions, use_mmap: bool = False
+    ) -> Iterator[str]:
+        """Iterate over the lines of records which may lie in `regions`.
+
+        `regions` are `RegionsFilter.Region` tuples. The lines are yielded
+        in file order and still need to be checked against the regions.
+        """
+        # seqid -> list of (offset, region end)
+        scans: Dict[str, List[Tuple[int, float]]] = {}
+        for seqname, start, end in regions:
+            offset = self.seek_offset(seqname, start or 0)
+            if offset is not None:
+                scans.setdefault(seqname, []).append(
+                    (offset, end or float("inf")))
+        with LineScanner(gff_file, use_mmap=use_mmap) as scanner:
+            for seqid in sorted(scans, key=lambda seqid: min(scans[seqid])):
+                prefix = seqid.encode("UTF-8") + b"\t"
+                pending = sorted(scans[seqid])
+                last_offset = -1
+                while pending:
+                    offset, stop = pending.pop(0)
+                    if offset <= last_offset:
+                        continue
+                    for offset, line in scanner.lines_from(offset):
+                        # Regions whose records start here are scanned together
+                        while pending and pending[0][0] <= offset:
+                            stop = max(stop, pending.pop(0)[1])
+                        if line.startswith(b"#") or not line.strip():
+                            continue
+                        if not line.startswith(prefix):
+                            pending = []
+                            break
+                        if int(line.split(b"\t", 4)[3]) > stop:
+                            break
+                        last_offset = offset
+                        if line.endswith(b"\r\n"):
+                            line = line[:-2] + b"\n"
+                        yield line.decode("UTF-8")
+
+
+def build_index(gff_file: str) -> GFFIndex:
+    index = GFFIndex.build(gff_file)
+    index.save(index_filename(gff_file))
+    return index
+
+
+def load_index(gff_file: str) -> Optional[GFFIndex]:
+    """Load the index of a GFF file if it exists and is up to date."""
+    filename = index_filename(gff_file)
+    if not os.path.exists(filename):
+        return None
+    index = GFFIndex.load(filename)
+    if not index.is_current(gff_file):
+        warnings.warn(
+            "Index %s is older than the GFF file and will be ignored, "
+            "run `gfftools index` to update it." % filename,
+            category=RuntimeWarning)
+        return None
+    return index
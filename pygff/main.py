@@ -1,144 +1,129 @@
 #!/usr/bin/env python
 
 import argparse
+import cProfile
+import os
+import shutil
 import sys
 import json
-import re
-import textwrap
-from argparse import ArgumentError, Namespace
-from typing import Dict, List, Tuple, Iterator
-from collections import defaultdict
-
-import HTSeq
-from HTSeq import (
-    GenomicFeature,
-    GenomicInterval,
-    parse_GFF_attribute_string,
-    FileOrSequence
-)
-from pyfaidx import Fasta
+from argparse import Namespace
+from contextlib import nullcontext
+from typing import Dict, List, Tuple, Iterator, Optional, Callable
 
 from pygff import __version__
-from pygff.reader import GFF_Reader
-from pygff.filter import GFF_Filter
-from pygff.sequences import genome_extract
+from pygff.reader import GFF_Reader, GFFRecord
+from pygff.filter import GFF_Filter, FilterChain
+from pygff.attributes import AttributeParser
+from pygff.sequences import GenomeExtractor, translate, DEFAULT_BUFFER_SIZE
+from pygff.transcripts import (
+    Transcript, SplitTranscriptError, SEGMENT_TYPES, frame_offset,
+    group_transcripts
+)
+from pygff.expression import Expression
 from pygff.errors import SeqExtractError
+from pygff.index import build_index, GFFIndexError
+from pygff.cache import (
+    GFFCacheError, cache_root, cache_dirname, iter_caches
+)
+from pygff.table import build_cache
+from pygff.convert import (
+    ParentIndex, ConversionError, convert_lines, convert_records,
+    MAX_MEMORY_ENTRIES
+)
+from pygff.stats import FeatureStats, count_file
+from pygff.parallel import (
+    can_split, split_file, read_lines, read_byte_lines, imap_ordered
+)
+from pygff.bgzf import DEFAULT_THREADS
+from pygff.utils import ProgressBar, MEGABYTE
+from pygff.output import OutputWriter, silence_stdout
+from pygff.fasta import FastaWriter
+from pygff.profiling import Profiler, profile_stage, profile_calls, CALLS
+
+
+def use_processes(options: Namespace) -> bool:
+    """Whether the GFF file is processed in chunks by worker processes."""
+    return bool(options.threads and options.threads > 1
+                and can_split(options.gff_file))
+
+
+def reader_threads(options: Namespace) -> int:
+    """Number of threads to decompress BGZF input."""
+    return options.threads or DEFAULT_THREADS
+
+
+def open_output(options: Namespace) -> OutputWriter:
+    """Open the output file of a subcommand, stdout by default."""
+    return OutputWriter(
+        options.output, bgzf=options.bgzf,
+        threads=getattr(options, "threads", None) or DEFAULT_THREADS)
+
+
+def map_chunks(
+    func: Callable, options: Namespace, *args,
+    initializer: Callable = None, initargs: Tuple = ()
+) -> Iterator:
+    """Call `func(gff_file, start, end, *args)` for chunks of the GFF file.
+
+    Chunks are processed by `options.threads` worker processes and the
+    results are yielded in the order of the chunks. See `imap_ordered` for
+    `initializer` and `initargs`.
+    """
+    ranges = split_file(options.gff_file)
+    results = imap_ordered(
+        func, ((options.gff_file, start, end) + args for start, end in ranges),
+        options.threads, initializer=initializer, initargs=initargs)
+    if not options.verbose or not ranges:
+        yield from results
+        return
+    filesize = os.stat(options.gff_file).st_size
+    with ProgressBar(filesize, "Processing: ", "MB", scale=MEGABYTE) as bar:
+        for (_, end), result in zip(ranges, results):
+            yield result
+            bar.update_to(end)
+
+
+def stats_chunk(
+    gff_file: str, start: int, end: int, lengths: bool, attribute_keys: bool
+) -> FeatureStats:
+    stats = FeatureStats(lengths, attribute_keys)
+    stats.count_lines(read_byte_lines(gff_file, start, end))
+    return stats
 
-def attr_to_string(attrs: Dict):
-    attr_list = []
-    for id_attr in ("gene_id", "transcript_id"):
-        if id_attr in attrs:
-            attr_list.append('{} "{}"'.format(id_attr, attrs[id_attr]))
-            del attrs[id_attr]
-    attr_list.extend(
-        '{} "{}"'.format(str(key), str(val)) for (key, val) in attrs.items()
-    )
-    return "; ".join(attr_list)
 
+def stats_action(options: Namespace) -> None:
+    stats = FeatureStats(options.lengths, options.attribute_keys)
+    if use_processes(options):
+        for chunk_stats in map_chunks(
+                stats_chunk, options, options.lengths, options.attribute_keys):
+            stats.update(chunk_stats)
+    else:
+        count_file(
+            options.gff_file, stats, show_progress=options.verbose,
+            threads=reader_threads(options))
+    with open_output(options) as output:
+        output.write(json.dumps(stats.summary(), indent=2) + "\n")
 
-def split_prefix(x: str, delimiter: str) -> Tuple[str, str]:
-    try:
-        i = x.index(delimiter)
-        return (x[0:i], x[i+1:])
-    except ValueError:
-        return ("", x)
-
-
-def get_gtf_line(
-    feature: GenomicFeature,
-    transcript_parent: Dict[str, str],
-    id_prefix: List[str],
-    type_mapping: Dict[str, str],
-    type_delimiter: str
-):
-    attr_dict: Dict[str, str] = {}
-    attr_dict.update(feature.attr)
-
-    if feature.type in ("mRNA", "tRNA", "rRNA"):
-        if "transcript_id" not in attr_dict:
-            attr_dict["transcript_id"] = split_prefix(attr_dict["ID"], type_delimiter)[1]
-
-    # Fill necessary attributes with information extracted from `Parent`
-    if "Parent" in attr_dict:
-        parent_type, parent_id = split_prefix(attr_dict["Parent"], type_delimiter)
-        # Remove ID prefix if necessary
-        if parent_type in id_prefix:
-            full_id = attr_dict["Parent"]
-        else:
-            full_id = parent_id
-        # Fill in the required attributes for GTF format
-        if parent_type in ("transcript", "rna"):
-            attr_dict["transcript_id"] = full_id
-        elif parent_type == "gene":
-            attr_dict["gene_id"] = full_id
-            # Record gene-transcript relation
-            if "transcript_id" in attr_dict:
-                transcript_parent[attr_dict["transcript_id"]] = full_id
-
-    if "gene_id" not in attr_dict:
-        if feature.type == "gene":
-            attr_dict["gene_id"] = split_prefix(attr_dict["ID"], type_delimiter)[1]
-        else:
-            if "transcript_id" in attr_dict:
-                attr_dict["gene_id"] = transcript_parent[attr_dict["transcript_id"]]
-   
-
-    # Reserve or replace ID prefix
-    for prefix in id_prefix:
-        attr_key = prefix + "_id"
-        if attr_key in attr_dict:
-            if not attr_dict[attr_key].startswith(prefix):
-                attr_dict[attr_key] = prefix + type_delimiter + attr_dict[attr_key]
-
-    # Change feature type
-    if feature.type in type_mapping:
-        feature.type = type_mapping[feature.type]
-
-    if feature.type == "exon":
-        # Check for gene_id and transcript_id exists
-        if "gene_id" not in attr_dict or "transcript_id" not in attr_dict:
-            raise Exception("Exon must contain both 'gene_id' and 'transcript_id'")
-
-    return (
-        "\t".join(
-            [
-                feature.iv.chrom,
-                feature.source,
-                feature.type,
-                str(
-                    feature.iv.start + 1
-                ),  # See https://htseq.readthedocs.io/en/master/genomic.html#HTSeq.GenomicInterval
-                str(
-                    feature.iv.end
-                ),  # See https://htseq.readthedocs.io/en/master/genomic.html#HTSeq.GenomicInterval
-                feature.score,
-                feature.iv.strand,
-                str(feature.frame),
-                attr_to_string(attr_dict),
-            ]
-        )
-        + "\n"
-    )
 
+# ParentIndex of a worker process of `conv -j`
+worker_parents: Optional[ParentIndex] = None
 
-def stats_action(options: Namespace) -> None:
-    summary = {
-        "seqname": defaultdict(int),
-        "source": defaultdict(int),
-        "types": defaultdict(int),
-        "strand": defaultdict(int),
-        "phase": defaultdict(int)
-    }
-    for _, line in GFF_Reader(options.gff_file, show_progress=options.verbose):
-        (seqname, source, feature_type, start, end, score,
-            strand, frame, attributeStr) = line.split("\t", 8)
-        summary["seqname"][seqname] += 1
-        summary["source"][source] += 1
-        summary["types"][feature_type] += 1
-        summary["strand"][strand] += 1
-        summary["phase"][frame] += 1
-    json.dump(summary, sys.stdout, indent=2)
-    print("", file=sys.stdout)
+
+def init_convert_worker(parents: ParentIndex) -> None:
+    global worker_parents
+    parents.reopen()
+    worker_parents = parents
+
+
+def convert_chunk(
+    gff_file: str, start: int, end: int, id_prefix: List[str],
+    type_mapping: Dict[str, str], type_delimiter: str
+) -> Tuple[str, int]:
+    """Convert a chunk, return the GTF lines and the number of records."""
+    lines = list(GFF_Reader(read_lines(gff_file, start, end)).iter_lines())
+    return (convert_lines(
+        lines, worker_parents, id_prefix, type_mapping, type_delimiter),
+        len(lines))
 
 
 def convert_action(options: Namespace) -> None:
@@ -146,78 +131,332 @@ def convert_action(options: Namespace) -> None:
     for type_aes in options.type_mapping:
         old_type, new_type = type_aes.split(":")
         type_mapping[old_type] = new_type
-    gff3 = GFF_Reader(options.gff_file, show_progress=options.verbose)
-    i = 0
-    transcript_parent = {}
-    for feature, _ in gff3:
-        line = get_gtf_line(
-            feature, transcript_parent, options.id_prefix,
-            type_mapping, options.type_delimiter
-        )
-        sys.stdout.write(line)
-        i += 1
-        if i % 100000 == 0:
-            print("%d GFF lines processed." % i, file=sys.stderr)
+    # First pass: the gene of each transcript
+    parents = profile_calls("parent index", ParentIndex.build, CALLS)(
+        options.gff_file, options.id_prefix, options.type_delimiter,
+        threads=reader_threads(options), max_entries=options.max_parents)
+    with parents:
+        gff3 = GFF_Reader(
+            options.gff_file, show_progress=options.verbose,
+            threads=reader_threads(options), use_cache=options.use_cache)
+        if gff3.cache is not None:
+            # Records are built from the cached columns, without parsing
+            outputs = (
+                (convert_records(
+                    batch, parents, options.id_prefix, type_mapping,
+                    options.type_delimiter), len(batch))
+                for batch in gff3.load_table().record_batches())
+        elif use_processes(options):
+            outputs = map_chunks(
+                convert_chunk, options, options.id_prefix, type_mapping,
+                options.type_delimiter, initializer=init_convert_worker,
+                initargs=(parents,))
+        else:
+            outputs = (
+                (convert_lines(
+                    map(bytes.decode, lines), parents, options.id_prefix,
+                    type_mapping, options.type_delimiter), len(lines))
+                for lines in gff3.iter_record_blocks())
+        outputs = profile_stage(
+            "convert", outputs, count=lambda output: output[1])
+        n_records = 0
+        with open_output(options) as output:
+            try:
+                for text, count in outputs:
+                    output.write(text)
+                    if (n_records + count) // 100000 > n_records // 100000:
+                        print("%d GFF lines processed." % (n_records + count),
+                              file=sys.stderr)
+                    n_records += count
+            except ConversionError as e:
+                sys.exit("Error: %s" % e)
+
+
+def format_record(
+    feature: GFFRecord, raw_line: str, print_field: str
+) -> Optional[str]:
+    """Format the selected field of a record for output."""
+    if print_field == "all":
+        return raw_line
+    elif print_field == "attributes":
+        (*_, attributeStr) = raw_line.split("\t", 8)
+        return attributeStr
+    value = feature.get_attributes((print_field,)).get(print_field)
+    if value is not None:
+        return value + "\n"
+    return None
+
+
+def filter_chunk(
+    gff_file: str, start: int, end: int,
+    filter_params: Dict, print_field: str, sample_size: int
+) -> str:
+    filter_chain = FilterChain(filter_params, sample_size)
+    parser = AttributeParser()
+    # Comments and empty lines are skipped, as by `GFF_Reader`
+    lines = (line for line in read_byte_lines(gff_file, start, end)
+             if not line.startswith(b"#") and line != b"\n")
+    output = []
+    # Only the lines which pass the line filters are decoded
+    for line in filter_chain.byte_line_stage.filter(lines):
+        raw_line = line.decode("UTF-8")
+        feature = GFFRecord(raw_line, parser=parser)
+        if not filter_chain.validate_record(feature):
+            continue
+        text = format_record(feature, raw_line, print_field)
+        if text is not None:
+            output.append(text)
+    return "".join(output)
 
 
 def filter_action(options: Namespace) -> None:
-    for feature, raw_line in GFF_Filter(options.gff_file, vars(options), show_progress=options.verbose):
-        # Print out selected fields
+    gff_filter = GFF_Filter(
+        options.gff_file, vars(options),
+        show_progress=options.verbose, sample_size=options.sample_size,
+        use_index=options.use_index, threads=reader_threads(options),
+        use_mmap=options.use_mmap, use_cache=options.use_cache)
+    with open_output(options) as output:
+        if options.with_children:
+            try:
+                lines = gff_filter.iter_with_children()
+                if options.print_field == "all":
+                    output.writelines(lines)
+                    return
+                for line in lines:
+                    raw_line = line.decode("UTF-8")
+                    feature = GFFRecord(
+                        raw_line, parser=gff_filter.attribute_parser)
+                    text = format_record(
+                        feature, raw_line, options.print_field)
+                    if text is not None:
+                        output.write(text)
+            except GFFIndexError as e:
+                sys.exit("Error: %s" % e)
+            return
+
+        if (gff_filter.index is None and gff_filter.cache is None
+                and use_processes(options)):
+            filter_params = vars(options).copy()
+            del filter_params["func"]
+            for text in map_chunks(
+                    filter_chunk, options, filter_params,
+                    options.print_field, options.sample_size):
+                output.write(text)
+            return
+
         if options.print_field == "all":
-            sys.stdout.write(raw_line)
-        elif options.print_field == "attributes":
-            (*_, attributeStr) = raw_line.split("\t", 8)
-            sys.stdout.write(attributeStr)
-        else:
-            if options.print_field in feature.attr:
-                sys.stdout.write(
-                    feature.attr[options.print_field] + "\n")
+            # Write the input bytes of matching lines as they are
+            output.writelines(gff_filter.iter_raw_lines())
+            return
 
+        for feature, raw_line in gff_filter:
+            # Print out selected fields
+            text = format_record(feature, raw_line, options.print_field)
+            if text is not None:
+                output.write(text)
 
-def seq_action(options: Namespace) -> None:
-    fasta_file = options.genome
-    for feature, _ in GFF_Filter(options.gff_file, vars(options), show_progress=options.verbose):
-        # Note: pyfaidx sequence slicing uses 0-based half-open interval, GFF_Reader too.
-        try:
-            sequence = genome_extract(
-                fasta_file, feature.iv.chrom,
-                feature.iv.start, feature.iv.end,
-                feature.iv.strand)
 
-            if options.line_length:
-                seqstr = textwrap.fill(str(sequence), options.line_length)
-            else:
-                seqstr = str(sequence)
-
-            if options.fasta_header:
-                env = {
-                    "seqid": feature.iv.chrom,
-                    "source": feature.source,
-                    "type": feature.type,
-                    "start": feature.iv.start + 1,
-                    "end": feature.iv.end,
-                    "score": feature.score,
-                    "strand": feature.iv.strand,
-                    "phase": str(feature.frame),
-                    "attributes": feature.attr
-                }
-                header = eval(options.fasta_header, env)
+def index_action(options: Namespace) -> None:
+    try:
+        build_index(options.gff_file)
+    except GFFIndexError as e:
+        sys.exit("Error: %s" % e)
+
+
+def cache_build_action(options: Namespace) -> None:
+    for gff_file in options.gff_files:
+        try:
+            cache = build_cache(gff_file, threads=reader_threads(options))
+        except GFFCacheError as e:
+            sys.exit("Error: %s" % e)
+        if options.verbose:
+            print("%s: %d records, %.1f MB in %s" % (
+                gff_file, cache.rows, cache.nbytes / MEGABYTE,
+                cache.directory), file=sys.stderr)
+
+
+def cache_info_action(options: Namespace) -> None:
+    print("Cache directory: %s" % cache_root())
+    if options.gff_files:
+        directories = {cache_dirname(gff_file) for gff_file in options.gff_files}
+    else:
+        directories = None
+    for directory, cache in iter_caches():
+        if directories is not None and directory not in directories:
+            continue
+        if cache is None:
+            print("%s\tinvalid" % directory)
+            continue
+        print("%s\t%s\t%d records\t%.1f MB" % (
+            cache.path, "current" if cache.is_current() else "outdated",
+            cache.rows, cache.nbytes / MEGABYTE))
+
+
+def cache_clean_action(options: Namespace) -> None:
+    if options.gff_files:
+        directories = {cache_dirname(gff_file) for gff_file in options.gff_files}
+    else:
+        directories = None
+    for directory, cache in iter_caches():
+        if directories is not None:
+            if directory not in directories:
+                continue
+        elif not options.all and cache is not None and cache.is_current():
+            continue
+        shutil.rmtree(directory)
+        if options.verbose:
+            print("Removed %s" % directory, file=sys.stderr)
+
+
+def format_header(
+    header: str, source: str, chrom: str, start: int, end: int,
+    strand: str, sequence: str
+) -> str:
+    """Fill the `{source}`, `{chr}`, `{start}`, `{end}`, `{strand}` and
+    `{sequence}` fields of a header given by `--fasta-header`."""
+    if "{" not in header:
+        return header
+    return header.format(
+        source=source, chr=chrom, start=str(start), end=str(end),
+        strand=strand, sequence=sequence)
+
+
+def write_sequences(
+    fasta: FastaWriter,
+    genome: GenomeExtractor,
+    features: List[GFFRecord],
+    options: Namespace,
+    fasta_header: Optional[Expression] = None
+) -> None:
+    # Note: pyfaidx sequence slicing uses 0-based half-open interval, GFF_Reader too.
+    sequences = genome.extract_batch(
+        (f.iv.chrom, f.iv.start, f.iv.end, f.iv.strand) for f in features)
+    for feature, sequence in zip(features, sequences):
+        try:
+            if isinstance(sequence, SeqExtractError):
+                raise sequence
+
+            seqstr = str(sequence)
+            if options.translate:
+                seqstr = translate(seqstr[frame_offset(feature):])
+
+            if fasta_header:
+                header = format_header(
+                    str(fasta_header.evaluate(feature)), feature.source,
+                    feature.iv.chrom, feature.iv.start + 1, feature.iv.end,
+                    feature.iv.strand, seqstr)
             else:
-                header = "chromosome:{source}:{chr}:{start}:{end}:{strand}"
-            sys.stdout.write(
-                (">" + header + "\n" + "{sequence}\n\n").format(
-                    source = feature.source,
-                    chr = feature.iv.chrom,
-                    start = str(feature.iv.start + 1),
-                    end = str(feature.iv.end),
-                    strand = feature.iv.strand,
-                    sequence = seqstr
-                )
-            )
+                header = "chromosome:%s:%s:%d:%d:%s" % (
+                    feature.source, feature.iv.chrom, feature.iv.start + 1,
+                    feature.iv.end, feature.iv.strand)
+            fasta.write(header, seqstr)
         except SeqExtractError:
             print("Warning: extract failed for", feature, file=sys.stderr)
 
 
+def write_spliced_sequences(
+    fasta: FastaWriter,
+    genome: GenomeExtractor,
+    transcripts: List[Transcript],
+    options: Namespace,
+    fasta_header: Optional[Expression] = None
+) -> None:
+    sequences = genome.extract_spliced_batch(transcripts)
+    for transcript, sequence in zip(transcripts, sequences):
+        if isinstance(sequence, SeqExtractError):
+            print("Warning: extract failed for transcript", transcript.key,
+                  file=sys.stderr)
+            continue
+        if options.translate:
+            if options.spliced == "cds":
+                sequence = sequence[transcript.phase:]
+            sequence = translate(sequence)
+        first = transcript.segments[0]
+        if fasta_header:
+            # Evaluated on the segment with the lowest start
+            header = format_header(
+                str(fasta_header.evaluate(first)), first.source,
+                transcript.seqid, transcript.start, transcript.end,
+                transcript.strand, sequence)
+        else:
+            header = "%s chromosome:%s:%s:%d:%d:%s" % (
+                transcript.key, first.source, transcript.seqid,
+                transcript.start, transcript.end, transcript.strand)
+        fasta.write(header, sequence)
+
+
+# Number of features extracted per batch in `seq_action`
+SEQ_BATCH_SIZE = 10000
+
+
+def seq_action(options: Namespace) -> None:
+    fasta_header = None
+    if options.fasta_header:
+        fasta_header = Expression(options.fasta_header)
+    genome = GenomeExtractor(
+        options.genome, buffered=options.prefetch,
+        buffer_size=options.prefetch_size * 1000 * 1000)
+    with genome, open_output(options) as output:
+        features = GFF_Filter(
+            options.gff_file, vars(options),
+            show_progress=options.verbose, sample_size=options.sample_size,
+            use_index=options.use_index, use_mmap=options.use_mmap,
+            use_cache=options.use_cache).iter_records()
+        fasta = FastaWriter(output, options.line_length)
+        if options.spliced:
+            transcripts, n_segments = [], 0
+            try:
+                for transcript in group_transcripts(
+                        features, SEGMENT_TYPES[options.spliced]):
+                    transcripts.append(transcript)
+                    n_segments += len(transcript.segments)
+                    if n_segments >= SEQ_BATCH_SIZE:
+                        write_spliced_sequences(
+                            fasta, genome, transcripts, options, fasta_header)
+                        transcripts, n_segments = [], 0
+            except SplitTranscriptError as e:
+                sys.exit("Error: %s" % e)
+            write_spliced_sequences(
+                fasta, genome, transcripts, options, fasta_header)
+            return
+        batch = []
+        for feature in features:
+            batch.append(feature)
+            if len(batch) >= SEQ_BATCH_SIZE:
+                write_sequences(fasta, genome, batch, options, fasta_header)
+                batch = []
+        write_sequences(fasta, genome, batch, options, fasta_header)
+
+
+def profile_action(options: Namespace) -> None:
+    """Run the subcommand with the profilers asked for by the options.
+
+    `--profile` prints the time of each stage to stderr, `--profile-json`
+    writes it to a file, and `--cprofile` dumps cProfile statistics.
+    Worker processes of `-j` are not profiled.
+    """
+    profiler = None
+    if options.profile or options.profile_json:
+        profiler = Profiler()
+    cprofile = cProfile.Profile() if options.cprofile else None
+    try:
+        with profiler or nullcontext():
+            if cprofile is not None:
+                cprofile.runcall(options.func, options)
+            else:
+                options.func(options)
+    finally:
+        if cprofile is not None:
+            cprofile.dump_stats(options.cprofile)
+        if profiler is not None and options.profile:
+            print("Profile of gfftools %s:" % " ".join(sys.argv[1:]),
+                  file=sys.stderr)
+            profiler.report(sys.stderr)
+        if profiler is not None and options.profile_json:
+            with open(options.profile_json, "w") as f:
+                profiler.write_json(f, command=sys.argv[1:])
+
+
 def cli():
     parent_parser = argparse.ArgumentParser(add_help=False)
     parent_parser.add_argument("gff_file", help="GFF3 file obtained from Ensembl.", type=str, metavar="GFF_FILE")
@@ -225,15 +464,88 @@ def cli():
 
     parser = argparse.ArgumentParser(description="GFF tool.")
     parser.add_argument('--version', action='version', version='pygff %s' % __version__)
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        help="Print the wall and CPU time of each stage of the subcommand, "
+        "and the records rejected by each filter, to stderr.",
+    )
+    parser.add_argument(
+        "--profile-json",
+        dest="profile_json",
+        default=None,
+        metavar="FILE",
+        help="Write the profile of --profile to FILE as JSON.",
+    )
+    parser.add_argument(
+        "--cprofile",
+        dest="cprofile",
+        default=None,
+        metavar="FILE",
+        help="Run the subcommand with cProfile, and write its statistics to "
+        "FILE, to be read with `python -m pstats FILE`.",
+    )
     subparsers = parser.add_subparsers()
 
+    parent_threads = argparse.ArgumentParser(add_help=False)
+    parent_threads.add_argument(
+        "-j",
+        "--threads",
+        dest="threads",
+        default=None,
+        type=int,
+        help="Number of worker processes. An uncompressed GFF file is split "
+        "into chunks which are processed in parallel, a BGZF compressed file "
+        "is decompressed with this many threads. (default: 1 process)",
+    )
+
+    parent_output = argparse.ArgumentParser(add_help=False)
+    parent_output.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        default=None,
+        metavar="FILE",
+        help="Write the output to FILE instead of stdout. A FILE ending with "
+        "`.gz` is gzip compressed.",
+    )
+    parent_output.add_argument(
+        "--bgzf",
+        dest="bgzf",
+        action="store_true",
+        help="Compress the output as BGZF, on as many threads as `-j` if given.",
+    )
+
+    parent_cache = argparse.ArgumentParser(add_help=False)
+    parent_cache.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Do not read GFF_FILE from its cache, see `gfftools cache`.",
+    )
+
     stats_cmd = subparsers.add_parser(
-        "stats", help="Print overview stats of GFF file.", parents=[parent_parser]
+        "stats", help="Print overview stats of GFF file.",
+        parents=[parent_parser, parent_threads, parent_output]
     )
     stats_cmd.set_defaults(func=stats_action)
+    stats_cmd.add_argument(
+        "--lengths",
+        dest="lengths",
+        action="store_true",
+        help="Summarize the lengths of features of each type.",
+    )
+    stats_cmd.add_argument(
+        "--attribute-keys",
+        dest="attribute_keys",
+        action="store_true",
+        help="Count the features having each attribute key.",
+    )
 
     convert_cmd = subparsers.add_parser(
-        "conv", help="Converts Ensembl's favored GFF3 to GTF.", parents=[parent_parser]
+        "conv", help="Converts Ensembl's favored GFF3 to GTF.",
+        parents=[parent_parser, parent_threads, parent_cache, parent_output]
     )
     convert_cmd.set_defaults(func=convert_action)
     convert_cmd.add_argument(
@@ -272,6 +584,58 @@ def cli():
         help="Specifies whether the end coordinate of marks the last base-pair"
         " in output GFF file. (default: %(default)s)",
     )
+    convert_cmd.add_argument(
+        "--max-parents",
+        dest="max_parents",
+        default=MAX_MEMORY_ENTRIES,
+        type=int,
+        help="Keep the genes of up to N transcripts in memory, and store the "
+        "others in a temporary file. (default: %(default)s)",
+    )
+
+    index_cmd = subparsers.add_parser(
+        "index", help="Index a sorted GFF file for region queries.",
+        description="Write the index GFF_FILE.gfi of a GFF file whose records "
+        "are grouped by seqid and sorted by start position. The file may be "
+        "BGZF compressed. `filter --region` and `seq --region` read only the "
+        "parts of an indexed file which may contain the regions."
+    )
+    index_cmd.set_defaults(func=index_action)
+    index_cmd.add_argument("gff_file", help="Sorted GFF file.", type=str, metavar="GFF_FILE")
+
+    cache_cmd = subparsers.add_parser(
+        "cache", help="Build, inspect and clean caches of parsed GFF files.",
+        description="The cache of a GFF file stores its parsed records in a "
+        "binary columnar format. `filter`, `seq` and `conv` read an up-to-date "
+        "cache instead of parsing the file. A cache is outdated once the "
+        "size or modification time of the file changes. Caches are stored in "
+        "$PYGFF_CACHE_DIR, or in $XDG_CACHE_HOME/pygff (default ~/.cache/pygff)."
+    )
+    cache_subparsers = cache_cmd.add_subparsers()
+    cache_build_cmd = cache_subparsers.add_parser(
+        "build", help="Parse GFF files and write their caches.",
+        parents=[parent_threads]
+    )
+    cache_build_cmd.set_defaults(func=cache_build_action)
+    cache_build_cmd.add_argument("gff_files", nargs="+", metavar="GFF_FILE")
+    cache_build_cmd.add_argument(
+        "-v", "--verbose", help="Print the size of each cache.", action="store_true")
+    cache_info_cmd = cache_subparsers.add_parser(
+        "info", help="List caches, or the caches of the given GFF files."
+    )
+    cache_info_cmd.set_defaults(func=cache_info_action)
+    cache_info_cmd.add_argument("gff_files", nargs="*", metavar="GFF_FILE")
+    cache_clean_cmd = cache_subparsers.add_parser(
+        "clean", help="Remove outdated and invalid caches, or the caches "
+        "of the given GFF files."
+    )
+    cache_clean_cmd.set_defaults(func=cache_clean_action)
+    cache_clean_cmd.add_argument("gff_files", nargs="*", metavar="GFF_FILE")
+    cache_clean_cmd.add_argument(
+        "-a", "--all", dest="all", action="store_true",
+        help="Remove all caches.")
+    cache_clean_cmd.add_argument(
+        "-v", "--verbose", help="Print removed caches.", action="store_true")
 
     parent_filter = argparse.ArgumentParser(add_help=False)
     parent_filter.add_argument(
@@ -326,6 +690,38 @@ def cli():
         "whose start and end points are both contained within this region "
         "will be kept."
     )
+    parent_filter.add_argument(
+        "--no-index",
+        dest="use_index",
+        action="store_false",
+        help="Do not use the index of GFF_FILE for region queries, see `gfftools index`.",
+    )
+    parent_filter.add_argument(
+        "--mmap",
+        dest="use_mmap",
+        action="store_true",
+        help="Memory map an uncompressed GFF_FILE instead of reading it. "
+        "This is faster for repeated queries of a large file on local disk.",
+    )
+    parent_filter.add_argument(
+        "--regions-file",
+        dest="regions_file",
+        action="append",
+        default=[],
+        help="Read regions from a BED file, or from a file with one region "
+        "string per line as accepted by `--region`.",
+    )
+    parent_filter.add_argument(
+        "--values-file",
+        dest="values_file",
+        action="append",
+        default=[],
+        metavar="FIELD=FILE",
+        help="Read the candidate values of a field from FILE, one per line. "
+        "FIELD is one of seqid, source, type and strand, or the key of an "
+        "attribute, such as `--values-file gene_id=gene_ids.txt`. A record "
+        "passes if its value is any one of the values in FILE.",
+    )
     parent_filter.add_argument(
         "-e",
         "--expression",
@@ -333,10 +729,21 @@ def cli():
         default=None,
         help="Execute the specified python code and use the output as filtering criteria.",
     )
+    parent_filter.add_argument(
+        "--sample-size",
+        dest="sample_size",
+        default=0,
+        type=int,
+        help="Check the first N records with every filter to measure how many "
+        "records each filter rejects, then run the most selective filters first. "
+        "(default: %(default)s, filters are ordered by cost only)",
+    )
 
     filter_cmd = subparsers.add_parser(
         "filter", help="Filter records in GFF files based on specified parameters.",
-        parents=[parent_parser, parent_filter]
+        parents=[
+            parent_parser, parent_filter, parent_threads, parent_cache,
+            parent_output]
     )
     filter_cmd.set_defaults(func=filter_action)
     filter_cmd.add_argument(
@@ -349,10 +756,19 @@ def cli():
         "Any other value will be treated as a key of attributes and the value "
         "of that key will be printed out. (default: %(default)s)",
     )
+    filter_cmd.add_argument(
+        "--with-children",
+        dest="with_children",
+        action="store_true",
+        help="Also keep the descendants of matching records, such as the "
+        "transcripts, exons and CDS of matching genes, found by their ID and "
+        "Parent attributes (gene_id and transcript_id in GTF files). GFF_FILE "
+        "must be uncompressed or BGZF compressed.",
+    )
 
     seq_cmd = subparsers.add_parser(
         "seq", help="Extract sequences from FASTA files based on GFF annotation.",
-        parents=[parent_parser, parent_filter]
+        parents=[parent_parser, parent_filter, parent_cache, parent_output]
     )
     seq_cmd.set_defaults(func=seq_action)
     seq_cmd.add_argument(
@@ -369,6 +785,23 @@ def cli():
         "python code and use the output as headers of each record.",
         default=None
     )
+    seq_cmd.add_argument(
+        "--spliced",
+        dest="spliced",
+        choices=sorted(SEGMENT_TYPES),
+        default=None,
+        help="Join the exons (transcript) or CDS (cds) of each transcript into "
+        "one sequence. Records are grouped by their transcript_id or Parent "
+        "attribute, and the records of a transcript must be close to each "
+        "other in GFF_FILE.",
+    )
+    seq_cmd.add_argument(
+        "--translate",
+        dest="translate",
+        action="store_true",
+        help="Translate sequences to proteins, starting from the phase of the "
+        "first CDS.",
+    )
     seq_cmd.add_argument(
         "-L",
         "--line-length",
@@ -377,10 +810,30 @@ def cli():
         type = int,
         help="Line length for sequences."
     )
+    seq_cmd.add_argument(
+        "--prefetch",
+        dest="prefetch",
+        action="store_true",
+        help="Read the genome one chromosome at a time and slice sequences "
+        "out of memory, instead of reading them one by one. Much faster when "
+        "GFF_FILE is sorted by seqid and start.",
+    )
+    seq_cmd.add_argument(
+        "--prefetch-size",
+        dest="prefetch_size",
+        type=int,
+        default=DEFAULT_BUFFER_SIZE // (1000 * 1000),
+        metavar="MB",
+        help="With --prefetch, chromosomes longer than this many megabases "
+        "are read in windows of this size. (default: %(default)s)",
+    )
 
     options = parser.parse_args()
     try:
-        options.func(options)
+        if options.profile or options.profile_json or options.cprofile:
+            profile_action(options)
+        else:
+            options.func(options)
     except BrokenPipeError:
-        pass
+        silence_stdout()
 
@@ -0,0 +1,107 @@
+"""Buffered output of gfftools subcommands.
+
+Records are collected in a buffer and written in chunks of about
+`BUFFER_SIZE` bytes, instead of one write call per record. Output goes to
+stdout or to a file, which may be gzip or BGZF compressed.
+"""
+
+import gzip
+import os
+import sys
+from typing import BinaryIO, Iterable, List, Optional
+
+from pygff.bgzf import BGZFWriter, DEFAULT_THREADS
+from pygff.profiling import profile_calls, BYTES
+
+# Buffered output is written in chunks of about this many bytes
+BUFFER_SIZE = 1024 * 1024
+
+
+class OutputWriter(object):
+    """Write text and bytes through a large buffer.
+
+    `filename` None or "-" means stdout. A file name ending with ".gz" is
+    gzip compressed, and with `bgzf` the output is BGZF compressed on
+    `threads` threads whatever its name.
+    """
+
+    def __init__(
+            self, filename: Optional[str] = None, bgzf=False,
+            threads=DEFAULT_THREADS, buffer_size=BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.buffer: List[bytes] = []
+        self.size = 0
+        self.to_stdout = filename is None or filename == "-"
+        self.file: BinaryIO = None
+        if self.to_stdout:
+            # Text written to sys.stdout before must come first
+            sys.stdout.flush()
+            self.file = sys.stdout.buffer
+        else:
+            self.file = open(filename, "wb")
+        self.raw = self.file
+        if bgzf:
+            self.file = BGZFWriter(self.raw, threads)
+        elif not self.to_stdout and filename.endswith(".gz"):
+            self.file = gzip.GzipFile(fileobj=self.raw, mode="wb")
+        # Compresses and writes a chunk
+        self.write_chunk = profile_calls("output", self.file.write, BYTES, len)
+
+    def write(self, text: str):
+        self.write_bytes(text.encode("UTF-8"))
+
+    def write_bytes(self, data: bytes):
+        self.buffer.append(data)
+        self.size += len(data)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def writelines(self, lines: Iterable[bytes]):
+        """Write undecoded lines, such as `GFF_Filter.iter_raw_lines`."""
+        buffer, size = self.buffer, self.size
+        for line in lines:
+            buffer.append(line)
+            size += len(line)
+            if size >= self.buffer_size:
+                self.size = size
+                self.flush()
+                buffer, size = self.buffer, 0
+        self.size = size
+
+    def flush(self):
+        if self.buffer:
+            data = b"".join(self.buffer)
+            self.buffer = []
+            self.size = 0
+            self.write_chunk(data)
+
+    def close(self):
+        try:
+            self.flush()
+            if self.file is not self.raw:
+                self.file.close()
+        finally:
+            if self.to_stdout:
+                self.raw.flush()
+            else:
+                self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is BrokenPipeError and self.to_stdout:
+            # Nothing more can be written, see `silence_stdout`
+            silence_stdout()
+            return
+        self.close()
+
+
+def silence_stdout():
+    """Point stdout to /dev/null after the reader of a pipe went away.
+
+    Otherwise, flushing stdout at exit raises BrokenPipeError again.
+    """
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    os.close(devnull)
@@ -0,0 +1,88 @@
+"""Processing of uncompressed files in chunks on a process pool.
+
+A file is split into byte ranges aligned to line boundaries, each range is
+handled by a worker process, and the results are returned in the order of
+the ranges. Only a bounded number of ranges are in flight at a time, so
+memory stays flat however large the file is.
+"""
+
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from pygff.bgzf import is_gzip
+from pygff.reader import split_lines, translate_newlines
+
+# Size of the byte range handled by a worker at a time
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def can_split(filename) -> bool:
+    """Whether a file can be split into byte ranges."""
+    return isinstance(filename, str) and not is_gzip(filename)
+
+
+def split_file(filename: str, chunk_size: int = CHUNK_SIZE) -> List[Tuple[int, int]]:
+    """Split a file into ranges of about `chunk_size` bytes.
+
+    Every range except the first starts at the beginning of a line.
+    """
+    filesize = os.stat(filename).st_size
+    ranges = []
+    start = 0
+    with open(filename, "rb") as f:
+        while start < filesize:
+            f.seek(min(start + chunk_size, filesize))
+            # Move to the start of the next line
+            f.readline()
+            end = min(f.tell(), filesize)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_bytes(filename: str, start: int, end: int) -> bytes:
+    with open(filename, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+def read_lines(filename: str, start: int, end: int) -> List[str]:
+    """Read lines in the byte range [start, end) of a file."""
+    data = read_bytes(filename, start, end)
+    # Same newline translation as files opened in text mode
+    return list(io.StringIO(data.decode("UTF-8"), newline=None))
+
+
+def read_byte_lines(filename: str, start: int, end: int) -> List[bytes]:
+    """Read undecoded lines in the byte range [start, end) of a file."""
+    return split_lines(translate_newlines(read_bytes(filename, start, end)))
+
+
+def imap_ordered(
+    func: Callable, tasks: Iterable[Tuple], processes: int,
+    max_pending: int = None, initializer: Callable = None,
+    initargs: Tuple = ()
+) -> Iterator:
+    """Apply `func(*task)` to each task on a process pool.
+
+    Results are yielded in the order of tasks. At most `max_pending` tasks,
+    twice the number of processes by default, are submitted ahead of the
+    result being consumed. `initializer(*initargs)` is called once in each
+    worker process, to pass data shared by all tasks.
+    """
+    if max_pending is None:
+        max_pending = processes * 2
+    tasks = iter(tasks)
+    pending = deque()
+    with ProcessPoolExecutor(
+            max_workers=processes, initializer=initializer,
+            initargs=initargs) as executor:
+        for task in tasks:
+            pending.append(executor.submit(func, *task))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
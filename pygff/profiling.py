@@ -0,0 +1,309 @@
+"""Wall and CPU time of the stages of a gfftools run.
+
+A run reads blocks of the file, splits them into lines, checks the line
+filters, decodes the lines, builds records, checks the record filters and
+writes the output. While a `Profiler` is active (see `gfftools --profile`),
+each of these stages is marked by `profile_stage` or `profile_calls`, which
+are called once when a pipeline is built. With no active profiler they
+return their argument unchanged, so the records pass through no profiling
+code at all.
+
+Stages run inside each other, e.g. the record filters pull records, which
+pull decoded lines. A stage only pushes itself on a stack while it runs,
+and interval timers sample the stage on top of the stack every
+`SAMPLE_INTERVAL` seconds of wall time (SIGALRM) and of CPU time of the
+process (SIGPROF). Reading clocks for each record would cost more than
+most stages. The time of a stage is thus its own time, without the time
+of the stages it calls, and it is only precise for runs of many samples.
+Waiting for the disk is counted in the wall time of the stage which reads.
+
+The filters of a stage also count how many items each filter checked and
+rejected.
+"""
+
+import json
+import signal
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+# Stages in the order of the pipeline, for reports
+STAGES = (
+    "read", "split", "line filters", "decode", "records", "record filters",
+    "attributes", "count", "parent index", "convert", "cache table",
+    "hierarchy", "sequence fetch", "output",
+)
+
+# Units of the items counted by a stage
+RECORDS = "records"
+BYTES = "bytes"
+CALLS = "calls"
+
+# Seconds between two samples
+SAMPLE_INTERVAL = 0.001
+
+MEGABYTE = 1024 * 1024
+
+# Interval timers are not available on Windows
+CAN_SAMPLE = hasattr(signal, "setitimer")
+
+
+class Stage(object):
+    """Samples taken while a stage was running, and its items."""
+
+    __slots__ = ("name", "unit", "items", "wall_samples", "cpu_samples")
+
+    def __init__(self, name: str, unit: str = RECORDS):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.wall_samples = 0
+        self.cpu_samples = 0
+
+
+class FilterCount(object):
+    """Items checked and rejected by a filter."""
+
+    __slots__ = ("name", "stage", "checked", "rejected")
+
+    def __init__(self, name: str, stage: str):
+        self.name = name
+        self.stage = stage
+        self.checked = 0
+        self.rejected = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name, "stage": self.stage,
+            "checked": self.checked, "rejected": self.rejected,
+        }
+
+
+class Profiler(object):
+    """Profile the stages of a run, see `profile_stage` and `profile_calls`.
+
+    Used as a context manager in the main thread, the profiler is active
+    and samples stages in the block, and measures the total wall and CPU
+    time of the block.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stages: Dict[str, Stage] = OrderedDict()
+        self.filters: Dict[tuple, FilterCount] = OrderedDict()
+        # Running stages, innermost last
+        self.running: List[Stage] = []
+        # Samples taken outside of any stage
+        self.other = Stage("other")
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.previous: Optional[Profiler] = None
+        self.handlers = None
+
+    def stage(self, name: str, unit: str = RECORDS) -> Stage:
+        try:
+            return self.stages[name]
+        except KeyError:
+            stage = self.stages[name] = Stage(name, unit)
+            return stage
+
+    def iterate(
+        self, name: str, items: Iterable, unit: str = RECORDS,
+        count: Optional[Callable] = None
+    ) -> Iterator:
+        """Iterate over `items`, each step running as stage `name`.
+
+        Each item counts as `count(item)` items of the stage, 1 by default.
+        """
+        stage = self.stage(name, unit)
+        push, pop = self.running.append, self.running.pop
+        items = iter(items)
+        while True:
+            push(stage)
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                pop()
+            stage.items += 1 if count is None else count(item)
+            yield item
+
+    def timed(
+        self, name: str, func: Callable, unit: str = RECORDS,
+        count: Optional[Callable] = None
+    ) -> Callable:
+        """Wrap `func`, each call running as stage `name`.
+
+        Each call counts as `count(*args)` items of the stage, 1 by default.
+        """
+        stage = self.stage(name, unit)
+        push, pop = self.running.append, self.running.pop
+
+        def timed_func(*args, **kwargs):
+            push(stage)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                pop()
+                stage.items += 1 if count is None else count(*args)
+
+        return timed_func
+
+    def counted(self, stage: str, filter, check: Callable) -> Callable:
+        """Wrap `check` of `filter`, counting the items it rejects."""
+        key = (stage, id(filter))
+        counts = self.filters.get(key)
+        if counts is None:
+            counts = self.filters[key] = FilterCount(
+                type(filter).__name__, stage)
+
+        def counted_check(item) -> bool:
+            counts.checked += 1
+            if check(item):
+                return True
+            counts.rejected += 1
+            return False
+
+        return counted_check
+
+    def sample_wall(self, signum, frame):
+        (self.running[-1] if self.running else self.other).wall_samples += 1
+
+    def sample_cpu(self, signum, frame):
+        (self.running[-1] if self.running else self.other).cpu_samples += 1
+
+    def __enter__(self):
+        global _profiler
+        self.previous, _profiler = _profiler, self
+        if CAN_SAMPLE:
+            self.handlers = (
+                signal.signal(signal.SIGALRM, self.sample_wall),
+                signal.signal(signal.SIGPROF, self.sample_cpu))
+            signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        self.started = time.perf_counter(), time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _profiler
+        self.wall += time.perf_counter() - self.started[0]
+        self.cpu += time.process_time() - self.started[1]
+        if self.handlers is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGALRM, self.handlers[0])
+            signal.signal(signal.SIGPROF, self.handlers[1])
+            self.handlers = None
+        _profiler, self.previous = self.previous, None
+
+    def sorted_stages(self) -> List[Stage]:
+        """Stages in pipeline order, leaving out those which never ran."""
+        order = {name: i for i, name in enumerate(STAGES)}
+        return sorted(
+            (stage for stage in self.stages.values()
+             if stage.items or stage.wall_samples or stage.cpu_samples),
+            key=lambda stage: order.get(stage.name, len(STAGES)))
+
+    def times(self) -> List[Dict]:
+        """Wall and CPU time of each stage, and of "other" last.
+
+        The total time is shared between stages in proportion to their
+        samples.
+        """
+        stages = self.sorted_stages() + [self.other]
+        wall_samples = sum(stage.wall_samples for stage in stages)
+        cpu_samples = sum(stage.cpu_samples for stage in stages)
+        return [{
+            "name": stage.name, "unit": stage.unit, "items": stage.items,
+            "wall": self.wall * stage.wall_samples / max(wall_samples, 1),
+            "cpu": self.cpu * stage.cpu_samples / max(cpu_samples, 1),
+            "wall_samples": stage.wall_samples,
+            "cpu_samples": stage.cpu_samples,
+        } for stage in stages]
+
+    def to_dict(self) -> Dict:
+        return {
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "interval": self.interval,
+            "stages": self.times(),
+            "filters": [counts.to_dict() for counts in self.filters.values()],
+        }
+
+    def write_json(self, file: TextIO, **metadata):
+        json.dump(dict(metadata, **self.to_dict()), file, indent=2)
+        file.write("\n")
+
+    def report(self, file: TextIO):
+        """Print a table of the stages and filters to `file`."""
+        times = self.times()
+        print("%-16s %9s %9s %7s %14s %14s" % (
+            "stage", "wall (s)", "CPU (s)", "wall %", "items", "items/s"),
+            file=file)
+        for stage in times:
+            rate = ""
+            if stage["wall"] > 0 and stage["unit"] != CALLS:
+                rate = format_items(stage["items"] / stage["wall"], stage["unit"])
+            print("%-16s %9.3f %9.3f %6.1f%% %14s %14s" % (
+                stage["name"], stage["wall"], stage["cpu"],
+                100 * stage["wall"] / max(self.wall, 1e-9),
+                format_items(stage["items"], stage["unit"])
+                if stage is not times[-1] else "", rate
+                if stage is not times[-1] else ""), file=file)
+        print("%-16s %9.3f %9.3f" % ("total", self.wall, self.cpu), file=file)
+        if not CAN_SAMPLE:
+            print("Stages are not timed on this platform.", file=file)
+        elif sum(stage["wall_samples"] for stage in times) < 100:
+            print("Few samples were taken, stage times are imprecise.",
+                  file=file)
+        if not self.filters:
+            return
+        print(file=file)
+        print("%-24s %-16s %12s %12s" % (
+            "filter", "stage", "checked", "rejected"), file=file)
+        for counts in self.filters.values():
+            print("%-24s %-16s %12d %12d" % (
+                counts.name, counts.stage, counts.checked, counts.rejected),
+                file=file)
+
+
+def format_items(items: float, unit: str) -> str:
+    if unit == BYTES:
+        return "%.1f MB" % (items / MEGABYTE)
+    return "%d" % items
+
+
+# The active profiler, set by `Profiler.__enter__`
+_profiler: Optional[Profiler] = None
+
+
+def active_profiler() -> Optional[Profiler]:
+    return _profiler
+
+
+def profile_stage(
+    name: str, items: Iterable, unit: str = RECORDS,
+    count: Optional[Callable] = None
+) -> Iterable:
+    """`items` run as stage `name`, see `Profiler.iterate`."""
+    if _profiler is None:
+        return items
+    return _profiler.iterate(name, items, unit, count)
+
+
+def profile_calls(
+    name: str, func: Callable, unit: str = RECORDS,
+    count: Optional[Callable] = None
+) -> Callable:
+    """`func` run as stage `name`, see `Profiler.timed`."""
+    if _profiler is None:
+        return func
+    return _profiler.timed(name, func, unit, count)
+
+
+def profile_filter(stage: str, filter, check: Callable) -> Callable:
+    """`check` of `filter`, counting rejections, see `Profiler.counted`."""
+    if _profiler is None:
+        return check
+    return _profiler.counted(stage, filter, check)
@@ -1,41 +1,154 @@
+import io
+import mmap
 import re
 import os
-from typing import Dict, List, Tuple, Iterator
+from itertools import chain, repeat
+from typing import Collection, Dict, List, Optional, Tuple, Iterator
 
 import HTSeq
 from HTSeq import (
     GenomicFeature,
-    GenomicInterval,
-    parse_GFF_attribute_string
+    GenomicInterval
 )
 
-from pygff.utils import ProgressBar
+from pygff.utils import ProgressBar, MEGABYTE
+from pygff.bgzf import open_input, is_gzip, DEFAULT_THREADS
+from pygff.cache import load_cache
+from pygff.attributes import AttributeParser, parse_attributes, UNNAMED
+from pygff.profiling import profile_stage, profile_calls, BYTES, CALLS
+
+# Files are read in blocks of this many bytes
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# A "##key value" directive line
+DIRECTIVE = re.compile(r"##\s*(\S+)\s+(\S*)")
+
+
+def iter_blocks(
+    filename: str, threads: int = DEFAULT_THREADS, block_size: int = BLOCK_SIZE,
+    use_mmap: bool = False
+) -> Iterator[Tuple[bytes, int]]:
+    """Read a plain, gzip or BGZF compressed file in blocks of whole lines.
+
+    Yields each block of about `block_size` decompressed bytes, together with
+    the position in the underlying file reached so far. Newlines are
+    translated as text mode would. With `use_mmap`, a plain file is memory
+    mapped and blocks are cut from the mapping, see `iter_mapped_blocks`.
+    """
+    if use_mmap and not is_gzip(filename) and os.stat(filename).st_size:
+        yield from iter_mapped_blocks(filename, block_size)
+        return
+    stream, raw = open_input(filename, threads)
+    try:
+        partial = b""
+        while True:
+            data = stream.read(block_size)
+            if not data:
+                break
+            end = data.rfind(b"\n") + 1
+            if end == 0:
+                partial += data
+                continue
+            yield (translate_newlines(partial + data[:end]), raw.tell())
+            partial = data[end:]
+        if partial:
+            yield (translate_newlines(partial), raw.tell())
+    finally:
+        stream.close()
+        raw.close()
+
+
+def iter_mapped_blocks(
+    filename: str, block_size: int = BLOCK_SIZE
+) -> Iterator[Tuple[bytes, int]]:
+    """Read a plain file in blocks of whole lines from a memory mapping.
+
+    Line ends are found in the mapping, so each block is copied out of the
+    page cache once, without the read buffer and joining of partial lines
+    of `iter_blocks`.
+    """
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            size = len(mapped)
+            start = 0
+            while start < size:
+                end = mapped.rfind(b"\n", start, start + block_size) + 1
+                if end == 0:
+                    # A line longer than a block
+                    end = mapped.find(b"\n", start) + 1 or size
+                if start + block_size >= size:
+                    end = size
+                yield (translate_newlines(mapped[start:end]), end)
+                start = end
+
+
+def translate_newlines(block: bytes) -> bytes:
+    if b"\r" in block:
+        block = block.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return block
+
+
+def split_lines(block: bytes) -> List[bytes]:
+    """Split a block into lines, which keep their newline."""
+    return io.BytesIO(block).readlines()
+
 
 class TextFile(object):
-    def __init__(self, filename, show_progress=False):
+    """Iterate over lines of a text file, or of a sequence of lines.
+
+    The file may be gzip or BGZF compressed. BGZF files are decompressed
+    with `threads` threads. Files are read in large blocks, which are split
+    into lines in bulk. With `use_mmap`, plain files are memory mapped.
+    """
+
+    def __init__(
+            self, filename, show_progress=False, threads=DEFAULT_THREADS,
+            use_mmap=False):
         self.show_progress = show_progress
         self.filename = filename
-        self.filesize = os.stat(self.filename).st_size
+        self.filesize = None
+        if isinstance(self.filename, str):
+            self.filesize = os.stat(self.filename).st_size
+        self.threads = threads
+        self.use_mmap = use_mmap
         self.line_no = None
 
+    def read_blocks(self) -> Iterator[Tuple[bytes, int]]:
+        return iter_blocks(
+            self.filename, self.threads, use_mmap=self.use_mmap)
+
+    def iter_byte_blocks(self) -> Iterator[bytes]:
+        """Iterate over undecoded blocks of whole lines of the file."""
+        blocks = profile_stage(
+            "read", self.read_blocks(), BYTES, lambda block: len(block[0]))
+        if not self.show_progress:
+            for block, _ in blocks:
+                yield block
+            return
+        # Progress is measured in bytes of the (compressed) file
+        n_lines = 0
+        with ProgressBar(
+                self.filesize, "Processing: ", "MB", scale=MEGABYTE) as bar:
+            for block, position in blocks:
+                yield block
+                n_lines += block.count(b"\n")
+                bar.update_to(position, n_lines)
+
+    def iter_line_blocks(self) -> Iterator[List[str]]:
+        """Iterate over lists of lines."""
+        if not isinstance(self.filename, str):
+            yield (line.decode() if isinstance(line, bytes) else line
+                   for line in self.filename)
+            return
+        for block in self.iter_byte_blocks():
+            yield list(map(bytes.decode, split_lines(block)))
+
     def __iter__(self):
         self.line_no = 1
-        lines = open(self.filename, encoding="UTF-8")
-        try:
-            if self.show_progress:
-                with ProgressBar(self.filesize, "Processing: ", "bytes") as bar:
-                    for line in lines:
-                        line_size = len(line.encode("UTF-8"))
-                        bar.update(line_size)
-                        yield line
-                        self.line_no += 1
-            else:
-                for line in lines:
-                    yield line
-                    self.line_no += 1
-        finally:
-            if isinstance(self.filename, str):
-                lines.close()
+        for lines in self.iter_line_blocks():
+            for line in lines:
+                yield line
+                self.line_no += 1
         self.line_no = None
 
     def __repr__(self):
@@ -58,6 +171,147 @@ class TextFile(object):
             return "line %d" % self.line_no
 
 
+class GFFRecord(object):
+    """A GFF record parsed on demand.
+
+    The line is split into its nine columns when the record is created, but
+    coordinates, score, frame and attributes are only converted when they
+    are accessed. The record provides the attributes of `GenomicFeature`
+    that pygff uses (`iv`, `name`, `type`, `source`, `score`, `frame` and
+    `attr`), and `to_feature()` returns a real `GenomicFeature`.
+
+    Attributes are parsed by `parser`, usually shared by the records of a
+    file, or by `parse_attributes` if it is None.
+    """
+
+    __slots__ = (
+        "line", "columns", "end_included", "parser", "seqid", "source",
+        "type", "strand", "_attr", "_name", "_iv"
+    )
+
+    # Names of the fields which may be read from a record
+    FIELDS = frozenset([
+        "seqid", "source", "type", "start", "end",
+        "score", "strand", "phase", "attributes"
+    ])
+
+    def __init__(
+            self, line: str, end_included=True,
+            parser: Optional[AttributeParser] = None):
+        columns = line.split("\t", 8)
+        if len(columns) != 9:
+            raise ValueError(
+                "GFF line must contain 9 tab-separated columns: %r" % line)
+        self.line = line
+        self.columns = columns
+        self.end_included = end_included
+        self.parser = parser
+        self.seqid = columns[0]
+        self.source = columns[1]
+        self.type = columns[2]
+        self.strand = columns[6]
+
+    @property
+    def start(self) -> int:
+        """Start position, 1-based."""
+        return int(self.columns[3])
+
+    @property
+    def end(self) -> int:
+        """End position, same as `iv.end`."""
+        if self.end_included:
+            return int(self.columns[4])
+        else:
+            return int(self.columns[4]) - 1
+
+    @property
+    def score(self):
+        score = self.columns[5]
+        if score != ".":
+            score = float(score)
+        return score
+
+    @property
+    def phase(self) -> str:
+        return self.columns[7]
+
+    @property
+    def frame(self):
+        frame = self.columns[7]
+        if frame != ".":
+            frame = int(frame)
+        return frame
+
+    @property
+    def score_string(self) -> str:
+        """The raw text of the 6th column."""
+        return self.columns[5]
+
+    @property
+    def attributes_string(self) -> str:
+        """The raw text of the 9th column."""
+        return self.columns[8]
+
+    def _parse_attributes(self):
+        if self.parser is not None:
+            self._attr = self.parser.parse(self.columns[8])
+        else:
+            self._attr = parse_attributes(self.columns[8])
+        # The value of the first attribute, as in HTSeq
+        self._name = next(iter(self._attr.values()), UNNAMED)
+
+    @property
+    def attr(self) -> Dict[str, str]:
+        try:
+            return self._attr
+        except AttributeError:
+            self._parse_attributes()
+            return self._attr
+
+    def get_attributes(self, keys: Collection[str]) -> Dict[str, str]:
+        """The attributes of `keys` only, without parsing the others.
+
+        `keys` must not contain duplicates, such as a set.
+        """
+        try:
+            attr = self._attr
+        except AttributeError:
+            if self.parser is not None:
+                return self.parser.parse(self.columns[8], keys)
+            return parse_attributes(self.columns[8], keys)
+        return {key: attr[key] for key in keys if key in attr}
+
+    @property
+    def name(self) -> str:
+        try:
+            return self._name
+        except AttributeError:
+            self._parse_attributes()
+            return self._name
+
+    @property
+    def iv(self) -> GenomicInterval:
+        try:
+            return self._iv
+        except AttributeError:
+            self._iv = GenomicInterval(
+                self.seqid, self.start - 1, self.end, self.strand)
+            return self._iv
+
+    def to_feature(self) -> GenomicFeature:
+        f = GenomicFeature(self.name, self.type, self.iv)
+        f.source = self.source
+        f.score = self.score
+        f.frame = self.frame
+        f.attr = self.attr
+        return f
+
+    def __repr__(self):
+        return "<%s: %s '%s' at %s: %d -> %d (strand '%s')>" % (
+            self.__class__.__name__, self.type, self.name,
+            self.seqid, self.start - 1, self.end, self.strand)
+
+
 class GFF_Reader(TextFile):
     """Parse a GFF file (Modified from HTSeq.GFF_Reader)
 
@@ -65,46 +319,106 @@ class GFF_Reader(TextFile):
     GFF files. If a file name is specified, it may refer to a gzip compressed
     file.
 
-    Iterating over the object then yields GenomicFeature objects.
+    Iterating over the object then yields pairs of a GFFRecord and the raw
+    line. Fields of the record are parsed when they are accessed. Lines of
+    a file are read as bytes, see `iter_byte_lines`, and decoded once they
+    are known to be records.
+
+    If the file has an up-to-date cache (see `pygff.cache`), records are
+    built from the cached columns instead of parsing the lines, unless
+    `use_cache` is False. Raw lines are still read from the file.
     """
 
-    def __init__(self, filename_or_sequence, end_included=True, show_progress=False):
-        TextFile.__init__(self, filename_or_sequence, show_progress)
+    def __init__(
+            self, filename_or_sequence, end_included=True,
+            show_progress=False, threads=DEFAULT_THREADS, use_mmap=False,
+            use_cache=True):
+        TextFile.__init__(
+            self, filename_or_sequence, show_progress, threads, use_mmap)
         self.end_included = end_included
         self.metadata = {}
+        # Shared by the records of the file, which detects its dialect once
+        self.attribute_parser = AttributeParser()
+        self.cache = None
+        if use_cache and isinstance(filename_or_sequence, str):
+            self.cache = load_cache(filename_or_sequence)
+
+    def load_table(self, attributes=True):
+        """Load the `GFFTable` of the cache of the file."""
+        # pygff.table imports this module
+        from pygff.table import GFFTable
+        table = profile_calls("cache table", GFFTable.from_cache, CALLS)(
+            self.cache, self.end_included, attributes)
+        self.metadata.update(table.metadata)
+        return table
+
+    def iter_lines(self) -> Iterator[str]:
+        """Iterate over the raw lines of GFF records.
+
+        Empty lines and comments are skipped, directives are stored in
+        `self.metadata`.
+        """
+        if isinstance(self.filename, str):
+            return profile_stage(
+                "decode", map(bytes.decode, self.iter_byte_lines()))
+        return self.iter_sequence_lines()
 
-    def __iter__(self) -> Iterator[Tuple[GenomicFeature, str]]:
+    def iter_byte_lines(self) -> Iterator[bytes]:
+        """Iterate over the undecoded lines of GFF records of the file."""
+        return chain.from_iterable(self.iter_record_blocks())
+
+    def iter_record_blocks(self) -> Iterator[List[bytes]]:
+        """Iterate over lists of undecoded lines of GFF records."""
+        return profile_stage("split", self.split_record_blocks(), count=len)
+
+    def split_record_blocks(self) -> Iterator[List[bytes]]:
+        for block in self.iter_byte_blocks():
+            lines = split_lines(block)
+            # Most blocks have neither comments nor empty lines
+            if b"#" in block or b"\n" in lines:
+                records = []
+                for line in lines:
+                    if line.startswith(b"#"):
+                        if line.startswith(b"##"):
+                            self.add_directive(line.decode())
+                    elif line != b"\n":
+                        records.append(line)
+                lines = records
+            yield lines
+
+    def iter_sequence_lines(self) -> Iterator[str]:
         for line in TextFile.__iter__(self):
-            if isinstance(line, bytes):
-                line = line.decode()
             if line == "\n":
                 continue
             if line.startswith('#'):
                 if line.startswith("##"):
-                    mo = re.compile(r"##\s*(\S+)\s+(\S*)").match(line)
-                    if mo:
-                        self.metadata[mo.group(1)] = mo.group(2)
+                    self.add_directive(line)
                 continue
-            (seqname, source, feature, start, end, score,
-             strand, frame, attributeStr) = line.split("\t", 8)
-            (attr, name) = parse_GFF_attribute_string(attributeStr, True)
-            if self.end_included:
-                iv = GenomicInterval(
-                        seqname,
-                        int(start) - 1, int(end),
-                        strand)
-            else:
-                iv = GenomicInterval(
-                        seqname,
-                        int(start) - 1, int(end) - 1,
-                        strand)
-            f = GenomicFeature(name, feature, iv)
-            if score != ".":
-                score = float(score)
-            if frame != ".":
-                frame = int(frame)
-            f.source = source
-            f.score = score
-            f.frame = frame
-            f.attr = attr
-            yield (f, line)
\ No newline at end of file
+            yield line
+
+    def add_directive(self, line: str):
+        mo = DIRECTIVE.match(line)
+        if mo:
+            self.metadata[mo.group(1)] = mo.group(2)
+
+    def iter_records(self) -> Iterator[GFFRecord]:
+        """Iterate over the records, without their raw lines.
+
+        With a cache, the records are built from the cached columns, see
+        `GFFTable.records`.
+        """
+        if self.cache is not None:
+            return profile_stage("records", self.load_table().records())
+        return profile_stage("records", map(
+            GFFRecord, self.iter_lines(), repeat(self.end_included),
+            repeat(self.attribute_parser)))
+
+    def __iter__(self) -> Iterator[Tuple[GFFRecord, str]]:
+        if self.cache is not None:
+            table = self.load_table()
+            yield from zip(
+                profile_stage("records", table.records()),
+                map(bytes.decode, table.iter_raw_lines()))
+            return
+        for feature in self.iter_records():
+            yield (feature, feature.line)
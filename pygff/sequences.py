@@ -1,21 +1,195 @@
-from typing import Dict
+from typing import List, Iterable, Tuple
 
-from pyfaidx import Fasta
-from pygff.errors import PositionNotSpecified, ChromosomeNotSpecified
+from pyfaidx import Fasta, FetchError
+from pygff.errors import (
+    SeqExtractError, PositionNotSpecified,
+    ChromosomeNotSpecified, ChromosomeNotFound
+)
+from pygff.profiling import active_profiler, profile_calls
+
+# (chromosome, start, end, strand), 0-based half-open like GFF_Reader.
+Interval = Tuple[str, int, int, str]
+
+# Bases held in memory by a GenomeExtractor with `buffered` reads
+DEFAULT_BUFFER_SIZE = 500 * 1000 * 1000
+
+# Complements of IUPAC nucleotide codes, soft-masked bases stay lowercase.
+# A bytes table, as bytes.translate is much faster than str.translate.
+COMPLEMENT = bytes.maketrans(
+    b"ACGTURYKMBVDHNSWacgturykmbvdhnsw",
+    b"TGCAAYRMKVBHDNSWtgcaayrmkvbhdnsw")
+
+# The standard genetic code, codons ordered as TTT, TTC, TTA, TTG, TCT, ...
+CODON_TABLE = dict(zip(
+    (a + b + c for a in "TCAG" for b in "TCAG" for c in "TCAG"),
+    "FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG"))
+
+
+def reverse_complement(sequence: str) -> str:
+    # latin-1 maps each character to one byte, so any sequence round-trips
+    return sequence.encode("latin-1").translate(COMPLEMENT)[::-1].decode(
+        "latin-1")
+
+
+def translate(sequence: str) -> str:
+    """Translate a coding sequence, unknown codons become X.
+
+    A trailing partial codon is left out.
+    """
+    sequence = sequence.upper().replace("U", "T")
+    get = CODON_TABLE.get
+    return "".join([
+        get(sequence[i:i + 3], "X")
+        for i in range(0, len(sequence) - 2, 3)])
+
+
+class GenomeExtractor(object):
+    """Extract sequences from a genome FASTA file.
+
+    The FASTA file and its .fai index are opened once when the extractor is
+    created, and the record of each chromosome is kept open for later calls,
+    so that extracting many features does not reopen the genome every time.
+
+    With `buffered`, sequences are sliced out of a window of the genome held
+    in memory, instead of being read one by one. A chromosome of at most
+    `buffer_size` bases is read whole, and a longer one is read in windows
+    of `buffer_size` bases starting at the first interval which is not in
+    the current window. This is much faster for intervals sorted by
+    chromosome and start, but reads the genome over and over otherwise.
+    """
+
+    def __init__(
+            self, fasta_file: str, buffered=False,
+            buffer_size=DEFAULT_BUFFER_SIZE):
+        self.fasta_file = fasta_file
+        self.genome = Fasta(fasta_file)
+        self.records = {}
+        # Position of each chromosome in the FASTA file
+        self.chrom_order = {
+            name: i for i, name in enumerate(self.genome.keys())}
+        self.buffered = buffered
+        self.buffer_size = buffer_size
+        # Chromosome, start and sequence of the window held in memory
+        self.window: Tuple[str, int, str] = ("", 0, "")
+        if active_profiler() is not None:
+            self.extract = profile_calls("sequence fetch", self.extract)
+
+    def get_record(self, chromosome: str):
+        try:
+            return self.records[chromosome]
+        except KeyError:
+            pass
+        if chromosome not in self.genome:
+            raise ChromosomeNotFound(
+                "Chromosome '%s' not found in %s." % (
+                    chromosome, self.fasta_file))
+        record = self.genome[chromosome]
+        self.records[chromosome] = record
+        return record
+
+    def extract(
+        self, chromosome: str = None,
+        start: int = None, end: int = None, strand = "+"
+    ) -> str:
+        if not chromosome:
+            raise ChromosomeNotSpecified("Chromosome name must be provided.")
+        if start is None or end is None:
+            raise PositionNotSpecified("Position start and end must be provided.")
+        if self.buffered:
+            sequence = self.read_buffered(chromosome, start, end)
+        else:
+            sequence = self.read(chromosome, start, end)
+        if strand == "-":
+            return reverse_complement(sequence)
+        return sequence
+
+    def read(self, chromosome: str, start: int, end: int) -> str:
+        # Note: pyfaidx uses 0-based indexing
+        try:
+            return self.get_record(chromosome)[slice(start, end)].seq
+        except FetchError as e:
+            raise SeqExtractError(str(e))
+
+    def read_buffered(self, chromosome: str, start: int, end: int) -> str:
+        name, offset, window = self.window
+        if name == chromosome and offset <= start and (
+                min(end, len(self.records[name])) <= offset + len(window)):
+            return window[start - offset:end - offset]
+        length = len(self.get_record(chromosome))
+        if length <= self.buffer_size:
+            offset, window_end = 0, length
+        else:
+            # A single interval longer than the window is read whole
+            offset, window_end = start, max(end, start + self.buffer_size)
+        # Release the previous window before reading the next one
+        self.window = ("", 0, "")
+        self.window = (
+            chromosome, offset, self.read(chromosome, offset, window_end))
+        return self.window[2][start - offset:end - offset]
+
+    def extract_batch(self, intervals: Iterable[Interval]) -> List:
+        """Extract a batch of intervals with sequential reads.
+
+        Intervals are grouped by chromosome, following the order of the
+        FASTA file, and sorted by start before reading. The sequences are
+        returned in the order of `intervals`. If an interval can not be
+        extracted, the exception raised for it takes its place in the
+        returned list.
+        """
+        intervals = list(intervals)
+        order = sorted(
+            range(len(intervals)),
+            key=lambda i: (
+                self.chrom_order.get(intervals[i][0], -1), intervals[i][1]))
+        results: List = [None] * len(intervals)
+        for i in order:
+            try:
+                results[i] = self.extract(*intervals[i])
+            except SeqExtractError as e:
+                results[i] = e
+        return results
+
+    def extract_spliced_batch(self, transcripts: Iterable) -> List:
+        """Extract the spliced sequences of a batch of `Transcript`s.
+
+        The segments of all transcripts are read in one `extract_batch`,
+        and joined in order of start. Sequences of transcripts on the minus
+        strand are reverse complemented once joined. If a segment can not
+        be extracted, the exception raised for it takes the place of the
+        sequence of its transcript.
+        """
+        transcripts = list(transcripts)
+        sequences = iter(self.extract_batch(
+            (transcript.seqid, segment.start - 1, segment.end, "+")
+            for transcript in transcripts
+            for segment in transcript.segments))
+        results: List = []
+        for transcript in transcripts:
+            parts = [next(sequences) for _ in transcript.segments]
+            errors = [part for part in parts if isinstance(part, SeqExtractError)]
+            if errors:
+                results.append(errors[0])
+            elif transcript.strand == "-":
+                results.append(reverse_complement("".join(parts)))
+            else:
+                results.append("".join(parts))
+        return results
+
+    def close(self):
+        self.window = ("", 0, "")
+        self.records.clear()
+        self.genome.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 def genome_extract(
     fasta_file: str, chromosome: str = None,
     start: int = None, end: int = None, strand = "+"
 ) -> str:
-    genome = Fasta(fasta_file)
-    if not chromosome:
-        raise ChromosomeNotSpecified("Chromosome name must be provided.")
-    if start is None or end is None:
-        raise PositionNotSpecified("Position start and end must be provided.")
-    # Note: pyfaidx uses 0-based indexing
-    seq_obj = genome[chromosome][slice(start, end)]
-    if strand == "+":
-        return seq_obj.seq
-    if strand == "-":
-        return seq_obj.reverse.complement
+    with GenomeExtractor(fasta_file) as genome:
+        return genome.extract(chromosome, start, end, strand)
@@ -0,0 +1,168 @@
+"""Counting of GFF file statistics on raw lines.
+
+Lines are counted as bytes, without building records or decoding them.
+`count_file` counts each block of whole lines read by `iter_blocks`, about
+4 MB of the decompressed file (`pygff.reader.BLOCK_SIZE`).
+The columns reported by `gfftools stats` are counted together as one key
+per line, so the counts are computed by C loops of `Counter.update` and
+`map`. Optional metrics are gathered in the same single pass.
+"""
+
+import os
+import re
+from collections import Counter, defaultdict
+from itertools import filterfalse
+from operator import itemgetter, methodcaller
+from typing import Dict, Iterable, List
+
+from pygff.utils import ProgressBar, MEGABYTE
+from pygff.bgzf import DEFAULT_THREADS
+from pygff.reader import iter_blocks, split_lines
+from pygff.profiling import profile_stage, profile_calls, BYTES
+
+# Names of the counted columns in the output, and their column numbers
+COUNTED_COLUMNS = (
+    ("seqname", 0), ("source", 1), ("types", 2), ("strand", 6), ("phase", 7)
+)
+
+# Key of a GFF3 (key=value) or GTF (key "value") attribute
+ATTRIBUTE_KEY = re.compile(rb"(?:^|;)\s*([^\s=;]+)")
+
+_split_columns = methodcaller("split", b"\t", 8)
+_counted_columns = itemgetter(*[column for _, column in COUNTED_COLUMNS])
+_is_comment = methodcaller("startswith", b"#")
+_type_start_end = itemgetter(2, 3, 4)
+_attributes = itemgetter(8)
+
+
+def record_lines(lines: Iterable[bytes]) -> Iterable[bytes]:
+    """Skip comments and empty lines."""
+    return filterfalse(bytes.isspace, filterfalse(_is_comment, lines))
+
+
+class FeatureStats(object):
+    """Counts of the values of GFF columns, updated from raw lines.
+
+    With `lengths`, the lengths of features are collected by feature type,
+    and with `attribute_keys`, the number of features having each attribute
+    key is counted.
+    """
+
+    def __init__(self, lengths=False, attribute_keys=False):
+        # (seqid, source, type, strand, phase) -> count
+        self.columns = Counter()
+        # (type, length) -> count
+        self.lengths = Counter() if lengths else None
+        # Attribute keys of a record, in order -> count
+        self.attribute_keys = Counter() if attribute_keys else None
+
+    def count_lines(self, lines: Iterable[bytes]):
+        records = list(map(_split_columns, record_lines(lines)))
+        # Lines are split into at most 9 columns
+        if records and min(map(len, records)) < 9:
+            for columns in records:
+                self.check_columns(columns)
+        self.columns.update(map(_counted_columns, records))
+        if self.lengths is not None:
+            lengths = self.lengths
+            for feature_type, start, end in map(_type_start_end, records):
+                lengths[feature_type, int(end) - int(start) + 1] += 1
+        if self.attribute_keys is not None:
+            # Many records share the same keys, which are split up later
+            self.attribute_keys.update(map(
+                tuple, map(ATTRIBUTE_KEY.findall, map(_attributes, records))))
+
+    @staticmethod
+    def check_columns(columns: List[bytes]):
+        if len(columns) != 9:
+            raise ValueError(
+                "GFF line must contain 9 tab-separated columns: %r"
+                % b"\t".join(columns).decode("UTF-8", "replace"))
+
+    def update(self, other: "FeatureStats"):
+        """Add the counts of another `FeatureStats`."""
+        self.columns.update(other.columns)
+        if self.lengths is not None:
+            self.lengths.update(other.lengths)
+        if self.attribute_keys is not None:
+            self.attribute_keys.update(other.attribute_keys)
+
+    def summary(self) -> Dict[str, Dict]:
+        """Counts of each column, keyed by the decoded values.
+
+        Values are listed in the order they first appear in the file.
+        """
+        summary = {name: Counter() for name, _ in COUNTED_COLUMNS}
+        counters = [summary[name] for name, _ in COUNTED_COLUMNS]
+        for key, count in self.columns.items():
+            for counter, value in zip(counters, key):
+                counter[value] += count
+        for name in summary:
+            summary[name] = {
+                value.decode("UTF-8"): count
+                for value, count in summary[name].items()}
+        if self.lengths is not None:
+            lengths = defaultdict(Counter)
+            for (feature_type, length), count in self.lengths.items():
+                lengths[feature_type.decode("UTF-8")][length] += count
+            summary["lengths"] = {
+                feature_type: length_summary(counts)
+                for feature_type, counts in lengths.items()}
+        if self.attribute_keys is not None:
+            attribute_keys = Counter()
+            for keys, count in self.attribute_keys.items():
+                # Keys repeated in a record are counted once
+                for key in dict.fromkeys(keys):
+                    attribute_keys[key.decode("UTF-8")] += count
+            summary["attribute_keys"] = attribute_keys
+        return summary
+
+
+def length_summary(lengths: Counter) -> Dict:
+    """Summarize a distribution of lengths given as length -> count."""
+    count = sum(lengths.values())
+    total = sum(length * n for length, n in lengths.items())
+    ordered = sorted(lengths.items())
+    return {
+        "count": count,
+        "total": total,
+        "min": ordered[0][0],
+        "max": ordered[-1][0],
+        "mean": total / count,
+        "median": (nth_length(ordered, (count - 1) // 2)
+                   + nth_length(ordered, count // 2)) / 2,
+    }
+
+
+def nth_length(ordered, n: int) -> int:
+    """The n-th (0-based) smallest length of a sorted distribution."""
+    cumulative = 0
+    for length, count in ordered:
+        cumulative += count
+        if cumulative > n:
+            return length
+    raise IndexError(n)
+
+
+def count_file(
+    filename: str, stats: FeatureStats,
+    show_progress=False, threads=DEFAULT_THREADS
+) -> FeatureStats:
+    """Count the lines of a plain, gzip or BGZF compressed GFF file."""
+    filesize = os.stat(filename).st_size
+    blocks = profile_stage(
+        "read", iter_blocks(filename, threads), BYTES,
+        lambda block: len(block[0]))
+    count_lines = profile_calls("count", stats.count_lines, count=len)
+    if not show_progress or not filesize:
+        for block, _ in blocks:
+            count_lines(split_lines(block))
+        return stats
+    n_lines = 0
+    with ProgressBar(filesize, "Processing: ", "MB", scale=MEGABYTE) as bar:
+        for block, position in blocks:
+            lines = split_lines(block)
+            count_lines(lines)
+            n_lines += len(lines)
+            bar.update_to(position, n_lines)
+    return stats
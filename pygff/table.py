@@ -0,0 +1,530 @@
+"""Columnar in-memory table of the records of a GFF file.
+
+Each column of the file is held in a NumPy array instead of one object per
+record. seqid, source, type, strand and each attribute key are categorical
+columns: an array of integer codes into a list of distinct values. Filters
+select rows with vectorized boolean masks, see `Filter.mask`. Tables can be
+stored in the on-disk cache of `pygff.cache` by `build_cache`, and
+`GFFTable.from_file` loads them from there when the cache is up to date.
+
+The text of the file is not held in memory. A table records the offset of
+the line of each row in the file, and lines are read back from the file
+when they are written out as they are. `GFFTable.records` builds records
+from the columns, so a cached file is read without parsing its text.
+"""
+
+import os
+from itertools import repeat
+from operator import itemgetter, methodcaller
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pygff.reader import GFF_Reader, GFFRecord
+from pygff.attributes import UNNAMED
+from pygff.bgzf import DEFAULT_THREADS, is_bgzf, is_gzip
+from pygff.cache import GFFCache, write_cache
+from pygff.index import LineScanner
+
+# Names of the categorical columns and their column numbers in a GFF line.
+# `score_text` keeps the score as written, for records built from a table.
+CATEGORICAL_COLUMNS = (
+    ("seqid", 0), ("source", 1), ("type", 2), ("strand", 6),
+    ("score_text", 5),
+)
+
+# Lines of a file are parsed in batches of this many lines
+BATCH_LINES = 65536
+
+_split_columns = methodcaller("split", b"\t", 8)
+
+
+class Categorical(object):
+    """Values coded as integers into a list of categories.
+
+    Missing values have the code -1.
+    """
+
+    def __init__(self, codes: np.ndarray, categories: List[str]):
+        self.codes = codes
+        self.categories = categories
+        self.category_codes = {
+            value: code for code, value in enumerate(categories)}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        code = self.codes[row]
+        return self.categories[code] if code >= 0 else None
+
+    def isin(self, values) -> np.ndarray:
+        """Mask of the rows whose value is one of `values`."""
+        codes = [self.category_codes[value] for value in values
+                 if value in self.category_codes]
+        if not codes:
+            return np.zeros(len(self.codes), dtype=bool)
+        if len(codes) == 1:
+            return self.codes == codes[0]
+        return np.isin(self.codes, codes)
+
+
+class CategoryCoder(object):
+    """Assign codes to values in order of appearance."""
+
+    def __init__(self):
+        self.codes = {}
+
+    def encode(self, values: Sequence) -> List[int]:
+        codes = self.codes
+        for value in dict.fromkeys(values):
+            if value not in codes:
+                codes[value] = len(codes)
+        return list(map(codes.__getitem__, values))
+
+    def code(self, value) -> int:
+        try:
+            return self.codes[value]
+        except KeyError:
+            code = self.codes[value] = len(self.codes)
+            return code
+
+    def categories(self) -> List[str]:
+        """The values ordered by code, decoded if they are bytes."""
+        values = sorted(self.codes, key=self.codes.__getitem__)
+        return [value.decode("UTF-8") if isinstance(value, bytes) else value
+                for value in values]
+
+
+def iter_line_batches(
+    gff_file: str, reader: GFF_Reader, threads=DEFAULT_THREADS
+) -> Iterator[Tuple[List[bytes], Optional[List[int]]]]:
+    """Batches of the record lines of a GFF file, and their offsets.
+
+    Offsets are those of `LineScanner`: byte offsets of a plain file, or
+    virtual offsets of a BGZF file. Gzip files can not be seeked to, so
+    their lines have no offsets. Directives are stored by `reader`.
+    """
+    if is_gzip(gff_file) and not is_bgzf(gff_file):
+        for lines in reader.iter_record_blocks():
+            yield (lines, None)
+        return
+    lines: List[bytes] = []
+    offsets: List[int] = []
+    with LineScanner(gff_file, threads) as scanner:
+        for offset, line in scanner.lines_from(0):
+            if line.startswith(b"#"):
+                if line.startswith(b"##"):
+                    reader.add_directive(line.decode())
+                continue
+            if line.endswith(b"\r\n"):
+                line = line[:-2] + b"\n"
+            if line == b"\n":
+                continue
+            lines.append(line)
+            offsets.append(offset)
+            if len(lines) >= BATCH_LINES:
+                yield (lines, offsets)
+                lines, offsets = [], []
+    if lines:
+        yield (lines, offsets)
+
+
+class TableRecord(GFFRecord):
+    """A record of a `GFFTable`, built from its columns.
+
+    The attributes are those of the attribute columns of the table, in the
+    order of the line. The line, and thus `columns`, is only read back from
+    the GFF file when it is accessed.
+    """
+
+    __slots__ = (
+        "table", "row", "_start", "_end", "_score_string", "_phase", "_line")
+
+    # Attributes are never parsed from the line
+    parser = None
+
+    def __init__(
+            self, table: "GFFTable", row: int, seqid: str, source: str,
+            type: str, strand: str, start: int, end: int, score_string: str,
+            phase: str, attr: Dict[str, str]):
+        self.table = table
+        self.row = row
+        self.end_included = table.end_included
+        self.seqid = seqid
+        self.source = source
+        self.type = type
+        self.strand = strand
+        self._start = start
+        self._end = end
+        self._score_string = score_string
+        self._phase = phase
+        self._attr = attr
+
+    @property
+    def line(self) -> str:
+        try:
+            return self._line
+        except AttributeError:
+            self._line = self.table.raw_line(self.row).decode("UTF-8")
+            return self._line
+
+    @property
+    def columns(self) -> List[str]:
+        return self.line.split("\t", 8)
+
+    @property
+    def attr(self) -> Dict[str, str]:
+        return self._attr
+
+    @property
+    def name(self) -> str:
+        # The value of the first attribute, as in `GFFRecord.name`
+        return next(iter(self._attr.values()), UNNAMED)
+
+    @property
+    def start(self) -> int:
+        return self._start
+
+    @property
+    def end(self) -> int:
+        return self._end
+
+    @property
+    def score(self):
+        score = self._score_string
+        if score != ".":
+            score = float(score)
+        return score
+
+    @property
+    def score_string(self) -> str:
+        return self._score_string
+
+    @property
+    def phase(self) -> str:
+        return self._phase
+
+    @property
+    def frame(self):
+        frame = self._phase
+        if frame != ".":
+            frame = int(frame)
+        return frame
+
+
+def parse_score(score: bytes) -> float:
+    return np.nan if score == b"." else float(score)
+
+
+def parse_phase(phase: bytes) -> int:
+    return -1 if phase == b"." else int(phase)
+
+
+class GFFTable(object):
+    """The records of a GFF file as columns.
+
+    Columns are `seqid`, `source`, `type` and `strand` (`Categorical`),
+    `start` and `end` (int64, as `GFFRecord.start` and `GFFRecord.end`),
+    `score` (float64, NaN if missing) and `score_text` (`Categorical`),
+    `phase` (int8, -1 if missing), and `attributes`, a dict of attribute
+    key to `Categorical` column. `attribute_order` codes the keys of each
+    row, in order and separated by tabs, or is None without attributes.
+    `offsets` holds the offset of the line of each row in `gff_file` (see
+    `iter_line_batches`), or is None for a gzip compressed file. `metadata`
+    holds the directives of the file, as `GFF_Reader.metadata`.
+    """
+
+    def __init__(
+            self, columns: Dict[str, object], gff_file: str,
+            offsets: Optional[np.ndarray], end_included=True,
+            metadata: Optional[Dict[str, str]] = None):
+        self.seqid = columns["seqid"]
+        self.source = columns["source"]
+        self.type = columns["type"]
+        self.strand = columns["strand"]
+        self.score_text = columns["score_text"]
+        self.start = columns["start"]
+        self.end = columns["end"]
+        self.score = columns["score"]
+        self.phase = columns["phase"]
+        self.attributes = columns["attributes"]
+        self.attribute_order = columns.get("attribute_order")
+        self.gff_file = gff_file
+        self.offsets = offsets
+        self.end_included = end_included
+        self.metadata = metadata or {}
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @classmethod
+    def from_file(
+            cls, gff_file: str, end_included=True, attributes=True,
+            threads=DEFAULT_THREADS, use_cache=True) -> "GFFTable":
+        """Load the records of a GFF file.
+
+        `attributes` may be False to skip attributes, or a list of the
+        attribute keys to load. The table is loaded from the cache of the
+        file if it is up to date, unless `use_cache` is False.
+        """
+        reader = GFF_Reader(
+            gff_file, end_included, threads=threads, use_cache=use_cache)
+        if reader.cache is not None:
+            return cls.from_cache(reader.cache, end_included, attributes)
+        coders = {name: CategoryCoder() for name, _ in CATEGORICAL_COLUMNS}
+        codes = {name: [] for name, _ in CATEGORICAL_COLUMNS}
+        starts, ends, scores, phases = [], [], [], []
+        key_coder = CategoryCoder()
+        # attribute key code -> rows having the key, and their value codes
+        attribute_rows: Dict[int, List[int]] = {}
+        attribute_values: Dict[int, List[int]] = {}
+        value_coders: Dict[int, CategoryCoder] = {}
+        order_coder = CategoryCoder()
+        order_codes = []
+        wanted_keys = None
+        if attributes is not True and attributes:
+            wanted_keys = frozenset(attributes)
+        offsets: Optional[List[int]] = []
+        row = 0
+        for lines, line_offsets in iter_line_batches(
+                gff_file, reader, threads):
+            records = list(map(_split_columns, lines))
+            if any(len(columns) != 9 for columns in records):
+                for line, columns in zip(lines, records):
+                    if len(columns) != 9:
+                        # Raises the same error as reading records
+                        GFFRecord(line.decode("UTF-8"), end_included)
+            for name, column in CATEGORICAL_COLUMNS:
+                codes[name].extend(
+                    coders[name].encode(list(map(itemgetter(column), records))))
+            starts.extend(map(int, map(itemgetter(3), records)))
+            ends.extend(map(int, map(itemgetter(4), records)))
+            scores.extend(map(parse_score, map(itemgetter(5), records)))
+            phases.extend(map(parse_phase, map(itemgetter(7), records)))
+            if attributes:
+                for attributes_string in map(itemgetter(8), records):
+                    attr = reader.attribute_parser.parse(
+                        attributes_string.decode("UTF-8"), wanted_keys)
+                    order_codes.append(order_coder.code(tuple(attr)))
+                    for key, value in attr.items():
+                        key_code = key_coder.code(key)
+                        if key_code not in value_coders:
+                            value_coders[key_code] = CategoryCoder()
+                            attribute_rows[key_code] = []
+                            attribute_values[key_code] = []
+                        attribute_rows[key_code].append(row)
+                        attribute_values[key_code].append(
+                            value_coders[key_code].code(value))
+                    row += 1
+            if line_offsets is None:
+                offsets = None
+            else:
+                offsets.extend(line_offsets)
+
+        n_rows = len(starts)
+        columns = {
+            name: Categorical(
+                np.array(codes[name], dtype=np.int32),
+                coders[name].categories())
+            for name, _ in CATEGORICAL_COLUMNS}
+        columns["start"] = np.array(starts, dtype=np.int64)
+        columns["end"] = np.array(ends, dtype=np.int64)
+        if not end_included:
+            columns["end"] -= 1
+        columns["score"] = np.array(scores, dtype=np.float64)
+        columns["phase"] = np.array(phases, dtype=np.int8)
+        columns["attributes"] = {}
+        for key, key_code in key_coder.codes.items():
+            value_codes = np.full(n_rows, -1, dtype=np.int32)
+            value_codes[attribute_rows[key_code]] = attribute_values[key_code]
+            columns["attributes"][key] = Categorical(
+                value_codes, value_coders[key_code].categories())
+        if attributes:
+            columns["attribute_order"] = Categorical(
+                np.array(order_codes, dtype=np.int32),
+                ["\t".join(keys) for keys in order_coder.categories()])
+        if offsets is not None:
+            offsets = np.array(offsets, dtype=np.int64)
+        return cls(columns, gff_file, offsets, end_included, reader.metadata)
+
+    @classmethod
+    def from_cache(
+            cls, cache: GFFCache, end_included=True,
+            attributes=True) -> "GFFTable":
+        """Load a table written by `build_cache`.
+
+        Arrays are memory mapped. `attributes` is as for `from_file`.
+        """
+        columns = {
+            name: Categorical(cache.array(name), cache.strings(name))
+            for name, _ in CATEGORICAL_COLUMNS}
+        for name in ("start", "end", "score", "phase"):
+            columns[name] = cache.array(name)
+        if not end_included:
+            columns["end"] = columns["end"] - 1
+        columns["attributes"] = {}
+        if attributes:
+            keys = cache.strings("attribute_keys")
+            if attributes is not True:
+                wanted_keys = frozenset(attributes)
+            else:
+                wanted_keys = keys
+            for i, key in enumerate(keys):
+                if key in wanted_keys:
+                    name = "attribute.%d" % i
+                    columns["attributes"][key] = Categorical(
+                        cache.array(name), cache.strings(name))
+            columns["attribute_order"] = Categorical(
+                cache.array("attribute_order"),
+                cache.strings("attribute_order"))
+        offsets = None
+        if cache.has_array("offsets"):
+            offsets = cache.array("offsets")
+        return cls(columns, cache.path, offsets, end_included, cache.metadata)
+
+    def raw_line(self, row: int) -> bytes:
+        return next(self.iter_raw_lines([row]))
+
+    def iter_raw_lines(self, rows: Optional[Sequence[int]] = None) -> Iterator[bytes]:
+        """Iterate over the raw lines of `rows`, or of all rows.
+
+        The lines are read back from the GFF file, with newlines translated
+        as in text mode. Rows in increasing order are read fastest, see
+        `LineScanner.lines_at`.
+        """
+        if rows is None:
+            rows = np.arange(len(self))
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.offsets is None:
+            yield from self.scan_raw_lines(rows)
+            return
+        with LineScanner(self.gff_file) as scanner:
+            for line in scanner.lines_at(self.offsets[rows].tolist()):
+                if line.endswith(b"\r\n"):
+                    line = line[:-2] + b"\n"
+                yield line
+
+    def scan_raw_lines(self, rows: np.ndarray) -> Iterator[bytes]:
+        """Read the raw lines of `rows` of a file without offsets.
+
+        The file is read once from the start. Unless `rows` are increasing,
+        their lines are kept until all of them were read.
+        """
+        lines = enumerate(GFF_Reader(
+            self.gff_file, self.end_included, use_cache=False).iter_byte_lines())
+        rows = rows.tolist()
+        if all(a < b for a, b in zip(rows, rows[1:])):
+            for wanted in rows:
+                for row, line in lines:
+                    if row == wanted:
+                        yield line
+                        break
+            return
+        found = dict.fromkeys(rows)
+        for row, line in lines:
+            if row in found:
+                found[row] = line
+        yield from map(found.__getitem__, rows)
+
+    def records(
+        self, rows: Optional[Sequence[int]] = None
+    ) -> Iterator[TableRecord]:
+        """Iterate over the records of `rows`, or of all rows.
+
+        The records are built from the columns, without reading the file.
+        Their attributes are those loaded in the table.
+        """
+        for batch in self.record_batches(rows):
+            yield from batch
+
+    def record_batches(
+        self, rows: Optional[Sequence[int]] = None
+    ) -> Iterator[List[TableRecord]]:
+        """Lists of the records of `rows`, built column by column."""
+        if rows is None:
+            rows = np.arange(len(self))
+        rows = np.asarray(rows, dtype=np.int64)
+        # Code -1 of a missing attribute gives the None at the end, though
+        # the keys of a row are only those it has
+        values = {
+            key: column.categories + [None]
+            for key, column in self.attributes.items()}
+        orders = [()]
+        if self.attribute_order is not None:
+            # Keys which are not loaded are left out
+            orders = [
+                tuple(key for key in keys.split("\t") if key in values)
+                for keys in self.attribute_order.categories]
+        phases = ["0", "1", "2", "."]
+        for first in range(0, len(rows), BATCH_LINES):
+            batch = rows[first:first + BATCH_LINES]
+            fields = [
+                map(column.categories.__getitem__,
+                    column.codes[batch].tolist())
+                for column in (
+                    self.seqid, self.source, self.type, self.strand)]
+            fields.append(self.start[batch].tolist())
+            fields.append(self.end[batch].tolist())
+            fields.append(map(
+                self.score_text.categories.__getitem__,
+                self.score_text.codes[batch].tolist()))
+            fields.append(map(
+                phases.__getitem__, self.phase[batch].tolist()))
+            yield list(map(
+                TableRecord, repeat(self, len(batch)), batch.tolist(), *fields,
+                self.batch_attributes(batch, values, orders)))
+
+    def batch_attributes(
+        self, batch: np.ndarray, values: Dict[str, List[Optional[str]]],
+        orders: List[Tuple[str, ...]]
+    ) -> List[Dict[str, str]]:
+        """The attribute dicts of the rows of `batch`.
+
+        Rows are grouped by their `attribute_order`, so that the dicts of a
+        group are zipped from the same keys.
+        """
+        if self.attribute_order is None:
+            return [{} for _ in range(len(batch))]
+        attributes = [None] * len(batch)
+        codes = self.attribute_order.codes[batch]
+        for code in np.unique(codes).tolist():
+            keys = orders[code]
+            group = np.flatnonzero(codes == code).tolist()
+            if not keys:
+                for i in group:
+                    attributes[i] = {}
+                continue
+            rows = batch[group]
+            key_values = [
+                map(values[key].__getitem__,
+                    self.attributes[key].codes[rows].tolist())
+                for key in keys]
+            for i, attr in zip(group, map(
+                    dict, map(zip, repeat(keys), zip(*key_values)))):
+                attributes[i] = attr
+        return attributes
+
+
+def build_cache(gff_file: str, threads=DEFAULT_THREADS) -> GFFCache:
+    """Parse a GFF file with all attributes and write its cache."""
+    stat = os.stat(gff_file)
+    table = GFFTable.from_file(gff_file, threads=threads, use_cache=False)
+    arrays = {
+        "start": table.start, "end": table.end, "score": table.score,
+        "phase": table.phase}
+    if table.offsets is not None:
+        arrays["offsets"] = table.offsets
+    strings = {"attribute_keys": list(table.attributes)}
+    for name, _ in CATEGORICAL_COLUMNS:
+        column = getattr(table, name)
+        arrays[name] = column.codes
+        strings[name] = column.categories
+    for i, column in enumerate(table.attributes.values()):
+        name = "attribute.%d" % i
+        arrays[name] = column.codes
+        strings[name] = column.categories
+    arrays["attribute_order"] = table.attribute_order.codes
+    strings["attribute_order"] = table.attribute_order.categories
+    return write_cache(
+        gff_file, stat, len(table), table.metadata, arrays, strings)
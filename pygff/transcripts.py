@@ -0,0 +1,123 @@
+"""Grouping of exon and CDS records into spliced transcripts.
+
+Records are grouped in one pass by the transcript they belong to: the
+`transcript_id` attribute of GTF files, or the `Parent` attribute of GFF3
+files. Records of a transcript are expected to be close to each other in
+the file, as they are in files written by gene model annotation tools, so
+only a bounded number of transcripts are kept open at a time, and only a
+bounded number of complete ones are remembered to detect split transcripts.
+"""
+
+from collections import OrderedDict
+from operator import attrgetter
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from pygff.reader import GFFRecord
+
+# Types of the records which make up a spliced sequence, by `--spliced` mode
+SEGMENT_TYPES = {"transcript": "exon", "cds": "CDS"}
+
+# Attributes naming the transcript of a record in GTF and GFF3 files
+TRANSCRIPT_KEYS = ("transcript_id", "Parent")
+
+# Up to this many transcripts are kept open while records are grouped
+MAX_PENDING_TRANSCRIPTS = 1000
+
+# Up to this many of the last complete transcripts are checked for records
+# which come after they were complete
+MAX_DONE_TRANSCRIPTS = 100000
+
+
+class SplitTranscriptError(Exception):
+    pass
+
+
+def frame_offset(feature: GFFRecord) -> int:
+    """Bases before the first codon of a CDS record."""
+    frame = feature.frame
+    return frame if isinstance(frame, int) else 0
+
+
+def transcript_key(feature: GFFRecord) -> Optional[str]:
+    attr = feature.get_attributes(TRANSCRIPT_KEYS)
+    return attr.get("transcript_id") or attr.get("Parent")
+
+
+class Transcript(object):
+    """The segments of a transcript, exons or CDS, sorted by start."""
+
+    def __init__(self, key: str, segments: List[GFFRecord]):
+        self.key = key
+        self.segments = sorted(segments, key=attrgetter("start"))
+        first = self.segments[0]
+        self.seqid = first.seqid
+        self.strand = first.strand
+        self.start = first.start
+        self.end = max(segment.end for segment in self.segments)
+
+    @property
+    def first_segment(self) -> GFFRecord:
+        """The first segment in the direction of transcription."""
+        return self.segments[-1] if self.strand == "-" else self.segments[0]
+
+    @property
+    def phase(self) -> int:
+        """Bases before the first codon, from the phase of the first CDS."""
+        return frame_offset(self.first_segment)
+
+
+def group_transcripts(
+    features: Iterable[GFFRecord], segment_type: str,
+    max_pending: int = MAX_PENDING_TRANSCRIPTS,
+    max_done: int = MAX_DONE_TRANSCRIPTS
+) -> Iterator[Transcript]:
+    """Group records of `segment_type` by transcript.
+
+    A transcript is complete when the seqid changes, or when more than
+    `max_pending` transcripts were started after it. Records of a
+    transcript which was already complete raise SplitTranscriptError, also
+    when the file comes back to its seqid later. Transcripts of the same
+    key on different seqids, such as those of pseudoautosomal regions,
+    are grouped separately.
+
+    Only the last `max_done` complete transcripts are remembered, so that
+    memory does not grow with the file. Records of a transcript which was
+    complete before those are not detected, and start a new transcript of
+    the same key.
+    """
+    pending: "OrderedDict[str, List[GFFRecord]]" = OrderedDict()
+    # (seqid, key) of the last complete transcripts, oldest first
+    done: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+
+    def complete(key: str, segments: List[GFFRecord]) -> Transcript:
+        done[seqid, key] = None
+        if len(done) > max_done:
+            done.popitem(last=False)
+        return Transcript(key, segments)
+
+    seqid = None
+    for feature in features:
+        if feature.type != segment_type:
+            continue
+        key = transcript_key(feature)
+        if key is None:
+            continue
+        if feature.seqid != seqid:
+            for pending_key, segments in pending.items():
+                yield complete(pending_key, segments)
+            pending.clear()
+            seqid = feature.seqid
+        segments = pending.get(key)
+        if segments is not None:
+            segments.append(feature)
+            continue
+        if (seqid, key) in done:
+            raise SplitTranscriptError(
+                "Records of transcript '%s' are not close to each other "
+                "in the file." % key)
+        pending[key] = [feature]
+        if len(pending) > max_pending:
+            oldest_key, segments = pending.popitem(last=False)
+            yield complete(oldest_key, segments)
+    for key, segments in pending.items():
+        yield Transcript(key, segments)
@@ -1,33 +1,85 @@
 import sys
-import gzip
 import time
 
+# Progress of files is shown in megabytes
+MEGABYTE = 1024 * 1024
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return "%d:%02d:%02d" % (hours, minutes, seconds)
+
 
 class ProgressBar(object):
+    """A progress bar on stderr, with throughput and ETA.
 
-    def __init__(self, total, prefix="", suffix="", ncol=60, file=sys.stderr):
+    Progress is counted in units of `scale`, e.g. `suffix="MB"` and
+    `scale=1024 * 1024` for a total given in bytes. Updates are cheap: the
+    bar is redrawn at most once every `min_interval` seconds.
+    """
+
+    def __init__(
+            self, total, prefix="", suffix="", ncol=60, file=sys.stderr,
+            scale=1, min_interval=0.1):
         self.count = total
         self.prefix = prefix
         self.suffix = suffix
         self.ncol = ncol
         self.file = file
+        self.scale = scale
+        self.min_interval = min_interval
         self.done = 0
-        self.last_time = time.time()
-
-    def update(self, amount):
-        self.done += amount
-        x = int(self.ncol*self.done/self.count)
-        self.file.write("%s[%s%s] %i/%i %s\r" % (
-            self.prefix, "#"*x, " "*(self.ncol-x), self.done, self.count,
-            self.suffix))
+        self.records = None
+        self.start_time = time.monotonic()
+        self.last_time = None
+
+    def update(self, amount, records=None):
+        self.update_to(self.done + amount, records)
+
+    def update_to(self, done, records=None):
+        """Set the amount done, and optionally the number of records."""
+        self.done = done
+        if records is not None:
+            self.records = records
+        now = time.monotonic()
+        if self.last_time is None or now - self.last_time >= self.min_interval:
+            self.last_time = now
+            self.draw(now)
+
+    def draw(self, now, end="\r"):
+        elapsed = now - self.start_time
+        fraction = min(1.0, self.done / self.count) if self.count else 1.0
+        x = int(self.ncol * fraction)
+        fields = [
+            "%s[%s%s]" % (self.prefix, "#" * x, " " * (self.ncol - x)),
+            self.format_amount(self.done) + "/" + self.format_amount(self.count),
+            self.suffix,
+        ]
+        if elapsed > 0 and self.done:
+            fields.append("%s %s/s" % (
+                self.format_amount(self.done / elapsed), self.suffix))
+            if self.records is not None:
+                fields.append("%.0f records/s" % (self.records / elapsed))
+            if end == "\n":
+                fields.append("in %s" % format_duration(elapsed))
+            else:
+                remaining = elapsed * (self.count - self.done) / self.done
+                fields.append("ETA %s" % format_duration(max(0, remaining)))
+        # Trailing spaces clear what is left of a longer previous line
+        self.file.write(" ".join(fields) + "   " + end)
         self.file.flush()
 
+    def format_amount(self, amount) -> str:
+        if self.scale == 1:
+            return "%i" % amount
+        return "%.1f" % (amount / self.scale)
+
     def __enter__(self):
-        self.update(0)
+        self.update_to(0)
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.file.write("%s[%s%s] %i/%i %s\r\n" % (
-            self.prefix, "#"*self.ncol, " "*0, self.done, self.count,
-            self.suffix))
-        self.file.flush()
+        if exc_type is None:
+            self.done = self.count
+        self.draw(time.monotonic(), end="\n")
@@ -22,7 +22,8 @@ setup(
     include_package_data=True,
     install_requires=[
         "HTSeq",
-        "pyfaidx"
+        "pyfaidx",
+        "numpy"
     ],
     entry_points='''
         [console_scripts]
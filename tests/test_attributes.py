@@ -0,0 +1,119 @@
+import unittest
+
+from pygff.reader import GFFRecord
+from pygff.attributes import (
+    AttributeParser, parse_attributes, detect_dialect, GTF, GFF3
+)
+
+from tests.test_filter import GTF_CONTENT
+from tests.test_convert import GFF3_CONTENT
+
+# Attributes and their values, as parsed by HTSeq 0.x
+PARSED = [
+    ('gene_id ""; transcript_id "";\n', {"gene_id": "", "transcript_id": ""}),
+    ('gene_id "140.000"; transcript_id "140.000.1";\n',
+     {"gene_id": "140.000", "transcript_id": "140.000.1"}),
+    ('gene_id "G"; exon_number 2; gene_name "a b";\n',
+     {"gene_id": "G", "exon_number": "2", "gene_name": "a b"}),
+    ("Parent=transcript:T1;Name=E1\n",
+     {"Parent": "transcript:T1", "Name": "E1"}),
+    ("ID=transcript:T2;Parent=gene:G1;transcript_id=T2\n",
+     {"ID": "transcript:T2", "Parent": "gene:G1", "transcript_id": "T2"}),
+    ("ID=gene:G1;biotype=protein_coding\n",
+     {"ID": "gene:G1", "biotype": "protein_coding"}),
+    ("ID=exon:E3;Parent=transcript:T1,transcript:T2\n",
+     {"ID": "exon:E3", "Parent": "transcript:T1,transcript:T2"}),
+]
+
+
+class AttributesTestCase(unittest.TestCase):
+
+    def test_parse(self):
+        for text, expected in PARSED:
+            with self.subTest(text=text):
+                self.assertEqual(parse_attributes(text), expected)
+                self.assertEqual(AttributeParser().parse(text), expected)
+
+    def test_files(self):
+        for content, dialect in ((GTF_CONTENT, GTF), (GFF3_CONTENT, GFF3)):
+            parser = AttributeParser()
+            for line in content.splitlines(keepends=True):
+                if line.startswith("#"):
+                    continue
+                text = line.split("\t")[8]
+                with self.subTest(text=text):
+                    self.assertEqual(parser.parse(text), parse_attributes(text))
+            self.assertEqual(parser.dialect, dialect)
+
+    def test_detect_dialect(self):
+        self.assertEqual(detect_dialect('gene_id "a=b"; x "1";'), GTF)
+        self.assertEqual(detect_dialect(" ;ID=a b;Name=c\n"), GFF3)
+        self.assertIsNone(detect_dialect(".\n"))
+        self.assertIsNone(detect_dialect(""))
+        parser = AttributeParser()
+        self.assertEqual(parser.parse(".\n"), {})
+        self.assertIsNone(parser.dialect)
+        self.assertEqual(parser.parse("ID=a\n"), {"ID": "a"})
+        self.assertEqual(parser.dialect, GFF3)
+
+    def test_quotes(self):
+        self.assertEqual(
+            parse_attributes('a "x;y"; b 2; c  "3" ;'),
+            {"a": "x;y", "b": "2", "c": "3"})
+        self.assertEqual(
+            parse_attributes('Note="q;r";ID=1;Name=a=b'),
+            {"Note": "q;r", "ID": "1", "Name": "a=b"})
+        # Pairs not written in the form of the dialect
+        self.assertEqual(
+            parse_attributes("ID=1;Note\tx", dialect=GFF3),
+            {"ID": "1", "Note": "x"})
+        with self.assertRaises(ValueError):
+            parse_attributes('gene_id "x"; broken;', dialect=GTF)
+
+    def test_projection(self):
+        text = 'gene_id "G"; transcript_id "T"; tag "basic"; tag "CCDS";\n'
+        self.assertEqual(
+            parse_attributes(text, {"transcript_id"}), {"transcript_id": "T"})
+        # The last value of a repeated key, as without projection
+        self.assertEqual(parse_attributes(text, {"tag"}), {"tag": "CCDS"})
+        self.assertEqual(parse_attributes(text)["tag"], "CCDS")
+        self.assertEqual(parse_attributes(text, {"missing"}), {})
+        # Other attributes are not parsed
+        self.assertEqual(
+            parse_attributes('gene_id "G"; broken', {"gene_id"}, GTF),
+            {"gene_id": "G"})
+
+    def test_projection_same_as_full(self):
+        texts = [
+            line.split("\t")[8]
+            for line in (GTF_CONTENT + GFF3_CONTENT).splitlines(keepends=True)
+            if not line.startswith("#")]
+        texts += [
+            'note "x; gene_id y"; gene_id "G";',
+            'gene_id "G"; note "gene_id; x";',
+            'note "a;b"; gene_id "G;H";',
+            "my_gene_id=A;gene_id2=B;gene_id =C",
+            "ID=a;Name=ID=b;Parent=x,y",
+            "Note= x;ID==y;Name=;Alias\tz",
+            'gene_id  "G"; gene_name= "g"; tag "a"; tag "b"',
+        ]
+        for text in texts:
+            expected = parse_attributes(text)
+            for key in list(expected) + ["gene_id", "ID", "missing"]:
+                with self.subTest(text=text, key=key):
+                    self.assertEqual(
+                        parse_attributes(text, {key}),
+                        {key: expected[key]} if key in expected else {})
+
+    def test_record(self):
+        line = '1\tna\texon\t1\t10\t.\t+\t.\tgene_id "G"; transcript_id "T";\n'
+        feature = GFFRecord(line, parser=AttributeParser())
+        self.assertEqual(
+            feature.get_attributes(("transcript_id", "Parent")),
+            {"transcript_id": "T"})
+        self.assertEqual(feature.name, "G")
+        self.assertEqual(feature.get_attributes(("gene_id",)), {"gene_id": "G"})
+        feature = GFFRecord("1\tna\tgene\t1\t10\t.\t+\t.\tID=G;Name=g\n")
+        self.assertEqual(feature.get_attributes({"Name"}), {"Name": "g"})
+        self.assertEqual(feature.attr, {"ID": "G", "Name": "g"})
+        self.assertEqual(feature.name, "G")
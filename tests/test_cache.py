@@ -0,0 +1,123 @@
+import unittest
+import os
+import tempfile
+import warnings
+from unittest import mock
+
+import numpy as np
+
+from pygff.cache import CACHE_DIR_ENV, load_cache, iter_caches
+from pygff.filter import GFF_Filter
+from pygff.reader import GFF_Reader
+from pygff.table import GFFTable, build_cache
+
+from tests.test_filter import tempinput, GTF_CONTENT
+from tests.test_convert import GFF3_CONTENT
+
+
+class GFFCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        patcher = mock.patch.dict(os.environ, {CACHE_DIR_ENV: tempdir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_table(self):
+        content = "##gff-version 2\n#comment\n" + GTF_CONTENT
+        with tempinput(content) as gff_file:
+            self.assertIsNone(load_cache(gff_file))
+            build_cache(gff_file)
+            self.assertIsNotNone(load_cache(gff_file))
+            parsed = GFFTable.from_file(gff_file, use_cache=False)
+            cached = GFFTable.from_file(gff_file)
+            self.assertEqual(cached.metadata, {"gff-version": "2"})
+            self.assertEqual(len(cached), len(parsed))
+            for name in ("seqid", "source", "type", "strand"):
+                self.assertEqual(
+                    getattr(cached, name).categories,
+                    getattr(parsed, name).categories)
+                self.assertTrue(np.array_equal(
+                    getattr(cached, name).codes, getattr(parsed, name).codes))
+            for name in ("start", "end", "phase", "offsets"):
+                self.assertTrue(np.array_equal(
+                    getattr(cached, name), getattr(parsed, name)))
+            self.assertEqual(list(cached.attributes), list(parsed.attributes))
+            self.assertEqual(
+                cached.attributes["transcript_id"].categories,
+                parsed.attributes["transcript_id"].categories)
+            self.assertEqual(
+                b"".join(cached.iter_raw_lines()), GTF_CONTENT.encode("UTF-8"))
+            cached = GFFTable.from_file(
+                gff_file, end_included=False, attributes=["gene_id"])
+            self.assertEqual(cached.end[0], parsed.end[0] - 1)
+            self.assertEqual(list(cached.attributes), ["gene_id"])
+
+    def test_reader_and_filter(self):
+        params_list = [
+            {"type": "CDS"},
+            {"attributes": "gene_id=140.000", "strand": "-"},
+            {"region": ["140:60000-70000"], "expression": "start > 65000"},
+        ]
+        with tempinput(GTF_CONTENT) as gff_file:
+            expected = [
+                [line for _, line in GFF_Filter(gff_file, params)]
+                for params in params_list]
+            build_cache(gff_file)
+            reader = GFF_Reader(gff_file)
+            self.assertIsNotNone(reader.cache)
+            self.assertEqual(
+                "".join(line for _, line in reader), GTF_CONTENT)
+            for params, lines in zip(params_list, expected):
+                with self.subTest(params=params):
+                    gff_filter = GFF_Filter(gff_file, params)
+                    self.assertTrue(gff_filter.use_table)
+                    self.assertEqual(
+                        [line for _, line in gff_filter], lines)
+                    self.assertEqual(
+                        list(gff_filter.iter_raw_lines()),
+                        [line.encode("UTF-8") for line in lines])
+            self.assertIsNone(GFF_Filter(gff_file, {}, use_cache=False).cache)
+
+    def test_records(self):
+        def fields(records):
+            return [(record.seqid, record.source, record.type, record.start,
+                     record.end, record.score, record.score_string,
+                     record.strand, record.phase, record.frame, record.name,
+                     record.attr) for record in records]
+
+        for content in (GTF_CONTENT, GFF3_CONTENT):
+            with tempinput(content) as gff_file:
+                parsed = list(GFF_Reader(gff_file).iter_records())
+                build_cache(gff_file)
+                reader = GFF_Reader(gff_file, end_included=False)
+                self.assertIsNotNone(reader.cache)
+                records = list(reader.iter_records())
+                self.assertEqual(fields(records), fields(
+                    GFF_Reader(gff_file, end_included=False, use_cache=False)
+                    .iter_records()))
+                self.assertEqual(
+                    [record.line for record in records],
+                    [record.line for record in parsed])
+                self.assertEqual(records[3].columns, parsed[3].columns)
+                params = {"type": "CDS", "strand": "-"}
+                self.assertEqual(
+                    fields(GFF_Filter(gff_file, params).iter_records()),
+                    fields(GFF_Filter(gff_file, params, use_cache=False)
+                           .iter_records()))
+
+    def test_outdated_cache(self):
+        with tempinput(GTF_CONTENT) as gff_file:
+            build_cache(gff_file)
+            with open(gff_file, "a") as f:
+                f.write('381\tTwinscan\texon\t900\t1000\t.\t+\t.\tgene_id "x";\n')
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                self.assertIsNone(load_cache(gff_file))
+                self.assertEqual(len(GFFTable.from_file(gff_file)), 25)
+            self.assertEqual(len(caught), 2)
+            (_, cache), = iter_caches()
+            self.assertFalse(cache.is_current())
+            build_cache(gff_file)
+            self.assertEqual(load_cache(gff_file).rows, 25)
@@ -0,0 +1,90 @@
+import unittest
+
+from pygff.convert import ParentIndex, ConversionError, get_gtf_line
+from pygff.reader import GFF_Reader
+
+from tests.test_filter import tempinput
+
+# Children are listed before their parents
+GFF3_CONTENT = """\
+##gff-version 3
+1\tna\texon\t1\t100\t.\t+\t.\tParent=transcript:T1;Name=E1
+1\tna\texon\t200\t300\t.\t+\t.\tParent=transcript:T2;Name=E2
+1\tna\tmRNA\t1\t300\t.\t+\t.\tID=transcript:T1;Parent=gene:G1
+1\tna\tncRNA\t200\t300\t.\t+\t.\tID=transcript:T2;Parent=gene:G1;transcript_id=T2
+1\tna\tgene\t1\t300\t.\t+\t.\tID=gene:G1;biotype=protein_coding
+2\tna\tmRNA\t1\t50\t.\t-\t.\tID=transcript:T3;Parent=gene:G2
+2\tna\texon\t1\t50\t.\t-\t.\tParent=transcript:T3
+"""
+
+
+def convert(gff_file, parents, id_prefix=()):
+    return [
+        get_gtf_line(feature, parents, list(id_prefix), {}, ":")
+        for feature, _ in GFF_Reader(gff_file, use_cache=False)]
+
+
+class ParentIndexTestCase(unittest.TestCase):
+
+    def test_build(self):
+        with tempinput(GFF3_CONTENT) as gff_file:
+            with ParentIndex.build(gff_file, [], ":") as parents:
+                self.assertEqual(len(parents), 3)
+                self.assertEqual(parents.get("T1"), "G1")
+                self.assertEqual(parents.get("T3"), "G2")
+                self.assertIsNone(parents.get("G1"))
+            with ParentIndex.build(gff_file, ["gene"], ":") as parents:
+                self.assertEqual(parents.get("T2"), "gene:G1")
+
+    def test_spill(self):
+        with tempinput(GFF3_CONTENT) as gff_file:
+            with ParentIndex.build(gff_file, [], ":") as parents:
+                expected = convert(gff_file, parents)
+            with ParentIndex.build(gff_file, [], ":", max_entries=1) as parents:
+                self.assertIsNotNone(parents.db)
+                self.assertEqual(len(parents), 3)
+                self.assertEqual(
+                    [parents.get(t) for t in ("T1", "T2", "T3", "T4")],
+                    ["G1", "G1", "G2", None])
+                self.assertEqual(convert(gff_file, parents), expected)
+
+    def test_unordered_conversion(self):
+        with tempinput(GFF3_CONTENT) as gff_file:
+            with ParentIndex.build(gff_file, [], ":") as parents:
+                lines = convert(gff_file, parents)
+            with ParentIndex.build(gff_file, ["transcript"], ":") as parents:
+                prefixed = convert(gff_file, parents, ["transcript"])
+        self.assertEqual(
+            lines[0].split("\t")[8],
+            'gene_id "G1"; transcript_id "T1"; Parent "transcript:T1"; Name "E1"\n')
+        self.assertTrue(lines[1].split("\t")[8].startswith(
+            'gene_id "G1"; transcript_id "T2";'))
+        self.assertTrue(lines[6].split("\t")[8].startswith(
+            'gene_id "G2"; transcript_id "T3";'))
+        self.assertTrue(prefixed[0].split("\t")[8].startswith(
+            'gene_id "G1"; transcript_id "transcript:T1";'))
+
+    def test_columns(self):
+        content = GFF3_CONTENT.replace(
+            "1\tna\tgene\t1\t300\t.\t+\t.",
+            "1\tna\tgene\t1\t300\t5.5\t+\t0")
+        with tempinput(content) as gff_file:
+            with ParentIndex.build(gff_file, [], ":") as parents:
+                lines = convert(gff_file, parents)
+        self.assertEqual(
+            lines[4].split("\t")[:8],
+            ["1", "na", "gene", "1", "300", "5.5", "+", "0"])
+        self.assertEqual(
+            lines[6].split("\t")[:8],
+            ["2", "na", "exon", "1", "50", ".", "-", "."])
+
+    def test_missing_transcript(self):
+        for feature_type in ("exon", "CDS"):
+            content = GFF3_CONTENT + (
+                "2\tna\t%s\t1\t50\t.\t-\t.\tParent=transcript:T4\n"
+                % feature_type)
+            with self.subTest(type=feature_type), \
+                    tempinput(content) as gff_file, \
+                    ParentIndex.build(gff_file, [], ":") as parents:
+                with self.assertRaisesRegex(ConversionError, "T4"):
+                    convert(gff_file, parents)
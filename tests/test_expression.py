@@ -0,0 +1,34 @@
+import unittest
+
+from pygff.reader import GFFRecord
+from pygff.expression import Expression
+
+
+def make_feature():
+    return GFFRecord(
+        '1\tensembl\tgene\t100\t200\t.\t+\t.\t'
+        'gene_id "G1"; gene_biotype "lncRNA";\n')
+
+
+class ExpressionTestCase(unittest.TestCase):
+
+    def test_evaluate(self):
+        feature = make_feature()
+        self.assertEqual(Expression("end - start + 1").evaluate(feature), 101)
+        self.assertEqual(Expression("seqid + strand").evaluate(feature), "1+")
+        self.assertEqual(Expression("phase").evaluate(feature), ".")
+        self.assertTrue(Expression(
+            "attributes['gene_biotype'] == 'lncRNA' and type == 'gene'"
+        ).evaluate(feature))
+        self.assertEqual(Expression("len(source)").evaluate(feature), 7)
+
+    def test_fields(self):
+        self.assertEqual(Expression("start > 100").fields, ["start"])
+        self.assertEqual(
+            Expression("[k for k in attributes if k.startswith(type)]").fields,
+            ["type", "attributes"])
+        self.assertEqual(Expression("1 + 1").fields, [])
+
+    def test_invalid_expression(self):
+        with self.assertRaises(SyntaxError):
+            Expression("start >")
@@ -0,0 +1,35 @@
+import unittest
+import os
+import random
+import tempfile
+import textwrap
+
+from pygff.fasta import FastaWriter, format_record, wrap_sequence
+from pygff.output import OutputWriter
+
+
+class FastaTestCase(unittest.TestCase):
+
+    def test_wrap_sequence(self):
+        random.seed(0)
+        for length in (0, 1, 59, 60, 61, 120, 1000):
+            sequence = "".join(random.choice("ACGTNacgtn") for _ in range(length))
+            for line_length in (1, 7, 60):
+                with self.subTest(length=length, line_length=line_length):
+                    self.assertEqual(
+                        wrap_sequence(sequence.encode(), line_length),
+                        textwrap.fill(sequence, line_length).encode())
+        self.assertEqual(wrap_sequence(b"ACGTACGT", None), b"ACGTACGT")
+        self.assertEqual(wrap_sequence(b"ACGTACGT", 0), b"ACGTACGT")
+
+    def test_write(self):
+        self.assertEqual(
+            format_record("chr1 T1", "MA*", 2), b">chr1 T1\nMA\n*\n\n")
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "out.fa")
+            with OutputWriter(filename) as output:
+                fasta = FastaWriter(output, 4)
+                fasta.write("a", "ACGTACGTAC")
+                fasta.write("b", "")
+            with open(filename, "rb") as f:
+                self.assertEqual(f.read(), b">a\nACGT\nACGT\nAC\n\n>b\n\n\n")
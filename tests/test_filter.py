@@ -3,7 +3,11 @@ import tempfile
 import os
 from contextlib import contextmanager
 
-from pygff.filter import GFF_Filter, FilterError
+from pygff.reader import GFF_Reader
+from pygff.filter import (
+    GFF_Filter, FilterChain, FilterError,
+    SeqIdFilter, TypeFilter, ExpressionFilter, RegionsFilter
+)
 
 
 @contextmanager
@@ -17,13 +21,23 @@ def tempinput(data):
         os.unlink(temp.name)
 
 
-def filter_gff(gff_file, filter_params):
+def filter_gff(gff_file, filter_params, sample_size=0):
     output_lines = []
-    for _, raw_line in GFF_Filter(gff_file, filter_params):
+    for _, raw_line in GFF_Filter(gff_file, filter_params, sample_size=sample_size):
         output_lines.append(raw_line)
     return "".join(output_lines)
 
 
+def filter_gff_parsed(gff_file, filter_params):
+    """Filter fully parsed records, without the raw line stage."""
+    filter_chain = FilterChain(filter_params)
+    output_lines = []
+    for feature, raw_line in GFF_Reader(gff_file):
+        if filter_chain.validate(feature):
+            output_lines.append(raw_line)
+    return "".join(output_lines)
+
+
 GTF_CONTENT = """140	Twinscan	inter	5141	8522	.	-	.	gene_id ""; transcript_id "";
 140	Twinscan	inter_CNS	8523	9711	.	-	.	gene_id ""; transcript_id "";
 140	Twinscan	inter	9712	13182	.	-	.	gene_id ""; transcript_id "";
@@ -306,4 +320,112 @@ class GffFilterTestCase(unittest.TestCase):
             with self.assertWarnsRegex(RuntimeWarning, "Start position of region filter is invalid"):
                 filter_gff(gff_file, {"region": "140:a-132"})
             with self.assertWarnsRegex(RuntimeWarning, "End position of region filter is invalid"):
-                filter_gff(gff_file, {"region": "140:1-b"})
\ No newline at end of file
+                filter_gff(gff_file, {"region": "140:1-b"})
+
+    def test_line_stage(self):
+        params_list = [
+            {"seqid": "140"},
+            {"seqid": ["14", "381"]},
+            {"seqid": "381", "type": "CDS", "strand": "+"},
+            {"source": "Twinscan", "type": ["exon", "inter"]},
+            {"strand": "-", "expression": "start > 70000"},
+            {"seqid": "140", "region": "140:60000-70000", "attributes": "gene_id=140.000"},
+        ]
+        with tempinput(GTF_CONTENT) as gff_file:
+            for params in params_list:
+                with self.subTest(params=params):
+                    self.assertEqual(
+                        filter_gff(gff_file, params),
+                        filter_gff_parsed(gff_file, params))
+
+    def test_raw_lines(self):
+        params_list = [
+            {"seqid": "381", "type": "CDS"},
+            {"type": "CDS", "expression": "start > 70000"},
+            {"region": "140:60000-70000"},
+        ]
+        content = "##gff-version 2\n" + GTF_CONTENT.replace("\n", "\r\n", 3)
+        with tempinput(content) as gff_file:
+            for params in params_list:
+                with self.subTest(params=params):
+                    expected = filter_gff(gff_file, params).encode("UTF-8")
+                    for use_mmap in (False, True):
+                        gff_filter = GFF_Filter(gff_file, params, use_mmap=use_mmap)
+                        self.assertEqual(
+                            b"".join(gff_filter.iter_raw_lines()), expected)
+
+    def test_filter_order(self):
+        chain = FilterChain({
+            "expression": "start > 100", "type": "CDS",
+            "seqid": "140", "strand": [], "attributes": ""})
+        # Filters without parameters are dropped
+        self.assertEqual(
+            [type(f) for f in chain.filters],
+            [SeqIdFilter, TypeFilter, ExpressionFilter])
+
+        with tempinput(GTF_CONTENT) as gff_file:
+            params = {"seqid": "140", "type": "CDS"}
+            gff_filter = GFF_Filter(gff_file, params, sample_size=10)
+            output = "".join(raw_line for _, raw_line in gff_filter)
+            self.assertEqual(output, filter_gff(gff_file, params))
+            # Only CDS records were rejected in the sample. Lines of a file
+            # are checked undecoded.
+            self.assertEqual(
+                [type(f) for f in gff_filter.filter_chain.byte_line_stage.filters],
+                [TypeFilter, SeqIdFilter])
+            lines = GTF_CONTENT.splitlines(True)
+            gff_filter = GFF_Filter(lines, params, sample_size=10)
+            self.assertEqual(
+                "".join(raw_line for _, raw_line in gff_filter), output)
+            self.assertEqual(
+                [type(f) for f in gff_filter.filter_chain.line_stage.filters],
+                [TypeFilter, SeqIdFilter])
+            for sample_size in (1, 5, 100):
+                with self.subTest(sample_size=sample_size):
+                    self.assertEqual(
+                        filter_gff(gff_file, params, sample_size), output)
+
+    def test_region_index(self):
+        regions = ["140:60000-70000", "140:5000", "140:-9000", "381:150-650",
+                   "381:300-1000", "140:71000-73300", "1:1-100"]
+        with tempinput(GTF_CONTENT) as gff_file:
+            records = [record for record, _ in GFF_Reader(gff_file)]
+            for i in range(len(regions)):
+                region_filter = RegionsFilter(regions[i:] + regions[:i])
+                for record in records:
+                    expected = any(
+                        record.seqid == region.seqname
+                        and (not region.start or record.start > region.start)
+                        and (not region.end or record.end <= region.end)
+                        for region in region_filter.regions)
+                    self.assertEqual(region_filter.validate(record), expected)
+
+    def test_regions_file(self):
+        bed_content = "track name=test\n140\t8522\t9711\n381\t149\t401\n"
+        with tempinput(GTF_CONTENT) as gff_file, tempinput(bed_content) as bed_file:
+            self.assertEqual(
+                filter_gff(gff_file, {"regions_file": [bed_file]}),
+                filter_gff(gff_file, {"region": ["140:8523-9711", "381:150-401"]}))
+            with tempinput("140:8523-9711\n") as regions_file:
+                self.assertEqual(
+                    filter_gff(gff_file, {"region": ["381:150-401"],
+                                          "regions_file": [regions_file]}),
+                    filter_gff(gff_file, {"region": ["140:8523-9711", "381:150-401"]}))
+
+    def test_values_file(self):
+        with tempinput(GTF_CONTENT) as gff_file:
+            with tempinput("exon\nstop_codon\n") as types_file:
+                self.assertEqual(
+                    filter_gff(gff_file, {"type": "CDS", "values_file": ["type=" + types_file]}),
+                    filter_gff(gff_file, {"type": ["CDS", "exon", "stop_codon"]}))
+            seqids = "\n".join(str(i) for i in range(1, 1000)) + "\n"
+            with tempinput(seqids) as seqid_file:
+                self.assertEqual(
+                    filter_gff(gff_file, {"values_file": ["seqid=" + seqid_file]}),
+                    filter_gff(gff_file, {"seqid": ["140", "381"]}))
+            with tempinput("# gene ids\n140.000\n1.000\n") as ids_file:
+                self.assertEqual(
+                    filter_gff(gff_file, {"values_file": ["gene_id=" + ids_file]}),
+                    filter_gff(gff_file, {"attributes": ["gene_id=140.000"]}))
+            with self.assertRaisesRegex(FilterError, "FIELD=FILE"):
+                filter_gff(gff_file, {"values_file": ["gene_id"]})
@@ -0,0 +1,61 @@
+import unittest
+
+from pygff.hierarchy import Hierarchy
+from pygff.filter import GFF_Filter
+
+from tests.test_filter import tempinput
+from tests.test_convert import GFF3_CONTENT
+
+GTF_MODELS = """\
+1\tna\tgene\t1\t300\t.\t+\t.\tgene_id "G1";
+1\tna\ttranscript\t1\t300\t.\t+\t.\tgene_id "G1"; transcript_id "T1";
+1\tna\texon\t1\t100\t.\t+\t.\tgene_id "G1"; transcript_id "T1";
+1\tna\texon\t200\t300\t.\t+\t.\tgene_id "G1"; transcript_id "T1";
+2\tna\tgene\t1\t50\t.\t-\t.\tgene_id "G2";
+2\tna\texon\t1\t50\t.\t-\t.\tgene_id "G2"; transcript_id "T2";
+"""
+
+
+class HierarchyTestCase(unittest.TestCase):
+
+    def test_gff3(self):
+        with tempinput(GFF3_CONTENT) as gff_file:
+            hierarchy = Hierarchy.build(gff_file)
+            self.assertEqual(len(hierarchy), 7)
+            gene = hierarchy.row("gene:G1")
+            self.assertEqual(gene, 4)
+            self.assertIsNone(hierarchy.row("gene:G2"))
+            self.assertEqual(list(hierarchy.children(gene)), [2, 3])
+            self.assertEqual(list(hierarchy.parents(0)), [2])
+            self.assertEqual(list(hierarchy.descendants([gene])), [0, 1, 2, 3])
+            self.assertEqual(
+                list(hierarchy.descendants([gene], include_self=True)),
+                [0, 1, 2, 3, 4])
+            self.assertEqual(list(hierarchy.ancestors([0, 6])), [2, 4, 5])
+            self.assertEqual(list(hierarchy.descendants([])), [])
+            lines = GFF3_CONTENT.encode().splitlines(keepends=True)
+            self.assertEqual(
+                list(hierarchy.iter_lines([5, 0])), [lines[6], lines[1]])
+
+    def test_gtf(self):
+        with tempinput(GTF_MODELS) as gff_file:
+            hierarchy = Hierarchy.build(gff_file)
+            self.assertEqual(list(hierarchy.descendants([0])), [1, 2, 3])
+            self.assertEqual(list(hierarchy.ancestors([3])), [0, 1])
+            # Exons without transcript line are not linked to their gene
+            self.assertEqual(list(hierarchy.descendants([4])), [])
+
+    def test_filter_with_children(self):
+        lines = GFF3_CONTENT.splitlines(keepends=True)
+        with tempinput(GFF3_CONTENT) as gff_file:
+            gff_filter = GFF_Filter(
+                gff_file, {"type": ["gene"]}, use_cache=False)
+            self.assertEqual(
+                b"".join(gff_filter.iter_with_children()).decode(),
+                "".join(lines[1:6]))
+            gff_filter = GFF_Filter(
+                gff_file, {"attributes": ["ID=transcript:T3"]},
+                use_cache=False)
+            self.assertEqual(
+                b"".join(gff_filter.iter_with_children()).decode(),
+                "".join(lines[6:8]))
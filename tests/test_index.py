@@ -0,0 +1,103 @@
+import unittest
+import os
+import random
+import warnings
+
+from pygff.filter import GFF_Filter
+from pygff.index import (
+    build_index, load_index, index_filename, GFFIndexError, LineScanner
+)
+
+from tests.test_filter import tempinput, GTF_CONTENT
+from tests.test_reader import write_bgzf
+
+
+def make_sorted_gff(n_records=3000, seed=1):
+    rng = random.Random(seed)
+    lines = ["##gff-version 3\n"]
+    for seqid in ("chr1", "chr2", "chr10"):
+        start = 1
+        for i in range(n_records):
+            start += rng.randint(0, 300)
+            end = start + rng.randint(0, 5000)
+            lines.append("%s\ttest\texon\t%d\t%d\t.\t+\t.\tID=%s.%d\n" % (
+                seqid, start, end, seqid, i))
+    return "".join(lines)
+
+
+class GFFIndexTestCase(unittest.TestCase):
+
+    def filter_lines(self, gff_file, params, use_index, use_mmap=False):
+        gff_filter = GFF_Filter(
+            gff_file, params, use_index=use_index, use_mmap=use_mmap)
+        self.assertEqual(gff_filter.index is not None, use_index)
+        return [raw_line for _, raw_line in gff_filter]
+
+    def check_regions(self, gff_file, rng):
+        build_index(gff_file)
+        region_list = [
+            ["chr1"], ["chr2:100000-200000"], ["chr10:400000"], ["chr1:-50000"],
+            ["chr3:1-1000"], ["chr2:1-20000", "chr1:30000-90000", "chr2:10000-80000"],
+        ]
+        for _ in range(20):
+            seqid = rng.choice(["chr1", "chr2", "chr10"])
+            start = rng.randint(1, 500000)
+            region_list.append(["%s:%d-%d" % (seqid, start, start + rng.randint(1, 100000))])
+        for regions in region_list:
+            with self.subTest(regions=regions):
+                params = {"region": regions, "type": "exon"}
+                expected = self.filter_lines(gff_file, params, False)
+                self.assertEqual(
+                    self.filter_lines(gff_file, params, True), expected)
+                self.assertEqual(
+                    self.filter_lines(gff_file, params, True, True), expected)
+
+    def test_plain(self):
+        with tempinput(make_sorted_gff()) as gff_file:
+            try:
+                self.check_regions(gff_file, random.Random(2))
+            finally:
+                os.unlink(index_filename(gff_file))
+
+    def test_bgzf(self):
+        data = make_sorted_gff().encode("UTF-8")
+        with tempinput("") as gff_file:
+            write_bgzf(gff_file, data, 10000)
+            try:
+                self.check_regions(gff_file, random.Random(3))
+            finally:
+                os.unlink(index_filename(gff_file))
+
+    def test_lines_at(self):
+        data = make_sorted_gff().encode("UTF-8")
+        with tempinput("") as gff_file:
+            write_bgzf(gff_file, data, 10000)
+            with LineScanner(gff_file) as scanner:
+                lines = list(scanner.lines_from())
+            rows = list(range(1, len(lines), 7)) + [len(lines) - 1, 3, 3, 0]
+            with LineScanner(gff_file) as scanner:
+                self.assertEqual(
+                    list(scanner.lines_at(lines[row][0] for row in rows)),
+                    [lines[row][1] for row in rows])
+
+    def test_unsorted(self):
+        with tempinput(GTF_CONTENT) as gff_file:
+            with self.assertRaisesRegex(GFFIndexError, "not sorted"):
+                build_index(gff_file)
+        with tempinput(GTF_CONTENT.replace("381\t", "140\t")) as gff_file:
+            with self.assertRaisesRegex(GFFIndexError, "not sorted"):
+                build_index(gff_file)
+
+    def test_outdated_index(self):
+        with tempinput(make_sorted_gff(100)) as gff_file:
+            build_index(gff_file)
+            try:
+                self.assertIsNotNone(load_index(gff_file))
+                with open(gff_file, "a") as f:
+                    f.write("chr10\ttest\texon\t900000\t900001\t.\t+\t.\tID=last\n")
+                with warnings.catch_warnings(record=True) as caught:
+                    warnings.simplefilter("always")
+                    self.assertIsNone(load_index(gff_file))
+                self.assertEqual(len(caught), 1)
+            finally:
+                os.unlink(index_filename(gff_file))
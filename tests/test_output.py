@@ -0,0 +1,43 @@
+import unittest
+import gzip
+import os
+import tempfile
+
+from pygff.bgzf import is_bgzf
+from pygff.output import OutputWriter
+from pygff.reader import iter_blocks
+
+
+class OutputWriterTestCase(unittest.TestCase):
+
+    def write(self, filename, **kwargs):
+        lines = [("line %d\n" % i).encode("UTF-8") for i in range(50000)]
+        with OutputWriter(filename, buffer_size=1000, **kwargs) as output:
+            output.write("# header\n")
+            output.writelines(lines)
+            output.write_bytes(b"last\n")
+        return b"".join([b"# header\n"] + lines + [b"last\n"])
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, "out.gtf")
+            expected = self.write(filename)
+            with open(filename, "rb") as f:
+                self.assertEqual(f.read(), expected)
+
+            filename = os.path.join(tempdir, "out.gtf.gz")
+            expected = self.write(filename)
+            self.assertFalse(is_bgzf(filename))
+            with gzip.open(filename, "rb") as f:
+                self.assertEqual(f.read(), expected)
+
+            for threads in (1, 4):
+                with self.subTest(threads=threads):
+                    filename = os.path.join(tempdir, "out.gtf.bgz")
+                    expected = self.write(filename, bgzf=True, threads=threads)
+                    self.assertTrue(is_bgzf(filename))
+                    with gzip.open(filename, "rb") as f:
+                        self.assertEqual(f.read(), expected)
+                    self.assertEqual(
+                        b"".join(block for block, _ in iter_blocks(filename)),
+                        expected)
@@ -0,0 +1,73 @@
+import unittest
+
+from pygff.parallel import split_file, read_lines, imap_ordered
+from pygff.stats import FeatureStats, count_file
+from pygff.convert import ParentIndex, convert_lines
+from pygff.reader import GFF_Reader
+from pygff.main import stats_chunk, filter_chunk, convert_chunk, init_convert_worker
+
+from tests.test_filter import tempinput, filter_gff, GTF_CONTENT
+from tests.test_convert import GFF3_CONTENT
+
+
+class ParallelTestCase(unittest.TestCase):
+
+    def test_split_file(self):
+        content = "#comment\r\n" + GTF_CONTENT
+        with tempinput(content) as gff_file:
+            for chunk_size in (1, 50, 333, 100000):
+                ranges = split_file(gff_file, chunk_size)
+                self.assertEqual(ranges[0][0], 0)
+                self.assertEqual(ranges[-1][1], len(content.encode("UTF-8")))
+                lines = []
+                for start, end in ranges:
+                    lines.extend(read_lines(gff_file, start, end))
+                self.assertEqual(
+                    lines, ["#comment\n"] + GTF_CONTENT.splitlines(True))
+
+    def test_stats_chunks(self):
+        with tempinput(GTF_CONTENT) as gff_file:
+            expected = count_file(gff_file, FeatureStats(True, True)).summary()
+            stats = FeatureStats(True, True)
+            for chunk_stats in imap_ordered(
+                    stats_chunk,
+                    ((gff_file, start, end, True, True)
+                     for start, end in split_file(gff_file, 200)),
+                    processes=2):
+                stats.update(chunk_stats)
+            self.assertEqual(stats.summary(), expected)
+
+    def test_filter_chunks(self):
+        params_list = [
+            {"type": ["CDS", "exon"], "strand": "+"},
+            {"type": "CDS", "attributes": "gene_id=140.000"},
+        ]
+        with tempinput(GTF_CONTENT) as gff_file:
+            for params in params_list:
+                with self.subTest(params=params):
+                    expected = filter_gff(gff_file, params)
+                    output = "".join(imap_ordered(
+                        filter_chunk,
+                        ((gff_file, start, end, params, "all", 0)
+                         for start, end in split_file(gff_file, 100)),
+                        processes=2))
+                    self.assertTrue(expected)
+                    self.assertEqual(output, expected)
+
+    def test_convert_chunks(self):
+        with tempinput(GFF3_CONTENT) as gff_file:
+            for max_entries in (100, 1):
+                with self.subTest(max_entries=max_entries), \
+                        ParentIndex.build(
+                            gff_file, [], ":", max_entries=max_entries) as parents:
+                    expected = convert_lines(
+                        GFF_Reader(gff_file).iter_lines(), parents, [], {}, ":")
+                    results = list(imap_ordered(
+                        convert_chunk,
+                        ((gff_file, start, end, [], {}, ":")
+                         for start, end in split_file(gff_file, 100)),
+                        processes=2, initializer=init_convert_worker,
+                        initargs=(parents,)))
+                    self.assertEqual(
+                        "".join(output for output, _ in results), expected)
+                    self.assertEqual(sum(count for _, count in results), 7)
@@ -0,0 +1,106 @@
+import io
+import json
+import os
+import time
+import unittest
+
+from pygff.filter import GFF_Filter
+from pygff.output import OutputWriter
+from pygff.profiling import (
+    Profiler, profile_stage, profile_calls, active_profiler, CAN_SAMPLE
+)
+
+from tests.test_filter import tempinput, filter_gff, GTF_CONTENT
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def test_inactive(self):
+        items = iter([1, 2])
+        self.assertIsNone(active_profiler())
+        self.assertIs(profile_stage("read", items), items)
+        self.assertIs(profile_calls("output", busy), busy)
+
+    def test_stages(self):
+        with Profiler() as profiler:
+            self.assertIs(active_profiler(), profiler)
+            blocks = profile_stage("read", [b"ab", b"cde"], "bytes", len)
+            count = profile_calls("count", len)
+            self.assertEqual([count(block) for block in blocks], [2, 3])
+        self.assertIsNone(active_profiler())
+        stages = {stage["name"]: stage for stage in profiler.times()}
+        self.assertEqual(stages["read"]["items"], 5)
+        self.assertEqual(stages["count"]["items"], 2)
+        self.assertIn("other", stages)
+        self.assertEqual(list(stages)[-1], "other")
+
+    @unittest.skipUnless(CAN_SAMPLE, "interval timers are not available")
+    def test_own_time(self):
+        def outer():
+            busy(0.02)
+            profile_calls("count", busy)(0.2)
+
+        with Profiler() as profiler:
+            profile_calls("read", outer)()
+        stages = {stage["name"]: stage for stage in profiler.times()}
+        # Time of the inner stage is not counted in the outer stage
+        self.assertGreater(stages["count"]["wall"], stages["read"]["wall"])
+        self.assertGreater(stages["count"]["cpu"], stages["read"]["cpu"])
+        self.assertAlmostEqual(
+            sum(stage["wall"] for stage in stages.values()), profiler.wall)
+
+    def test_filter(self):
+        with tempinput(GTF_CONTENT) as gff_file:
+            expected = filter_gff(
+                gff_file, {"type": "CDS", "attributes": "gene_id=140.000"})
+            with Profiler() as profiler:
+                result = filter_gff(
+                    gff_file, {"type": "CDS", "attributes": "gene_id=140.000"})
+        self.assertTrue(expected)
+        self.assertEqual(result, expected)
+        n_records = GTF_CONTENT.count("\n") - GTF_CONTENT.count("#")
+        n_cds = GTF_CONTENT.count("\tCDS\t")
+        filters = {f.name: f for f in profiler.filters.values()}
+        self.assertEqual(filters["TypeFilter"].checked, n_records)
+        self.assertEqual(
+            filters["TypeFilter"].rejected, n_records - n_cds)
+        self.assertEqual(filters["AttributesFilter"].checked, n_cds)
+        self.assertEqual(
+            filters["AttributesFilter"].rejected,
+            n_cds - expected.count("\n"))
+        stages = {stage["name"]: stage for stage in profiler.times()}
+        self.assertEqual(stages["split"]["items"], n_records)
+        self.assertEqual(stages["records"]["items"], n_cds)
+        self.assertEqual(
+            stages["record filters"]["items"], expected.count("\n"))
+
+    def test_report(self):
+        with tempinput(GTF_CONTENT) as gff_file:
+            with Profiler() as profiler, OutputWriter(os.devnull) as output:
+                output.writelines(GFF_Filter(
+                    gff_file, {"type": "exon"}).iter_raw_lines())
+        report = io.StringIO()
+        profiler.report(report)
+        lines = report.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("stage"))
+        self.assertEqual(
+            [line.split()[0] for line in lines[1:6]],
+            ["read", "split", "line", "output", "other"])
+        self.assertIn("TypeFilter", report.getvalue())
+        data = io.StringIO()
+        profiler.write_json(data, command=["filter"])
+        data = json.loads(data.getvalue())
+        self.assertEqual(data["command"], ["filter"])
+        self.assertEqual(data["filters"][0]["name"], "TypeFilter")
+        output_stage = data["stages"][-2]
+        self.assertEqual(output_stage["name"], "output")
+        self.assertEqual(output_stage["items"], sum(
+            len(line.encode("UTF-8"))
+            for line in GTF_CONTENT.splitlines(keepends=True)
+            if "\texon\t" in line))
@@ -0,0 +1,109 @@
+import unittest
+import gzip
+
+from pygff.reader import GFF_Reader, GFFRecord, TextFile, iter_blocks, split_lines, translate_newlines
+from pygff.bgzf import compress_block, EOF_BLOCK
+from pygff.filter import GFF_Filter
+
+from tests.test_filter import tempinput, GTF_CONTENT
+
+
+def write_bgzf(filename, data, block_size):
+    with open(filename, "wb") as f:
+        for i in range(0, len(data), block_size):
+            f.write(compress_block(data[i:i + block_size]))
+        f.write(EOF_BLOCK)
+
+
+class GFFRecordTestCase(unittest.TestCase):
+
+    def test_fields(self):
+        record = GFFRecord(
+            '381\tTwinscan\tCDS\t380\t401\t.\t+\t0\t'
+            'gene_id "381.000"; transcript_id "381.000.1";\n')
+        self.assertEqual(record.seqid, "381")
+        self.assertEqual(record.source, "Twinscan")
+        self.assertEqual(record.type, "CDS")
+        self.assertEqual((record.start, record.end), (380, 401))
+        self.assertEqual(record.score, ".")
+        self.assertEqual(record.strand, "+")
+        self.assertEqual((record.phase, record.frame), ("0", 0))
+        self.assertEqual(
+            record.attr, {"gene_id": "381.000", "transcript_id": "381.000.1"})
+        self.assertEqual(record.name, "381.000")
+        self.assertEqual(
+            (record.iv.chrom, record.iv.start, record.iv.end), ("381", 379, 401))
+
+        feature = record.to_feature()
+        self.assertEqual(feature.iv, record.iv)
+        self.assertEqual(feature.attr, record.attr)
+
+    def test_invalid_line(self):
+        with self.assertRaises(ValueError):
+            GFFRecord("381\tTwinscan\tCDS\n")
+
+    def test_lazy_attributes(self):
+        with tempinput(GTF_CONTENT) as gff_file:
+            records = [r for r, _ in GFF_Filter(gff_file, {"seqid": "381", "type": "CDS"})]
+            self.assertEqual(len(records), 3)
+            for record in records:
+                self.assertFalse(hasattr(record, "_attr"))
+
+            for record, _ in GFF_Reader(gff_file):
+                self.assertFalse(hasattr(record, "_attr"))
+
+
+class CompressedInputTestCase(unittest.TestCase):
+
+    def read_lines(self, gff_file, **kwargs):
+        return "".join(raw_line for _, raw_line in GFF_Reader(gff_file, **kwargs))
+
+    def test_gzip(self):
+        with tempinput("") as gff_file:
+            with gzip.open(gff_file, "wt") as f:
+                f.write(GTF_CONTENT)
+            self.assertEqual(self.read_lines(gff_file), GTF_CONTENT)
+            self.assertEqual(self.read_lines(gff_file, show_progress=True), GTF_CONTENT)
+
+    def test_bgzf(self):
+        data = GTF_CONTENT.encode("UTF-8")
+        with tempinput("") as gff_file:
+            # Small blocks, so that lines span blocks
+            for block_size in (100, 1000, len(data)):
+                with self.subTest(block_size=block_size):
+                    write_bgzf(gff_file, data, block_size)
+                    self.assertEqual(self.read_lines(gff_file), GTF_CONTENT)
+                    records = GFF_Filter(gff_file, {"seqid": "381"})
+                    self.assertEqual(len(list(records)), 10)
+
+
+class BlockReaderTestCase(unittest.TestCase):
+
+    def test_blocks_of_lines(self):
+        content = "##gff-version 2\n#comment\n\n" + GTF_CONTENT + "last\tline"
+        data = content.encode("UTF-8")
+        with tempinput(content) as gff_file:
+            for block_size in (1, 10, 100, len(data)):
+                with self.subTest(block_size=block_size):
+                    for use_mmap in (False, True):
+                        blocks = [block for block, _ in iter_blocks(
+                            gff_file, block_size=block_size, use_mmap=use_mmap)]
+                        self.assertEqual(b"".join(blocks), data)
+                        # Blocks end at line ends
+                        for block in blocks[:-1]:
+                            self.assertTrue(block.endswith(b"\n"))
+
+    def test_newlines(self):
+        content = "##gff-version 2\r\n" + GTF_CONTENT.replace("\n", "\r\n")
+        with tempinput(content) as gff_file:
+            for use_mmap in (False, True):
+                reader = GFF_Reader(gff_file, use_mmap=use_mmap)
+                self.assertEqual(
+                    "".join(raw_line for _, raw_line in reader), GTF_CONTENT)
+                self.assertEqual(reader.metadata, {"gff-version": "2"})
+            self.assertEqual(
+                "".join(TextFile(gff_file)),
+                "##gff-version 2\n" + GTF_CONTENT)
+        self.assertEqual(
+            split_lines(translate_newlines(b"a\r\nb\rc\n\nd")),
+            [b"a\n", b"b\n", b"c\n", b"\n", b"d"])
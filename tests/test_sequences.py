@@ -0,0 +1,106 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+from pygff.sequences import (
+    GenomeExtractor, genome_extract, reverse_complement, translate
+)
+from pygff.transcripts import group_transcripts
+from pygff.errors import ChromosomeNotFound, SeqExtractError
+
+from tests.test_transcripts import record
+
+
+FASTA_CONTENT = """>chr1
+ACGTACGTAA
+CCGGTTAACG
+>chr2
+TTTTGGGGCC
+AA
+"""
+
+
+class GenomeExtractorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.fasta_file = os.path.join(self.tempdir, "genome.fa")
+        with open(self.fasta_file, "w") as f:
+            f.write(FASTA_CONTENT)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_extract(self):
+        with GenomeExtractor(self.fasta_file) as genome:
+            self.assertEqual(genome.extract("chr1", 0, 4), "ACGT")
+            self.assertEqual(genome.extract("chr1", 8, 12), "AACC")
+            self.assertEqual(genome.extract("chr1", 8, 12, "-"), "GGTT")
+            with self.assertRaises(ChromosomeNotFound):
+                genome.extract("chr3", 0, 4)
+        self.assertEqual(genome_extract(self.fasta_file, "chr2", 8, 12, "+"), "CCAA")
+
+    def test_extract_batch(self):
+        intervals = [
+            ("chr2", 0, 4, "+"),
+            ("chr1", 10, 14, "+"),
+            ("chrUn", 0, 4, "+"),
+            ("chr1", 0, 4, "-"),
+        ]
+        with GenomeExtractor(self.fasta_file) as genome:
+            sequences = genome.extract_batch(intervals)
+        self.assertEqual(sequences[0], "TTTT")
+        self.assertEqual(sequences[1], "CCGG")
+        self.assertIsInstance(sequences[2], SeqExtractError)
+        self.assertEqual(sequences[3], "ACGT")
+
+    def test_extract_buffered(self):
+        intervals = [
+            (chrom, start, end, strand)
+            for chrom in ("chr1", "chr2")
+            for start in range(0, 22, 3)
+            for end in (start, start + 1, start + 4, start + 9, 25)
+            for strand in "+-"
+        ]
+        intervals.append(("chrUn", 0, 4, "+"))
+        with GenomeExtractor(self.fasta_file) as genome:
+            expected = genome.extract_batch(intervals)
+        for buffer_size in (1, 4, 7, 100):
+            with self.subTest(buffer_size=buffer_size):
+                with GenomeExtractor(
+                        self.fasta_file, buffered=True,
+                        buffer_size=buffer_size) as genome:
+                    sequences = genome.extract_batch(intervals)
+                    # Unsorted reads move the window back and forth
+                    self.assertEqual(genome.extract("chr1", 12, 16), "GGTT")
+                    self.assertEqual(genome.extract("chr1", 0, 4, "-"), "ACGT")
+                self.assertEqual(sequences[:-1], expected[:-1])
+                self.assertIsInstance(sequences[-1], SeqExtractError)
+
+    def test_extract_spliced_batch(self):
+        features = [
+            record("chr1", "exon", 1, 4, "+", "Parent=T1"),
+            record("chr1", "exon", 9, 12, "+", "Parent=T1"),
+            record("chr1", "exon", 11, 12, "-", "Parent=T2"),
+            record("chr1", "exon", 1, 2, "-", "Parent=T2"),
+            record("chr2", "exon", 1, 2, "+", "Parent=T3"),
+            record("chr3", "exon", 1, 2, "+", "Parent=T4"),
+        ]
+        transcripts = list(group_transcripts(features, "exon"))
+        with GenomeExtractor(self.fasta_file) as genome:
+            sequences = genome.extract_spliced_batch(transcripts)
+        self.assertEqual(sequences[:3], ["ACGTAACC", "GGGT", "TT"])
+        self.assertIsInstance(sequences[3], SeqExtractError)
+
+
+class SequenceFunctionsTestCase(unittest.TestCase):
+
+    def test_reverse_complement(self):
+        self.assertEqual(reverse_complement("ACGTNacgtn"), "nacgtNACGT")
+        self.assertEqual(reverse_complement("RYKM"), "KMRY")
+
+    def test_translate(self):
+        self.assertEqual(translate("ATGGCCTAA"), "MA*")
+        self.assertEqual(translate("atgNNNtgaTG"), "MX*")
+        self.assertEqual(translate("AUGUUU"), "MF")
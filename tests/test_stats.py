@@ -0,0 +1,68 @@
+import unittest
+from collections import Counter, defaultdict
+
+from pygff.reader import GFF_Reader
+from pygff.stats import FeatureStats, count_file, length_summary
+
+from tests.test_filter import tempinput, GTF_CONTENT
+
+
+GFF3_CONTENT = """##gff-version 3
+#!genome-build test
+chr1\ttest\tgene\t101\t400\t.\t+\t.\tID=gene1;Name=A;Name=B
+chr1\ttest\tmRNA\t101\t400\t.\t+\t.\tID=mRNA1;Parent=gene1
+
+chr1\ttest\texon\t101\t200\t.\t+\t.\tParent=mRNA1
+chr2\ttest\texon\t301\t310\t.\t-\t.\tParent=mRNA1
+"""
+
+
+class FeatureStatsTestCase(unittest.TestCase):
+
+    def count_parsed(self, gff_file):
+        summary = defaultdict(lambda: defaultdict(int))
+        for feature, _ in GFF_Reader(gff_file):
+            summary["seqname"][feature.seqid] += 1
+            summary["source"][feature.source] += 1
+            summary["types"][feature.type] += 1
+            summary["strand"][feature.strand] += 1
+            summary["phase"][feature.phase] += 1
+        return summary
+
+    def test_column_counts(self):
+        for content in (GTF_CONTENT, GFF3_CONTENT):
+            with tempinput(content) as gff_file:
+                summary = count_file(gff_file, FeatureStats()).summary()
+                self.assertEqual(summary, self.count_parsed(gff_file))
+                # Values are listed in order of appearance
+                for name, counts in self.count_parsed(gff_file).items():
+                    self.assertEqual(list(summary[name]), list(counts))
+
+    def test_optional_metrics(self):
+        with tempinput(GFF3_CONTENT) as gff_file:
+            summary = count_file(gff_file, FeatureStats(True, True)).summary()
+        self.assertEqual(summary["types"], {"gene": 1, "mRNA": 1, "exon": 2})
+        self.assertEqual(summary["lengths"]["exon"], {
+            "count": 2, "total": 110, "min": 10, "max": 100,
+            "mean": 55.0, "median": 55.0})
+        self.assertEqual(
+            summary["attribute_keys"], {"ID": 2, "Name": 1, "Parent": 3})
+
+        with tempinput(GTF_CONTENT) as gff_file:
+            summary = count_file(gff_file, FeatureStats(False, True)).summary()
+        self.assertEqual(
+            summary["attribute_keys"], {"gene_id": 24, "transcript_id": 24})
+        self.assertNotIn("lengths", summary)
+
+    def test_length_summary(self):
+        lengths = Counter([5, 1, 1, 9, 5, 5, 7])
+        self.assertEqual(length_summary(lengths)["median"], 5)
+        lengths = Counter([1, 10, 2, 3])
+        self.assertEqual(length_summary(lengths)["median"], 2.5)
+
+    def test_invalid_line(self):
+        stats = FeatureStats()
+        with self.assertRaises(ValueError):
+            stats.count_lines([b"chr1\ttest\tgene\t1\t100\n"])
+        with self.assertRaises(ValueError):
+            stats.count_lines([b"chr1\ttest\tgene\t1\t100\t.\t+\t.\n"])
@@ -0,0 +1,96 @@
+import unittest
+import gzip
+
+import numpy as np
+
+from pygff.filter import FilterChain
+from pygff.table import GFFTable
+
+from tests.test_filter import tempinput, filter_gff, GTF_CONTENT
+from tests.test_reader import write_bgzf
+
+
+def write_gzip(filename, data):
+    with gzip.open(filename, "wt", newline="") as f:
+        f.write(data)
+
+
+class GFFTableTestCase(unittest.TestCase):
+
+    def test_columns(self):
+        content = "##gff-version 2\n#comment\n" + GTF_CONTENT
+        with tempinput(content) as gff_file:
+            table = GFFTable.from_file(gff_file)
+            self.assertEqual(
+                b"".join(table.iter_raw_lines()), GTF_CONTENT.encode("UTF-8"))
+            self.assertEqual(
+                list(table.iter_raw_lines([5, 2])),
+                [table.raw_line(5), table.raw_line(2)])
+            record = next(table.records([5]))
+        self.assertEqual((record.type, record.start), ("stop_codon", 66993))
+        self.assertEqual(len(table), 24)
+        self.assertEqual(table.seqid.categories, ["140", "381"])
+        self.assertEqual(table.type[3], "3UTR")
+        self.assertEqual(table.strand[14], "+")
+        self.assertEqual(table.start[0], 5141)
+        self.assertEqual(table.end[0], 8522)
+        self.assertTrue(np.isnan(table.score[0]))
+        self.assertEqual(list(table.phase[4:7]), [-1, 0, 1])
+        self.assertEqual(table.attributes["gene_id"][3], "140.000")
+        self.assertEqual(table.offsets[0], content.index("140\t"))
+
+    def test_raw_lines(self):
+        content = "#comment\r\n" + GTF_CONTENT.replace("\n", "\r\n")
+        expected = GTF_CONTENT.encode("UTF-8").splitlines(keepends=True)
+        rows = [0, 3, 4, 20, 23]
+        writers = {
+            "crlf": lambda gff_file: None,
+            "gzip": lambda gff_file: write_gzip(gff_file, content),
+            "bgzf": lambda gff_file: write_bgzf(
+                gff_file, content.encode("UTF-8"), 500),
+        }
+        for name, write in writers.items():
+            with self.subTest(name), tempinput(content) as gff_file:
+                write(gff_file)
+                table = GFFTable.from_file(gff_file)
+                self.assertEqual(table.offsets is None, name == "gzip")
+                self.assertEqual(list(table.iter_raw_lines()), expected)
+                self.assertEqual(
+                    list(table.iter_raw_lines(rows)),
+                    [expected[row] for row in rows])
+                self.assertEqual(
+                    list(table.iter_raw_lines(rows[::-1])),
+                    [expected[row] for row in rows[::-1]])
+
+    def test_selected_attributes(self):
+        content = GTF_CONTENT.replace(
+            '381\tTwinscan\texon\t150\t200\t.\t+\t.\tgene_id "381.000";',
+            '381\tTwinscan\texon\t150\t200\t.\t+\t.\tgene_id "381.000"; note "x";')
+        with tempinput(content) as gff_file:
+            table = GFFTable.from_file(gff_file, attributes=["note"])
+            self.assertEqual(list(table.attributes), ["note"])
+            self.assertEqual(table.attributes["note"][14], "x")
+            self.assertIsNone(table.attributes["note"][15])
+            table = GFFTable.from_file(gff_file, attributes=False)
+            self.assertEqual(table.attributes, {})
+
+    def test_mask(self):
+        params_list = [
+            {"seqid": "381"},
+            {"seqid": ["140", "999"], "type": ["CDS", "exon"]},
+            {"strand": "+", "source": "Twinscan"},
+            {"attributes": ["gene_id=140.000", "transcript_id=140.000.1"]},
+            {"attributes": "missing=1"},
+            {"region": ["140:60000-70000", "381:300-1000", "140:71000"]},
+            {"region": ["140", "1:1-100"], "type": "CDS"},
+            {"type": "CDS", "expression": "(end - start + 1) % 3 == 0"},
+        ]
+        with tempinput(GTF_CONTENT) as gff_file:
+            table = GFFTable.from_file(gff_file)
+            for params in params_list:
+                with self.subTest(params=params):
+                    mask = FilterChain(params).mask(table)
+                    self.assertEqual(mask.dtype, bool)
+                    self.assertEqual(
+                        b"".join(table.iter_raw_lines(np.flatnonzero(mask))),
+                        filter_gff(gff_file, params).encode("UTF-8"))
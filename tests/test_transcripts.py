@@ -0,0 +1,67 @@
+import unittest
+
+from pygff.reader import GFFRecord
+from pygff.transcripts import (
+    group_transcripts, SplitTranscriptError, MAX_PENDING_TRANSCRIPTS
+)
+
+
+def record(seqid, type, start, end, strand, attributes, phase="."):
+    return GFFRecord("\t".join([
+        seqid, "test", type, str(start), str(end), ".", strand, phase,
+        attributes]) + "\n")
+
+
+class GroupTranscriptsTestCase(unittest.TestCase):
+
+    def test_group(self):
+        features = [
+            record("1", "exon", 50, 60, "+", "Parent=transcript:T1"),
+            record("1", "CDS", 50, 60, "+", "Parent=transcript:T1", "0"),
+            record("1", "exon", 10, 20, "+", "Parent=transcript:T1"),
+            record("1", "exon", 30, 40, "-", 'gene_id "G2"; transcript_id "T2";'),
+            record("1", "exon", 70, 80, "-", 'gene_id "G2"; transcript_id "T2";'),
+            record("2", "exon", 1, 5, "+", "Parent=transcript:T3"),
+        ]
+        transcripts = list(group_transcripts(features, "exon"))
+        self.assertEqual(
+            [t.key for t in transcripts], ["transcript:T1", "T2", "transcript:T3"])
+        self.assertEqual(
+            [(s.start, s.end) for s in transcripts[0].segments],
+            [(10, 20), (50, 60)])
+        self.assertEqual((transcripts[1].start, transcripts[1].end), (30, 80))
+        self.assertEqual(transcripts[1].first_segment.start, 70)
+        self.assertEqual(transcripts[2].seqid, "2")
+
+    def test_split_transcript(self):
+        features = [record("1", "exon", 1, 5, "+", "Parent=T0")]
+        features.extend(
+            record("1", "exon", 10 * i, 10 * i + 5, "+", "Parent=T%d" % i)
+            for i in range(1, MAX_PENDING_TRANSCRIPTS + 2))
+        features.append(record("1", "exon", 20, 25, "+", "Parent=T0"))
+        with self.assertRaises(SplitTranscriptError):
+            list(group_transcripts(features, "exon"))
+        # Grouping starts over on each seqid
+        features[-1] = record("2", "exon", 20, 25, "+", "Parent=T0")
+        self.assertEqual(
+            len(list(group_transcripts(features, "exon"))),
+            MAX_PENDING_TRANSCRIPTS + 3)
+
+    def test_revisited_seqid(self):
+        features = [
+            record("1", "exon", 1, 5, "+", "Parent=T1"),
+            record("2", "exon", 1, 5, "+", "Parent=T2"),
+            record("1", "exon", 10, 15, "+", "Parent=T1"),
+        ]
+        with self.assertRaises(SplitTranscriptError):
+            list(group_transcripts(features, "exon"))
+        features[-1] = record("1", "exon", 10, 15, "+", "Parent=T3")
+        self.assertEqual(
+            [t.key for t in group_transcripts(features, "exon")],
+            ["T1", "T2", "T3"])
+        # Only the last max_done complete transcripts are remembered
+        features[-1] = record("1", "exon", 10, 15, "+", "Parent=T1")
+        self.assertEqual(
+            [t.key for t in group_transcripts(
+                features, "exon", max_done=1)],
+            ["T1", "T2", "T1"])
@@ -0,0 +1,31 @@
+import io
+import unittest
+
+from pygff.utils import ProgressBar, format_duration
+
+
+class ProgressBarTestCase(unittest.TestCase):
+
+    def test_throttled_redraw(self):
+        output = io.StringIO()
+        with ProgressBar(1000, "Processing: ", file=output,
+                         min_interval=3600) as bar:
+            for done in range(0, 1000, 10):
+                bar.update_to(done, done // 10)
+        lines = output.getvalue().split("\r")
+        # The first draw and the final line
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith("Processing: [%s] 1000/1000" % ("#" * 60)))
+        self.assertIn("records/s", lines[1])
+        self.assertTrue(lines[1].endswith("\n"))
+
+    def test_unscaled_and_scaled(self):
+        output = io.StringIO()
+        bar = ProgressBar(3 * 1024 * 1024, suffix="MB", file=output,
+                          scale=1024 * 1024, min_interval=0)
+        bar.update_to(1024 * 1024)
+        self.assertIn("] 1.0/3.0 MB", output.getvalue())
+        self.assertIn("ETA ", output.getvalue())
+
+    def test_format_duration(self):
+        self.assertEqual(format_duration(3725.5), "1:02:05")